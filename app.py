@@ -1,18 +1,96 @@
 import streamlit as st
 import streamlit.components.v1 as components
-from fpdf import FPDF
-import google.generativeai as genai
-import os, json, random, uuid, string, ast
+import io, csv, functools, random, uuid, time
+from collections import deque
 from dotenv import load_dotenv
 
+# The engines live in the winphonics package; this script is only the page.
+from winphonics import (CORE_ACTIVITIES, DIFFICULTIES, GAME_ACTIVITIES, GRADE_LEVELS, PHONICS_MENU, THEMES,
+                        BATCH_AUTO_MIX, BATCH_COLUMNS, BATCH_SEP, DIAG_DEFAULT, QueueItem,
+                        build_word_searches, current_trace, generate_with_cache, generation_session, get_diagnostics_log, get_gateway,
+                        get_packet_library, get_session_registry, get_static_asset, normalize_plan, packet_word_lists, parse_roster,
+                        render_packet_pdf, run_batch, span, start_trace, state_bytes, stop_trace, word_search_words)
+
 # --- 1. CONFIG & MEMORY ---
 load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
 if "build_queue" not in st.session_state: st.session_state.build_queue = []
 if "final_json" not in st.session_state: st.session_state.final_json = None
 if "just_generated" not in st.session_state: st.session_state.just_generated = False
-if "ws_grids" not in st.session_state: st.session_state.ws_grids = {} 
+if "render_seed" not in st.session_state: st.session_state.render_seed = 0
+if "gen_metrics" not in st.session_state: st.session_state.gen_metrics = None
+if "gen_notice" not in st.session_state: st.session_state.gen_notice = None
+if "packet_rev" not in st.session_state: st.session_state.packet_rev = 0
+
+def set_packet(packet):
+    # Every new (or cleared) packet gets a new revision, so the downloads panel knows its PDFs are stale.
+    st.session_state.final_json = packet; st.session_state.packet_rev += 1
+
+# --- 1a. DIAGNOSTICS (phase timing spans; a no-op unless switched on) ---
+DIAG_KEEP_RUNS = 20 # recent reruns kept per session for the sidebar panel
+
+def begin_trace(name):
+    if st.session_state.diag_on: start_trace(name)
+    else: stop_trace()
+
+def end_trace():
+    finished = stop_trace()
+    if finished is None: return
+    trace, total_s = finished
+    get_diagnostics_log().record(trace, total_s, st.session_state.diag_session)
+    st.session_state.diag_runs.append({"trace": trace.name, "total_s": total_s, "spans": trace.spans})
+
+def rerun(scope="app"):
+    # st.rerun() ends the script by raising, so the running trace is flushed first.
+    end_trace()
+    st.rerun(scope=scope)
+
+def fragment(name):
+    # st.fragment whose reruns are timed: a span inside a full rerun, its own "fragment:<name>" trace when it reruns alone.
+    def wrap(body):
+        @functools.wraps(body)
+        def run(*args, **kwargs):
+            if current_trace() is not None:
+                with span(f"fragment.{name}"): return body(*args, **kwargs)
+            begin_trace(f"fragment:{name}")
+            try: return body(*args, **kwargs)
+            finally: end_trace()
+        return st.fragment(run)
+    return wrap
+
+def show_diagnostics():
+    runs = list(st.session_state.diag_runs)
+    if not runs:
+        st.caption("Timings show up here from your next click on.")
+        return
+    last = runs[-1]
+    # Most recent rerun that did real work (generating or drawing), else just the last one.
+    focus = next((r for r in reversed(runs) if any(n.startswith(("generate", "render")) for n, _, _ in r["spans"])), last)
+    st.caption(f"Last rerun ({last['trace']}) {last['total_s'] * 1000:.0f} ms · recent: " + ", ".join(f"{r['total_s'] * 1000:.0f}" for r in runs[-8:]) + " ms")
+    rows = {}
+    for name, seconds, labels in focus["spans"]:
+        row = rows.setdefault((name, labels.get("type", ""), labels.get("layer", labels.get("mode", ""))), [0, 0.0])
+        row[0] += 1; row[1] += seconds
+    st.dataframe([{"phase": n, "type": t, "detail": d, "calls": c, "ms": round(s * 1000, 1)}
+                  for (n, t, d), (c, s) in sorted(rows.items(), key=lambda kv: -kv[1][1])], hide_index=True, use_container_width=True)
+    gw = get_gateway().stats()
+    st.caption(f"Gemini gateway: {gw['active']} running · {gw['queued']} queued from {gw['queued_sessions']} sessions · "
+               f"wait {gw['wait_ms_mean']:.0f} ms avg, {gw['wait_ms_max']:.0f} ms max · {gw['coalesced']} shared plans · {gw['quota_errors']} quota errors")
+    mem, derived = get_session_registry().report(), st.session_state.derived
+    st.caption(f"Session state: {state_bytes(dict(st.session_state)) / 1024:.0f} KB here · {mem['sessions']} sessions, "
+               f"{mem['mean_bytes'] / 1024:.0f} KB avg, {mem['max_bytes'] / 1024:.0f} KB max · "
+               f"{mem['evictions']} idle evictions freed {mem['evicted_bytes'] / 1024:.0f} KB")
+    st.caption(f"PDFs on demand: {derived.built} built, {derived.never_built()} never clicked here "
+               f"(~{derived.never_built() * mem['pdf_build_ms']:.0f} ms of render CPU saved at {mem['pdf_build_ms']:.0f} ms each) · "
+               f"all sessions: ~{mem['est_cpu_saved_ms'] / 1000:.1f} s saved")
+    log = get_diagnostics_log()
+    st.caption(f"Appended to {log.jsonl_path} · Prometheus text in {log.prom_path}")
+
+if "diag_on" not in st.session_state: st.session_state.diag_on = DIAG_DEFAULT
+if "diag_runs" not in st.session_state: st.session_state.diag_runs = deque(maxlen=DIAG_KEEP_RUNS)
+if "diag_session" not in st.session_state: st.session_state.diag_session = uuid.uuid4().hex[:8]
+if "derived" not in st.session_state: st.session_state.derived = get_session_registry().open(st.session_state.diag_session)
+begin_trace("rerun")
 
 # ==========================================
 # 🎨 BRANDING SECTION
@@ -24,46 +102,7 @@ FOOTER_TEXT = "🚀 WIN Time Phonics v3.1"
 
 st.set_page_config(page_title=APP_NAME, layout="wide", page_icon=APP_EMOJI)
 
-# --- 2. PHONICS DATABASE & THEMES ---
-PHONICS_MENU = {
-    "Mixed Review (All Types)": ["All Patterns Combined"],
-    "CVC (Short Vowels)": ["Short A", "Short E", "Short I", "Short O", "Short U", "Mixed Short Vowels"],
-    "Consonant Digraphs": ["sh", "ch", "th", "wh", "ck", "Mixed Digraphs"],
-    "Consonant Blends": ["L-Blends", "R-Blends", "S-Blends", "Final Blends"],
-    "Magic E (CVCe)": ["a-e", "i-e", "o-e", "u-e", "Mixed Magic E"],
-    "Vowel r": ["ar", "or", "er", "ir", "ur", "Mixed Vowel r"],
-    "Predictable Vowel Teams": ["Long A (ai, ay)", "Long E (ee, ea)", "Long O (oa, ow)", "Long I (igh, ie)"],
-    "Variant Vowel Teams": ["/ow/ (ou, ow)", "/oy/ (oi, oy)", "/oo/ (oo, ew)", "/aw/ (au, aw)"],
-    "Multisyllable": ["closed/closed", "silent e", "open", "vowel team", "consonant le", "vowel r"],
-    "Endings": ["ed", "ing", "s", "es", "er", "est"]
-}
-
-# EXPANDED THEMES
-THEMES = [
-    "None (Standard)", "Back to School 🚌", "Halloween 🎃", "Thanksgiving 🦃", "Christmas 🎄", 
-    "Winter Holidays ❄️", "100th Day of School 💯", "Valentine's Day 💖", "St. Patrick's Day 🍀", 
-    "Easter 🐰", "Spring Blossoms 🌷", "Earth Day 🌍", "Summer Break ☀️", "Fall / Autumn 🍂", 
-    "Outer Space 🚀", "Ocean Exploration 🌊", "Sports & Games ⚽", "Superheroes 🦸", 
-    "Dinosaurs 🦖", "Animals & Pets 🐶", "Magic & Fantasy 🦄", "Pirates 🏴‍☠️", 
-    "Camping & Outdoors 🏕️", "Fairy Tales 🏰"
-]
-
-CORE_ACTIVITIES = {
-    "Decodable Story": "📖 Story (3+ paragraphs) & 3 Evidence Check questions.",
-    "Nonsense Word Fluency": "🧪 21 pseudo-words with a custom Detective Task.",
-    "Word Bank Sort": "📊 Word Sort: A Word Bank and columns to categorize words.",
-    "Sentence Match": "🔗 Sentence Match: 5 sentence halves to connect.",
-    "Sound Mapping": "🟦 Mapping: Segment words into phoneme boxes."
-}
-
-GAME_ACTIVITIES = {
-    "Detective Riddle Cards": "🔍 8 cards per page with 3 logic clues each.",
-    "Mystery Grid (Color-by-Code)": "🎨 FULL-PAGE 8x8 Aztec/Quilt geometric grid.",
-    "Phonics Word Search": "🔎 A 15x15 grid hiding 10 targeted phonics words.",
-    "Word Scramble": "🧩 8 scrambled words with crossword-style clues to solve."
-}
-
-# --- 3. PREMIUM UI STYLING ---
+# --- 2. PREMIUM UI STYLING ---
 st.markdown("""
     <style>
     .stApp { background-color: #f4f7f6; font-family: 'Inter', sans-serif; }
@@ -97,113 +136,41 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# --- 4. PYTHON WORD SEARCH ENGINE (UPGRADED TO 15x15) ---
-def build_word_search(words, size=15): # Increased to 15x15 for better spacing
-    grid = [['' for _ in range(size)] for _ in range(size)]
-    ans_grid = [[False for _ in range(size)] for _ in range(size)] 
-    placed_words = []
-    
-    words = sorted([w.upper().replace(" ", "") for w in words], key=len, reverse=True)
-    
-    # 8-way directional generation
-    directions = [
-        (0, 1), (1, 0), (1, 1), (-1, 1), 
-        (0, -1), (-1, 0), (-1, -1), (1, -1)
-    ]
-    
-    for word in words:
-        placed = False
-        attempts = 0
-        while not placed and attempts < 200:
-            dr, dc = random.choice(directions)
-            r = random.randint(0, size - 1)
-            c = random.randint(0, size - 1)
-            
-            if 0 <= r + (len(word) - 1) * dr < size and 0 <= c + (len(word) - 1) * dc < size:
-                can_place = True
-                for i in range(len(word)):
-                    if grid[r + i * dr][c + i * dc] not in ('', word[i]):
-                        can_place = False
-                        break
-                
-                if can_place:
-                    for i in range(len(word)):
-                        grid[r + i * dr][c + i * dc] = word[i]
-                        ans_grid[r + i * dr][c + i * dc] = True
-                    placed = True
-            attempts += 1
-            
-        if placed: placed_words.append(word)
+# --- 3. SIDEBAR ARCHITECT ---
+@fragment("skills")
+def skill_builder():
+    st.divider()
+    with st.container():
+        st.subheader("2. Choose Skills Manually")
+        sel_cat = st.selectbox("🎯 Phonics Category", list(PHONICS_MENU.keys()), key="sel_cat")
+        sel_targets = st.multiselect("📌 Specific Targets", PHONICS_MENU[sel_cat], default=[PHONICS_MENU[sel_cat][0]])
     
-    for r in range(size):
-        for c in range(size):
-            if grid[r][c] == '': grid[r][c] = random.choice(string.ascii_uppercase)
+    st.divider()
+    with st.container():
+        st.subheader("3. Add Core Work")
+        core_type = st.selectbox("📝 Standard Activities", list(CORE_ACTIVITIES.keys()))
+        if st.button("➕ Add Core Activity", use_container_width=True):
+            st.session_state.build_queue.append(QueueItem(core_type, sel_cat, sel_targets, is_game=False))
+            rerun()
             
-    return grid, ans_grid, placed_words
-
-# --- 5. PDF GENERATORS ---
-def generate_tracker_pdf():
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.add_page()
-    pdf.set_font("Helvetica", "B", 20)
-    pdf.cell(0, 15, "Skill Mastery Tracker", ln=True, align="C")
-    pdf.set_font("Helvetica", "B", 12)
-    pdf.cell(0, 10, "Student: _________________________________", ln=True)
-    pdf.ln(5)
-    
-    pdf.set_fill_color(220, 230, 245)
-    pdf.cell(100, 10, " Phonics Skill", 1, 0, 'L', fill=True)
-    pdf.cell(30, 10, "Practice", 1, 0, 'C', fill=True)
-    pdf.cell(30, 10, "Pass-Off", 1, 0, 'C', fill=True)
-    pdf.cell(30, 10, "Initials", 1, 1, 'C', fill=True)
-    
-    skills = [
-        ("Letter Names & Sounds", False), ("Short Vowels (CVC)", False),
-        ("Consonant Blends", False), ("Digraphs", False), ("Final Blends", False), ("Silent e (CVCe)", False),
-        ("Vowel Teams", False), ("R-Controlled Vowels", False),
-        ("MULTISYLLABLE", True), ("   - closed/closed", False), ("   - silent e", False), 
-        ("   - open", False), ("   - vowel team", False), ("   - consonant le", False), ("   - vowel r", False),
-        ("ENDINGS", True), ("   - ed", False), ("   - ing", False), ("   - s", False), 
-        ("   - es", False), ("   - er", False), ("   - est", False),
-        ("High-Frequency Words", False)
-    ]
-    
-    row_count = 0
-    for s, is_h in skills:
-        if is_h:
-            pdf.set_font("Helvetica", "B", 11); pdf.set_fill_color(235, 235, 235)
-            pdf.cell(190, 8, f" {s}", 1, 1, 'L', fill=True); row_count = 0
-        else:
-            pdf.set_font("Helvetica", "", 10)
-            if row_count % 2 == 0: pdf.set_fill_color(250, 250, 250)
-            else: pdf.set_fill_color(255, 255, 255)
-            pdf.cell(100, 8, f" {s}", 1, 0, 'L', fill=True)
-            pdf.cell(30, 8, "", 1, 0, 'C', fill=True)
-            pdf.cell(30, 8, "", 1, 0, 'C', fill=True)
-            pdf.cell(30, 8, "", 1, 1, 'C', fill=True)
-            row_count += 1
-    return bytes(pdf.output())
-
-def get_color_rgb(color_name):
-    c = str(color_name).lower().strip()
-    colors = {
-        "red": ((255, 180, 180), (0,0,0)), "blue": ((180, 210, 255), (0,0,0)),
-        "green": ((180, 255, 180), (0,0,0)), "yellow": ((255, 255, 180), (0,0,0)),
-        "orange": ((255, 220, 180), (0,0,0)), "purple": ((220, 180, 255), (0,0,0)),
-        "pink": ((255, 200, 230), (0,0,0)), "brown": ((210, 190, 170), (0,0,0))
-    }
-    return colors.get(c, ((255,255,255), (0,0,0)))
+    st.divider()
+    with st.container():
+        st.subheader("4. Add Fun & Games")
+        game_type = st.selectbox("🎲 Puzzles & Games", list(GAME_ACTIVITIES.keys()))
+        if st.button("➕ Add Game/Puzzle", use_container_width=True):
+            st.session_state.build_queue.append(QueueItem(game_type, sel_cat, sel_targets, nonsense=False, is_game=True))
+            rerun()
 
-# --- 6. SIDEBAR ARCHITECT ---
 with st.sidebar:
     st.title(SIDEBAR_TITLE)
     
     with st.container():
         st.subheader("1. Setup Profile")
-        grade = st.selectbox("📚 Grade Level", ["1st", "2nd", "3rd", "4th+"])
-        r_level = st.select_slider("🧠 Difficulty", options=["Beginning", "Intermediate", "Advanced"])
+        grade = st.selectbox("📚 Grade Level", GRADE_LEVELS)
+        r_level = st.select_slider("🧠 Difficulty", options=DIFFICULTIES)
         sel_theme = st.selectbox("🎈 Theme / Holiday", THEMES, help="The AI will weave this theme into the stories, sentences, and vocabulary.")
+        fast_mode = st.toggle("⚡ Fast mode", help="Word searches, mystery grids, nonsense words and sound mapping are built instantly from the "
+                                                  "built-in word list (not themed). Only the other activities wait on the AI.")
         
         if st.button("🪄 Auto-Fill Plan (Uses Profile)", use_container_width=True, type="primary"):
             st.session_state.build_queue = []
@@ -220,40 +187,22 @@ with st.sidebar:
             game_choices = random.sample(list(GAME_ACTIVITIES.keys()), 2)
             
             for c in core_choices:
-                st.session_state.build_queue.append({"type": c, "nonsense": (c=="Nonsense Word Fluency"), "id": str(uuid.uuid4()), "cat": smart_cat, "sounds": smart_target, "is_game": False})
+                st.session_state.build_queue.append(QueueItem(c, smart_cat, smart_target, is_game=False))
             for g in game_choices:
-                st.session_state.build_queue.append({"type": g, "nonsense": False, "id": str(uuid.uuid4()), "cat": smart_cat, "sounds": smart_target, "is_game": True})
-            st.rerun()
+                st.session_state.build_queue.append(QueueItem(g, smart_cat, smart_target, nonsense=False, is_game=True))
+            rerun()
             
-    st.divider()
-    with st.container():
-        st.subheader("2. Choose Skills Manually")
-        sel_cat = st.selectbox("🎯 Phonics Category", list(PHONICS_MENU.keys()))
-        sel_targets = st.multiselect("📌 Specific Targets", PHONICS_MENU[sel_cat], default=[PHONICS_MENU[sel_cat][0]])
-    
-    st.divider()
-    with st.container():
-        st.subheader("3. Add Core Work")
-        core_type = st.selectbox("📝 Standard Activities", list(CORE_ACTIVITIES.keys()))
-        if st.button("➕ Add Core Activity", use_container_width=True):
-            st.session_state.build_queue.append({
-                "type": core_type, "nonsense": (core_type == "Nonsense Word Fluency"), 
-                "id": str(uuid.uuid4()), "cat": sel_cat, "sounds": sel_targets, "is_game": False
-            })
-            
-    st.divider()
-    with st.container():
-        st.subheader("4. Add Fun & Games")
-        game_type = st.selectbox("🎲 Puzzles & Games", list(GAME_ACTIVITIES.keys()))
-        if st.button("➕ Add Game/Puzzle", use_container_width=True):
-            st.session_state.build_queue.append({
-                "type": game_type, "nonsense": False, 
-                "id": str(uuid.uuid4()), "cat": sel_cat, "sounds": sel_targets, "is_game": True
-            })
+    # Picking skills and activity types only reruns this part; adding one reruns the page so the card shows up.
+    skill_builder()
 
     st.divider()
     if st.button("🗑️ Clear Plan", use_container_width=True):
-        st.session_state.build_queue = []; st.session_state.final_json = None; st.rerun()
+        st.session_state.build_queue = []; set_packet(None); rerun()
+
+    st.divider()
+    st.toggle("🩺 Diagnostics", key="diag_on", help="Time each step of generating and drawing packets. Off = no overhead.")
+    if st.session_state.diag_on:
+        with st.expander("⏱️ Phase timings", expanded=True): show_diagnostics()
 
     st.divider()
     # ELEGANT TEACHER DONATION BOX
@@ -268,20 +217,24 @@ with st.sidebar:
         </div>
     """, unsafe_allow_html=True)
 
-# --- 7. HEADER ---
+# --- 4. HEADER ---
 c1, c2 = st.columns([3, 1])
 with c1: 
     st.title("✨ Welcome to WIN Time Phonics")
     st.markdown("Build targeted, themed, data-driven phonics interventions in seconds.")
 with c2: 
     st.markdown("<br>", unsafe_allow_html=True)
-    st.download_button("📋 Download Skill Mastery Tracker", generate_tracker_pdf(), "Skill_Mastery_Tracker.pdf", "application/pdf", use_container_width=True, type="primary")
+    st.download_button("📋 Download Skill Mastery Tracker", lambda: get_static_asset("skill_tracker"), "Skill_Mastery_Tracker.pdf", "application/pdf", use_container_width=True, type="primary")
 st.divider()
 
-# --- 8. MAIN BUILDER CANVAS ---
-col_plan, col_res = st.columns([1.5, 1])
+# --- 5. MAIN BUILDER CANVAS ---
+# Removing a card only reruns the plan; a new packet reruns the page so the downloads pick it up.
+def remove_card(item_id):
+    # Button callback: runs before the fragment's own rerun, which then draws the plan without the card.
+    st.session_state.build_queue = [item for item in st.session_state.build_queue if item.id != item_id]
 
-with col_plan:
+@fragment("plan")
+def plan_canvas(grade, r_level, sel_theme, fast_mode):
     st.header(f"📝 Worksheet Plan (Theme: {sel_theme})")
     if not st.session_state.build_queue: 
         st.markdown("""
@@ -307,374 +260,47 @@ with col_plan:
                             <div style='font-weight:800; font-size:0.95rem; color:#1e293b; margin: 8px 0; word-break: keep-all; overflow-wrap: normal; line-height: 1.2;'>{icon} {display_name}</div>
                             <div style='font-size:0.75rem; color:#6366f1; background:#e0e7ff; padding: 4px 8px; border-radius: 12px; display:inline-block; word-break: keep-all;'>{', '.join(item['sounds'])}</div>
                         </div>""", unsafe_allow_html=True)
-                        if st.button("✖️ Remove", key=f"del_{item['id']}", use_container_width=True):
-                            st.session_state.build_queue.pop(idx)
-                            st.rerun()
+                        st.button("✖️ Remove", key=f"del_{item['id']}", use_container_width=True, on_click=remove_card, args=(item['id'],))
 
     if st.session_state.build_queue:
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("🚀 GENERATE WORKSHEET", type="primary", use_container_width=True):
             with st.spinner("✨ AI is crafting rigorous, themed content..."):
-                st.session_state.ws_grids = {} 
-                
-                theme_instruction = f"The ENTIRE worksheet (story, sentences, vocabulary, riddles) MUST be themed around: {sel_theme}." if sel_theme != "None (Standard)" else "Standard non-themed vocabulary."
+                st.session_state.render_seed = random.getrandbits(32)
+                st.session_state.gen_notice = None
                 
-                prompt = f"""
-                Create a {grade} worksheet ({r_level} level). 
-                Plan: {st.session_state.build_queue}.
-                THEME REQUIREMENT: {theme_instruction}
+                preview = st.container()
+                started = time.perf_counter()
+                first_at = []
+                def show_activity(act):
+                    if not first_at: first_at.append(time.perf_counter() - started)
+                    # Build the grid while the other activities are still generating.
+                    if act.get('type') == "Phonics Word Search":
+                        with span("generate.word_search"): build_word_searches([word_search_words(act)], seed=st.session_state.render_seed)
+                    preview.success(f"✅ {act.get('type', 'Activity')} is ready ({time.perf_counter() - started:.1f}s)")
                 
-                STRICT QUANTITY & CONTENT RULES:
-                1. AGE-APPROPRIATE RIGOR: The vocabulary MUST strictly align with the reading level of a {grade} student. 'Advanced' means complex decodable spelling patterns for their specific age, NOT high-school level or obscure adult vocabulary. Keep the concepts familiar to young children!
-                2. STORY: MUST be 3+ paragraphs. MUST have exactly 3 questions.
-                3. NONSENSE WORDS: EXACTLY 21 pseudo-words.
-                4. WORD SORT: At least 15 words total. Categories MUST be 1 or 2 words maximum.
-                5. SENTENCE MATCH: EXACTLY 5 sentences. Halves MUST be under 6 words each.
-                6. SOUND MAPPING: EXACTLY 10 words.
-                7. RIDDLES: EXACTLY 8 distinct riddle cards.
-                8. MYSTERY GRID: Choose EXACTLY 4 distinct colors. EXACTLY 8 unique words for EACH color.
-                9. WORD SEARCH: Provide EXACTLY 10 targeted phonics words. (Max 10 letters per word).
-                10. WORD SCRAMBLE: Provide EXACTLY 8 scrambled words. Clues MUST be short (under 10 words).
-                
-                JSON SAFETY: You MUST output ONLY valid JSON. Use DOUBLE QUOTES (") for keys and values. NO trailing commas. Do NOT use unescaped newlines.
-                Output Schema Format:
-                {{
-                  "overview": "3 sentence intro.", "target_words": ["word1", "word2"],
-                  "activities": [ {{
-                    "type": "Exact Type", 
-                    "content": {{
-                      "title": "text", "paragraphs": ["Para 1 text"], "questions": [{{"q":"?","a":""}}],
-                      "words": ["pseudo1"], "detective_task": ["1. Task"], "sort_cats": {{"Cat1":["w1"]}},
-                      "match_l": ["Left 1"], "match_r": ["Right 1"], "map_words": ["w1"], "riddles": [{{"clue1":"c1","clue2":"c2","clue3":"c3","ans":"a"}}],
-                      "mystery_grid": {{ "legend": {{"Red":"target 1", "Blue":"target 2"}}, "color_words": {{"Red":["w1","w2"]}} }},
-                      "word_search": ["w1", "w2", "w3"],
-                      "word_scramble": [{{"word": "BLAST", "scrambled": "L B T S A", "clue": "A rocket taking off"}}]
-                    }}
-                  }} ]
-                }}
-                """
-                
-                success = False
-                for attempt in range(3):
-                    try:
-                        model = genai.GenerativeModel("gemini-2.5-flash")
-                        response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json", "max_output_tokens": 8192})
-                        raw_text = response.text.strip()
-                        
-                        if raw_text.startswith("```json"): raw_text = raw_text[7:]
-                        elif raw_text.startswith("```"): raw_text = raw_text[3:]
-                        if raw_text.endswith("```"): raw_text = raw_text[:-3]
-                        raw_text = raw_text.strip()
-                        
-                        try:
-                            parsed_data = json.loads(raw_text)
-                        except json.JSONDecodeError:
-                            parsed_data = ast.literal_eval(raw_text) 
-                            
-                        st.session_state.final_json = parsed_data
-                        st.session_state.just_generated = True 
-                        success = True
-                        break 
-                    except Exception:
-                        continue 
+                with span("generate"), generation_session(st.session_state.diag_session):
+                    packet, missing, cached = generate_with_cache(grade, r_level, sel_theme, st.session_state.build_queue, show_activity, fast_mode)
+                success = packet is not None
+                if success:
+                    with span("generate.word_search"): build_word_searches(packet_word_lists(packet), seed=st.session_state.render_seed)
+                    set_packet(packet)
+                    with span("library.save"): get_packet_library().add(normalize_plan(grade, r_level, sel_theme, st.session_state.build_queue, fast_mode), packet, st.session_state.render_seed)
+                    st.session_state.just_generated = True 
+                    if missing: st.session_state.gen_notice = f"⚠️ The AI stopped early, so this packet has {len(packet['activities'])} of {len(st.session_state.build_queue)} activities."
+                st.session_state.gen_metrics = {"time_to_first_activity_s": first_at[0] if first_at else None,
+                                                "total_s": time.perf_counter() - started, "cached": cached}
                 
                 if success:
-                    st.rerun()
+                    rerun()
                 else:
                     st.error("⚠️ The AI hit a persistent formatting snag. Please click Generate again.")
 
-# --- 9. BULLETPROOF PDF RENDERER ---
-def clean_text(t): return str(t).replace("’","'").replace("“",'"').replace("”",'"').replace("**","")
-
-def render_pdf(data, is_key=False):
-    pdf = FPDF(unit='mm', format='A4')
-    pdf.set_margins(15, 15, 15)
-    pdf.set_auto_page_break(True, margin=15)
-    
-    # COVER PAGE
-    pdf.add_page()
-    if is_key:
-        pdf.set_font("Helvetica", "B", 12); pdf.set_text_color(200, 0, 0)
-        pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="R"); pdf.set_text_color(0,0,0)
-    else:
-        pdf.set_font("Helvetica", "B", 12)
-        pdf.set_x(15); pdf.cell(0, 10, "Name: ___________________________________   Date: ___________", ln=True)
-
-    pdf.ln(10)
-    pdf.set_font("Helvetica", "B", 26); pdf.set_x(15); pdf.cell(0, 15, "WIN Time Phonics Packet", ln=True, align="C")
-    pdf.ln(10)
-
-    pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Learning Focus:", ln=True)
-    pdf.set_font("Helvetica", "", 12); pdf.set_x(15); pdf.multi_cell(0, 6, clean_text(data.get("overview", "Practice targeted phonics skills.")))
-    pdf.ln(10)
-
-    pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Target Word Bank:", ln=True)
-    pdf.set_font("Helvetica", "", 12)
-    target_list = [clean_text(w) for w in data.get("target_words", [])]
-    pdf.set_x(15)
-    if target_list: pdf.multi_cell(0, 6, "   |   ".join(target_list))
-    else: pdf.cell(0, 6, "Words provided in activities.", ln=True)
-    pdf.ln(10)
-
-    pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Packet Checklist:", ln=True)
-    pdf.set_font("Helvetica", "", 12)
-    for i, act in enumerate(data.get("activities", [])):
-        pdf.set_x(15); pdf.cell(0, 8, f"[   ]  {i+1}. {clean_text(act.get('type', 'Activity'))}", ln=True)
-    
-    # ACTIVITIES
-    for act_idx, act in enumerate(data.get("activities", [])):
-        a_type, content = act['type'], act['content']
-        
-        if pdf.get_y() > 25:
-            pdf.add_page() 
-        
-        # --- GAME: MYSTERY GRID ---
-        if a_type == "Mystery Grid (Color-by-Code)":
-            pdf.rect(10, 10, 190, 277) 
-            pdf.set_font("Helvetica", "B", 20); pdf.set_x(15); pdf.cell(0, 15, "Color-by-Code", ln=True, align="C")
-            if not is_key:
-                pdf.set_font("Helvetica", "B", 12); pdf.set_x(15); pdf.cell(0, 10, " Name: ___________________________________", ln=True, align="L")
-            else:
-                pdf.set_font("Helvetica", "B", 14); pdf.set_text_color(200, 0, 0)
-                pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="C"); pdf.set_text_color(0,0,0)
-
-            grid_data = content.get('mystery_grid', {})
-            legend = grid_data.get('legend', {})
-            color_names = list(legend.keys())
-            
-            pdf.set_font("Helvetica", "B", 10)
-            legend_str = " | ".join([f"{k}: {v}" for k, v in legend.items()])
-            pdf.set_x(15); pdf.multi_cell(0, 8, "Legend: " + clean_text(legend_str), align="C")
-            pdf.ln(5)
-            
-            patterns = [
-                [[0,0,1,1,1,1,0,0],[0,1,2,2,2,2,1,0],[1,2,3,3,3,3,2,1],[1,2,3,0,0,3,2,1],[1,2,3,0,0,3,2,1],[1,2,3,3,3,3,2,1],[0,1,2,2,2,2,1,0],[0,0,1,1,1,1,0,0]],
-                [[0,1,0,1,0,1,0,1],[1,0,1,0,1,0,1,0],[0,1,2,2,2,2,1,0],[1,0,2,3,3,2,0,1],[0,1,2,3,3,2,1,0],[1,0,2,2,2,2,0,1],[0,1,0,1,0,1,0,1],[1,0,1,0,1,0,1,0]]
-            ]
-            chosen_pattern = random.choice(patterns)
-            w_dict = grid_data.get('color_words', {})
-            
-            size = 22; start_x = (210 - (8 * size)) / 2
-            for r in range(8):
-                pdf.set_x(start_x)
-                for c in range(8):
-                    c_idx = chosen_pattern[r][c] % max(1, len(color_names))
-                    c_name = color_names[c_idx]
-                    word_list = w_dict.get(c_name, ["?"])
-                    word = clean_text(word_list[ (r*8+c) % max(1, len(word_list)) ])
-                    
-                    if is_key:
-                        fill, text = get_color_rgb(c_name)
-                        pdf.set_fill_color(*fill); pdf.set_text_color(*text)
-                        pdf.set_font("Helvetica", "B", 7); pdf.cell(size, size, word, 1, 0, 'C', fill=True)
-                        pdf.set_text_color(0,0,0)
-                    else:
-                        pdf.set_font("Helvetica", "", 8); pdf.cell(size, size, word, 1, 0, 'C')
-                
-                if r < 7:
-                    pdf.ln(size)
-            continue
-            
-        # --- GAME: PYTHON WORD SEARCH ---
-        if a_type == "Phonics Word Search":
-            pdf.rect(10, 10, 190, 277) 
-            pdf.set_font("Helvetica", "B", 20); pdf.set_x(15); pdf.cell(0, 15, "Phonics Word Search", ln=True, align="C")
-            
-            if not is_key:
-                pdf.set_font("Helvetica", "B", 12); pdf.set_x(15); pdf.cell(0, 10, " Name: ___________________________________", ln=True, align="L")
-            else:
-                pdf.set_font("Helvetica", "B", 14); pdf.set_text_color(200, 0, 0)
-                pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="C"); pdf.set_text_color(0,0,0)
-
-            pdf.ln(5)
-            words = content.get('word_search', [])[:12]
-            
-            grid_id = f"ws_{act_idx}"
-            grid_dim = 15 # The new 15x15 expansion
-            if grid_id not in st.session_state.ws_grids:
-                st.session_state.ws_grids[grid_id] = build_word_search(words, grid_dim)
-            
-            grid, ans_grid, placed_words = st.session_state.ws_grids[grid_id]
-            
-            cell_size = 10 # 10mm blocks fit perfectly on A4
-            start_x = (210 - (grid_dim * cell_size)) / 2
-            pdf.set_font("Courier", "B", 14)
-            for r in range(grid_dim):
-                pdf.set_x(start_x)
-                for c in range(grid_dim):
-                    letter = grid[r][c]
-                    if is_key:
-                        if ans_grid[r][c]:
-                            pdf.set_text_color(220, 0, 0) 
-                            pdf.set_fill_color(255, 235, 235) 
-                            pdf.cell(cell_size, cell_size, letter, 1, 0, 'C', fill=True)
-                        else:
-                            pdf.set_text_color(180, 180, 180) 
-                            pdf.cell(cell_size, cell_size, letter, 0, 0, 'C')
-                    else:
-                        pdf.set_text_color(0, 0, 0)
-                        pdf.cell(cell_size, cell_size, letter, 0, 0, 'C')
-                
-                if r < grid_dim - 1:
-                    pdf.ln(cell_size)
-            
-            pdf.set_text_color(0, 0, 0) 
-            pdf.ln(20) # MASSIVE SPACER FOR WORD BANK
-            pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Word Bank:", ln=True, align="C")
-            pdf.set_font("Helvetica", "", 12); pdf.set_x(15)
-            pdf.multi_cell(0, 8, "   |   ".join(placed_words), align="C")
-            continue
-            
-        # --- GAME: WORD SCRAMBLE ---
-        if a_type == "Word Scramble":
-            if is_key:
-                pdf.set_font("Helvetica", "B", 10); pdf.set_text_color(200, 0, 0)
-                pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="R"); pdf.set_text_color(0,0,0)
-            else:
-                pdf.set_font("Helvetica", "B", 10); pdf.set_x(15); pdf.cell(0, 8, "Name: ___________________________________", ln=True, align="R")
-            
-            pdf.ln(2); pdf.set_font("Helvetica", "B", 18); pdf.set_x(15); pdf.cell(0, 10, "Word Scramble", ln=True); pdf.ln(5)
-            pdf.set_font("Helvetica", "I", 12); pdf.set_x(15); pdf.cell(0, 6, "Unscramble the letters to find the secret words. Use the clues to help!", ln=True); pdf.ln(10)
-            
-            scrambles = content.get("word_scramble", [])[:8]
-            for i, s in enumerate(scrambles):
-                pdf.set_x(15)
-                pdf.set_font("Helvetica", "B", 14)
-                pdf.cell(50, 8, clean_text(s.get('scrambled', '')), 0, 0)
-                
-                if is_key:
-                    pdf.set_font("Helvetica", "B", 12); pdf.set_text_color(200, 0, 0)
-                    pdf.cell(60, 8, clean_text(s.get('word', '')), 0, 1); pdf.set_text_color(0, 0, 0) 
-                else:
-                    pdf.set_font("Courier", "", 12); pdf.cell(60, 8, "________________", 0, 1)
-                
-                pdf.set_x(15)
-                pdf.set_font("Helvetica", "I", 11)
-                pdf.multi_cell(0, 6, f"Clue: {clean_text(s.get('clue', ''))}")
-                
-                if i < len(scrambles) - 1:
-                    pdf.ln(4) 
-            continue
-
-        # --- STANDARD HEADER ---
-        if is_key:
-            pdf.set_font("Helvetica", "B", 10); pdf.set_text_color(200, 0, 0)
-            pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="R"); pdf.set_text_color(0,0,0)
-        else:
-            pdf.set_font("Helvetica", "B", 10)
-            pdf.set_x(15); pdf.cell(0, 8, "Name: ___________________________________", ln=True, align="R")
-        
-        pdf.ln(2); pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 10, a_type, ln=True); pdf.ln(2)
-        
-        # --- DECODABLE STORY ---
-        if a_type == "Decodable Story":
-            pdf.set_font("Helvetica", "B", 12); pdf.set_x(15); pdf.cell(0, 10, clean_text(content.get('title','')), ln=True, align="C")
-            pdf.set_font("Helvetica", "", 11)
-            for p in content.get('paragraphs', []): 
-                pdf.set_x(15); pdf.multi_cell(0, 6, clean_text(p)); pdf.ln(2)
-            
-            if pdf.get_y() > 220: pdf.add_page()
-            
-            pdf.ln(5); pdf.set_font("Helvetica", "B", 11); pdf.set_x(15); pdf.cell(0, 8, "Evidence Check:", ln=True)
-            pdf.set_font("Helvetica", "", 11)
-            for q in content.get('questions', []):
-                q_str = clean_text(q.get('q', ''))
-                a_str = clean_text(q.get('a', ''))
-                pdf.set_x(15); pdf.multi_cell(0, 7, f"Q: {q_str}")
-                if is_key: 
-                    pdf.set_text_color(200,0,0); pdf.set_x(15); pdf.multi_cell(0, 7, f"A: {a_str}"); pdf.set_text_color(0,0,0); pdf.ln(2)
-                else: 
-                    pdf.ln(8)
-
-        elif a_type == "Nonsense Word Fluency":
-            words = content.get('words', [])[:21]
-            pdf.set_font("Helvetica", "B", 24)
-            for i, word in enumerate(words):
-                if i % 3 == 0: pdf.set_x(15)
-                pdf.cell(60, 20, clean_text(word), 1, 1 if (i + 1) % 3 == 0 else 0, 'C')
-            tasks = content.get('detective_task', [])
-            if tasks:
-                pdf.ln(10); pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "DETECTIVE TASK:", ln=True)
-                pdf.set_font("Helvetica", "", 12)
-                for task in tasks:
-                    pdf.set_x(15); pdf.multi_cell(0, 6, clean_text(task))
-
-        elif a_type == "Word Bank Sort":
-            cats = list(content.get('sort_cats', {}).keys())
-            if cats:
-                all_words = []
-                for cat_words in content['sort_cats'].values(): all_words.extend([clean_text(w) for w in cat_words])
-                random.shuffle(all_words)
-                pdf.set_font("Helvetica", "", 13)
-                pdf.set_x(15); pdf.multi_cell(0, 8, "Word Bank:  " + "   |   ".join(all_words)); pdf.ln(5)
-                w = 180 / len(cats)
-                
-                pdf.set_font("Helvetica", "B", 9) 
-                pdf.set_x(15)
-                for c in cats: pdf.cell(w, 10, clean_text(c)[:20], 1, 0, 'C')
-                pdf.ln(); pdf.set_font("Helvetica", "", 12)
-                
-                if not is_key:
-                    for _ in range(6):
-                        pdf.set_x(15)
-                        for _ in cats: pdf.cell(w, 12, "", 1, 0)
-                        pdf.ln()
-                else:
-                    max_r = max([len(content['sort_cats'][c]) for c in cats])
-                    pdf.set_text_color(200, 0, 0)
-                    for r in range(max_r):
-                        pdf.set_x(15)
-                        for c in cats:
-                            lst = content['sort_cats'][c]
-                            pdf.cell(w, 10, clean_text(lst[r]) if r < len(lst) else "", 1, 0, 'C')
-                        pdf.ln()
-                    pdf.set_text_color(0, 0, 0)
-
-        elif a_type == "Sentence Match":
-            l, r = content.get('match_l', []), content.get('match_r', [])
-            dr = r if is_key else random.sample(r, len(r))
-            for i in range(len(l)):
-                pdf.set_x(15)
-                pdf.set_font("Helvetica", "", 10) 
-                pdf.cell(85, 10, clean_text(l[i])[:50], 0, 0)
-                pdf.set_font("Courier", "", 10); pdf.cell(10, 10, ".......", 0, 0, 'C')
-                if is_key: pdf.set_text_color(200, 0, 0)
-                pdf.set_font("Helvetica", "", 10)
-                pdf.cell(85, 10, clean_text(dr[i])[:50] if i < len(dr) else "", 0, 1, 'R')
-                pdf.set_text_color(0, 0, 0)
-
-        elif a_type == "Sound Mapping":
-            for word in content.get('map_words', []):
-                pdf.set_x(15)
-                pdf.set_font("Helvetica", "B", 14); pdf.cell(50, 12, f"{clean_text(word)} -> ", 0, 0, 'R')
-                if is_key:
-                    pdf.set_text_color(200, 0, 0); pdf.cell(60, 12, "(Break word into phonemes)", 0, 1); pdf.set_text_color(0, 0, 0)
-                else:
-                    pdf.cell(20, 12, "", 1, 0); pdf.cell(20, 12, "", 1, 0); pdf.cell(20, 12, "", 1, 1)
-                pdf.ln(2)
-
-        elif a_type == "Detective Riddle Cards":
-            cards = content.get('riddles', [])[:8]
-            xs, ys = 15, 45 
-            c_w, c_h = 85, 45 
-            for i, r in enumerate(cards):
-                col = i % 2
-                row = i // 2
-                x = xs + (col * 95)
-                y = ys + (row * 50) 
-                pdf.rect(x, y, c_w, c_h)
-                pdf.set_xy(x+2, y+2); pdf.set_font("Helvetica", "B", 10); pdf.cell(0, 5, f"Riddle #{i+1}")
-                pdf.set_xy(x+2, y+8); pdf.set_font("Helvetica", "", 9)
-                clue_str = f"Clue 1: {clean_text(r.get('clue1',''))}\nClue 2: {clean_text(r.get('clue2',''))}\nClue 3: {clean_text(r.get('clue3',''))}"
-                pdf.multi_cell(c_w-4, 4.5, clue_str)
-                if is_key:
-                    pdf.set_xy(x, y + c_h - 7); pdf.set_font("Helvetica", "B", 11); pdf.set_text_color(200,0,0)
-                    pdf.cell(c_w, 6, f"Ans: {clean_text(r.get('ans',''))}", 0, 0, 'C'); pdf.set_text_color(0,0,0)
-
-    return bytes(pdf.output())
-
-# --- 10. DOWNLOADS SECTION ---
-with col_res:
+# --- 6. DOWNLOADS SECTION ---
+# Each PDF is drawn only when its button is clicked (Streamlit calls the data function then) and kept for
+# that packet revision, so showing the page costs no rendering and unclicked downloads cost nothing.
+@fragment("downloads")
+def downloads_panel():
     st.header("📥 Downloads")
     if not st.session_state.final_json:
         st.markdown("""
@@ -691,12 +317,24 @@ with col_res:
         </div>
         """, unsafe_allow_html=True)
         
-        spdf = render_pdf(st.session_state.final_json, False)
-        tpdf = render_pdf(st.session_state.final_json, True)
+        if st.session_state.gen_notice: st.warning(st.session_state.gen_notice)
+        metrics = st.session_state.gen_metrics
+        if metrics and metrics.get("library"):
+            st.caption(f"📚 Reopened from your packet library ({metrics['library']}), so no AI wait.")
+        elif metrics and metrics.get("cached"):
+            st.caption("♻️ Reused a saved packet for this exact plan, so no AI wait.")
+        elif metrics and metrics["time_to_first_activity_s"] is not None:
+            st.caption(f"⚡ First activity in {metrics['time_to_first_activity_s']:.1f}s · full packet in {metrics['total_s']:.1f}s")
         
-        st.download_button("📘 Download Student Packet", spdf, "Student_Worksheet.pdf", use_container_width=True, type="primary")
+        # Memoized on a SessionDerived, which the session registry empties once this session has been idle a while.
+        derived, rev = st.session_state.derived, st.session_state.packet_rev
+        packet, seed = st.session_state.final_json, st.session_state.render_seed
+        derived.offer(rev, ("student", "key"))
+        student = derived.lazy(rev, "student", lambda: render_packet_pdf(packet, seed, False))
+        key = derived.lazy(rev, "key", lambda: render_packet_pdf(packet, seed, True))
+        st.download_button("📘 Download Student Packet", student, "Student_Worksheet.pdf", "application/pdf", use_container_width=True, type="primary")
         st.markdown("<div style='height: 5px;'></div>", unsafe_allow_html=True)
-        st.download_button("🗝️ Download Teacher Key", tpdf, "Teacher_Key.pdf", use_container_width=True, type="primary")
+        st.download_button("🗝️ Download Teacher Key", key, "Teacher_Key.pdf", "application/pdf", use_container_width=True, type="primary")
         
         if st.session_state.just_generated:
             anim_type = random.choice(["balloons", "snow", "school", "stars"])
@@ -729,3 +367,99 @@ with col_res:
                 </script>
             """, height=0)
             st.session_state.just_generated = False
+
+col_plan, col_res = st.columns([1.5, 1])
+with col_plan: plan_canvas(grade, r_level, sel_theme, fast_mode)
+with col_res: downloads_panel()
+
+# --- 7. CLASSROOM BATCH MODE ---
+if "batch_rows" not in st.session_state:
+    st.session_state.batch_rows = [{"group": "Group 1", "grade": grade, "difficulty": r_level, "category": st.session_state.sel_cat,
+                                    "targets": PHONICS_MENU[st.session_state.sel_cat][0], "activities": "", "theme": sel_theme}]
+if "batch_output" not in st.session_state: st.session_state.batch_output = None
+
+st.divider()
+# Editing the roster only reruns this panel.
+@fragment("batch")
+def batch_panel(sel_theme):
+    with st.expander("🏫 Classroom Batch Mode: a packet for every group in one go"):
+        st.markdown(f"One row per group or student. Separate several targets or activities with `{BATCH_SEP}`. "
+                    f"Leave **activities** blank to auto-pick {BATCH_AUTO_MIX[0]} core activities and {BATCH_AUTO_MIX[1]} games.")
+        roster_file = st.file_uploader("Upload a roster CSV (optional)", type=["csv"], help=f"Columns: {', '.join(BATCH_COLUMNS)}")
+        if roster_file is not None:
+            roster = list(csv.DictReader(io.StringIO(roster_file.getvalue().decode("utf-8-sig"))))
+            st.caption(f"📄 {len(roster)} rows from {roster_file.name}")
+        else:
+            roster = st.data_editor(st.session_state.batch_rows, key="batch_table", num_rows="dynamic", use_container_width=True,
+                                    column_config={"grade": st.column_config.SelectboxColumn(options=GRADE_LEVELS),
+                                                   "difficulty": st.column_config.SelectboxColumn(options=DIFFICULTIES),
+                                                   "category": st.column_config.SelectboxColumn(options=list(PHONICS_MENU)),
+                                                   "theme": st.column_config.SelectboxColumn(options=THEMES)})
+            if hasattr(roster, "to_dict"): roster = roster.to_dict("records")
+        batch_merged = st.radio("Deliver as", ["📦 ZIP (one folder per group)", "📚 Merged PDFs (one student file, one key file)"], horizontal=True).startswith("📚")
+    
+        if st.button("🚀 GENERATE CLASS BATCH", type="primary", use_container_width=True):
+            profiles, problems = parse_roster(roster, sel_theme)
+            for problem in problems: st.warning(problem)
+            if profiles:
+                bar, status = st.progress(0.0, text="Starting..."), st.empty()
+                def show_batch_progress(generated, rendered, total, message):
+                    bar.progress((generated + rendered) / (2 * total), text=f"Generated {generated}/{total} · rendered {rendered}/{total}")
+                    status.caption(message)
+                with span("batch", groups=len(profiles)), generation_session(st.session_state.diag_session):
+                    st.session_state.batch_output = run_batch(profiles, random.getrandbits(32), batch_merged, show_batch_progress)
+                bar.empty(); status.empty()
+            elif not problems: st.info("Add at least one group to the table first.")
+    
+        output = st.session_state.batch_output
+        if output:
+            failed = [row["group"] for row in output["summary"] if row["status"] != "ok"]
+            if failed: st.warning(f"⚠️ These groups didn't finish, so run them again: {', '.join(failed)}")
+            if not output["files"]: st.error("⚠️ Nothing could be rendered for this batch.")
+            for label, filename, data, mime in output["files"]:
+                st.download_button(label, data, filename, mime, use_container_width=True, type="primary", key=f"batch_{filename}")
+            st.dataframe(output["summary"], hide_index=True, use_container_width=True)
+
+batch_panel(sel_theme)
+
+# --- 8. PACKET LIBRARY ---
+# Every generated packet is kept on this machine with a full-text index, so last week's packet is a search away.
+# Reopening one restores its plan and seed and goes straight to the downloads: no AI call, and its PDFs come
+# from the render cache when they are still there.
+LIBRARY_RESULTS = 10
+
+def reopen_packet(pid):
+    saved = get_packet_library().get(pid)
+    if not saved: return
+    plan, packet, seed = saved
+    st.session_state.build_queue = [QueueItem(i["type"], i["cat"], i["sounds"], nonsense=i["nonsense"]) for i in plan["queue"]]
+    st.session_state.render_seed = seed
+    st.session_state.gen_notice = None
+    st.session_state.gen_metrics = {"library": f"{plan['grade']} · {plan['r_level']} · {plan['theme']}"}
+    set_packet(packet)
+    rerun()
+
+@fragment("library")
+def library_panel():
+    with st.expander("📚 Packet Library: search and reopen past packets"):
+        c1, c2 = st.columns([3, 1])
+        query = c1.text_input("Search stories, titles and words", placeholder="e.g. frog pond, short a, Halloween")
+        grade = c2.selectbox("Grade", ["Any"] + GRADE_LEVELS, key="library_grade")
+        library = get_packet_library()
+        started = time.perf_counter()
+        with span("library.search"): rows = library.search(query, None if grade == "Any" else grade, LIBRARY_RESULTS)
+        st.caption(f"{len(rows)} {'matches' if query.strip() else 'most recent'} of {library.stats()['packets']} saved packets "
+                   f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for row in rows:
+            c1, c2 = st.columns([4, 1])
+            c1.markdown(f"**{row['title']}**  \n{row['grade']} · {row['r_level']} · {row['theme']} · {row['sounds']}  \n"
+                        f"<small style='color:#64748b;'>{row['types']} · saved {time.strftime('%b %d, %Y', time.localtime(row['saved']))}</small>",
+                        unsafe_allow_html=True)
+            if row["snippet"]: c1.caption(f"…{row['snippet']}…")
+            if c2.button("📂 Reopen", key=f"lib_{row['id']}", use_container_width=True): reopen_packet(row["id"])
+
+library_panel()
+
+# Record this session's state size (and let the registry sweep idle sessions), then flush the timing spans.
+with span("session.accounting"): get_session_registry().touch(st.session_state.diag_session, state_bytes(dict(st.session_state)))
+end_trace()
@@ -0,0 +1,154 @@
+"""Microbenchmarks for the hot paths: word search engine, packet renderer, tracker PDF, text cleaning, JSON parsing, library search.
+
+Runs offline (no Gemini key, no network) against synthetic packets of 1-50 activities covering every type.
+
+Run from the repo root:  python benchmarks/bench_suite.py [--out results.json] [--quick]
+Results are JSON (stdout, or --out) so runs can be diffed across releases; a readable table goes to stderr.
+"""
+import argparse, json, os, platform, random, statistics, subprocess, sys, tempfile, time, uuid
+
+from bench_word_search import load_engine, word_lists
+
+PACKET_SIZES = [1, 5, 10, 25, 50]
+WS_CASES = [(10, 5), (15, 10), (15, 20), (20, 20), (20, 30), (25, 40)] # (grid size, word count)
+
+# --- SYNTHETIC PACKETS ---
+SYLLABLES = ["cat", "map", "ship", "cake", "bl", "ast", "tr", "ain", "st", "op", "fl", "ag", "ch", "ip", "sn", "ack"]
+COLORS = ["Red", "Blue", "Green", "Yellow"]
+
+def fake_words(rng, n, max_len=10):
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3)))[:max_len] for _ in range(n)]
+
+def fake_sentence(rng, n_words=8):
+    return " ".join(fake_words(rng, n_words)).capitalize() + rng.choice([".", "!", "?", ' said “Sam.”'])
+
+CONTENT_BUILDERS = {
+    "Decodable Story": lambda rng: {"title": fake_sentence(rng, 3), "paragraphs": [" ".join(fake_sentence(rng) for _ in range(5)) for _ in range(3)],
+                                    "questions": [{"q": fake_sentence(rng, 5), "a": fake_sentence(rng, 4)} for _ in range(3)]},
+    "Nonsense Word Fluency": lambda rng: {"words": fake_words(rng, 21, 5), "detective_task": [f"{i}. {fake_sentence(rng, 6)}" for i in range(1, 4)]},
+    "Word Bank Sort": lambda rng: {"sort_cats": {f"-{c}": fake_words(rng, 5) for c in ("at", "ap", "ip")}},
+    "Sentence Match": lambda rng: {"match_l": [fake_sentence(rng, 4)[:-1] for _ in range(5)], "match_r": [fake_sentence(rng, 4) for _ in range(5)]},
+    "Sound Mapping": lambda rng: {"map_words": fake_words(rng, 10, 6)},
+    "Detective Riddle Cards": lambda rng: {"riddles": [{"clue1": fake_sentence(rng, 4), "clue2": fake_sentence(rng, 4), "clue3": fake_sentence(rng, 4),
+                                                        "ans": fake_words(rng, 1)[0]} for _ in range(8)]},
+    "Mystery Grid (Color-by-Code)": lambda rng: {"mystery_grid": {"legend": {c: f"-{s}" for c, s in zip(COLORS, SYLLABLES)},
+                                                                  "color_words": {c: fake_words(rng, 8, 6) for c in COLORS}}},
+    "Phonics Word Search": lambda rng: {"word_search": fake_words(rng, 10)},
+    "Word Scramble": lambda rng: {"word_scramble": [{"word": w.upper(), "clue": fake_sentence(rng, 5)}
+                                                    for w in fake_words(rng, 8, 7)]},
+}
+
+def make_packet(n_activities, seed=0):
+    # Cycles through every activity type, so any packet of 9+ activities exercises each branch of the renderer.
+    rng = random.Random(seed)
+    types = list(CONTENT_BUILDERS)
+    return {"overview": " ".join(fake_sentence(rng) for _ in range(3)), "target_words": fake_words(rng, 10),
+            "activities": [{"type": types[i % len(types)], "content": CONTENT_BUILDERS[types[i % len(types)]](rng)} for i in range(n_activities)]}
+
+def model_outputs(packet):
+    # Raw model text as the JSON parse path sees it: clean, fenced, and the damage repair_model_json handles.
+    clean = json.dumps(packet, ensure_ascii=False)
+    pretty = json.dumps(packet, ensure_ascii=False, indent=2)
+    return {"clean": clean, "fenced": f"```json\n{pretty}\n```", "trailing_comma": pretty.replace('"\n', '",\n'),
+            "raw_newline": clean.replace(". ", ".\n"), "truncated": clean[:int(len(clean) * 0.8)]}
+
+# --- TIMING ---
+def bench(results, name, fn, repeat, **params):
+    fn(0) # warm-up; also fills lazily built indexes so they are not billed to the first run
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i + 1)
+        times.append((time.perf_counter() - start) * 1000)
+    row = {"name": name, "params": params, "repeat": repeat, "min_ms": min(times),
+           "median_ms": statistics.median(times), "mean_ms": statistics.fmean(times)}
+    results.append(row)
+    label = " ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{name:<28} {label:<34} {row['median_ms']:>10.3f} ms (min {row['min_ms']:.3f})", file=sys.stderr)
+    return row
+
+def git_commit():
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception: return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats, for a smoke run")
+    args = parser.parse_args()
+    repeat = 3 if args.quick else 15
+    engine = load_engine()
+    results = []
+
+    for size, n_words in WS_CASES:
+        lists = word_lists(repeat + 1, n_words, min(10, size))
+        bench(results, "build_word_search", lambda i: engine.build_compact_word_search(lists[i], size, random.Random(i)), repeat, size=size, words=n_words)
+        # Completeness next to the time: words placed, and lists with every word placed.
+        placed = [len(engine.build_compact_word_search(words, size, random.Random(i)).words) for i, words in enumerate(lists)]
+        results[-1]["placed"], results[-1]["complete"] = sum(placed) / (n_words * len(lists)), sum(p == n_words for p in placed) / len(lists)
+        print(f"{'':<28} {'placed words / complete lists':<34} {results[-1]['placed']:>10.1%} / {results[-1]['complete']:.0%}", file=sys.stderr)
+
+    for n in PACKET_SIZES:
+        packet = make_packet(n, seed=n)
+        # A fresh seed per run so word search grids are built, as for a newly generated packet.
+        bench(results, "parse_packet", lambda i: engine.parse_packet(packet), repeat, activities=n)
+        bench(results, "compile_layout", lambda i: engine.compile_layout(packet, seed=i), repeat, activities=n)
+        layout = engine.compile_layout(packet, seed=0)
+        # lean=False is the plain cell-by-cell output, kept as the before/after baseline for size and time.
+        for is_key in (False, True):
+            for lean in (False, True):
+                bench(results, "emit_pdf", lambda i: engine.emit_pdf(layout, is_key, lean), repeat, activities=n, layer="key" if is_key else "student", lean=lean)
+                results[-1]["pdf_bytes"] = len(engine.emit_pdf(layout, is_key, lean))
+            before, after = results[-2]["pdf_bytes"], results[-1]["pdf_bytes"]
+            print(f"{'':<28} {'pdf bytes plain -> lean':<34} {before:>10,} -> {after:,} ({1 - after / before:.1%} smaller)", file=sys.stderr)
+
+    bench(results, "generate_tracker_pdf", lambda i: engine.generate_tracker_pdf(), repeat)
+
+    big_text = " ".join(fake_sentence(random.Random(1)) + " **bold** it’s" for _ in range(20000))
+    bench(results, "clean_text", lambda i: engine.clean_text(big_text), repeat, chars=len(big_text))
+
+    scored = make_packet(9, seed=9)["activities"]
+    item = {"cat": "CVC (Short Vowels)", "sounds": ["Short A", "Short I"]}
+    bench(results, "score_activity", lambda i: [engine.score_activity(act, item) for act in scored], repeat, activities=len(scored))
+
+    # Memory rather than time: one session's plan and word search grids as the old dicts / lists of lists and compacted.
+    queue = [engine.QueueItem(t, "CVC (Short Vowels)", ["Short A", "Short I"]) for t in list(CONTENT_BUILDERS)[:5]]
+    grids = engine.build_word_searches(word_lists(3, 10, 10), engine.WS_GRID_DIM, seed=1)
+    legacy = {"build_queue": [{"type": q.type, "nonsense": q.nonsense, "id": str(uuid.uuid4()), "cat": q.cat, "sounds": list(q.sounds),
+                               "is_game": q.is_game} for q in queue],
+              "ws_grids": [([[ws.letter(r, c) for c in range(ws.size)] for r in range(ws.size)],
+                            [[ws.is_answer(r, c) for c in range(ws.size)] for r in range(ws.size)], list(ws.words)) for ws in grids]}
+    for part, compact in (("build_queue", queue), ("ws_grids", grids)):
+        before, after = engine.state_bytes(legacy[part]), engine.state_bytes(compact)
+        results.append({"name": "session_bytes", "params": {"part": part}, "legacy_bytes": before, "compact_bytes": after})
+        print(f"{'session_bytes':<28} {part + ' bytes legacy -> compact':<34} {before:>10,} -> {after:,} ({1 - after / before:.1%} smaller)", file=sys.stderr)
+
+    for kind, raw in model_outputs(make_packet(10, seed=10)).items():
+        bench(results, "repair_model_json", lambda i: engine.repair_model_json(raw), repeat, input=kind, chars=len(raw))
+    stream_text = model_outputs(make_packet(50, seed=50))["clean"]
+    def feed_stream(i):
+        stream = engine.ActivityStreamParser()
+        for at in range(0, len(stream_text), 64): stream.feed(stream_text[at:at + 64])
+    bench(results, "ActivityStreamParser", feed_stream, repeat, activities=50, chunk=64)
+
+    # Packet library search in a throwaway database of synthetic 9-activity packets.
+    n_saved = 200 if args.quick else 1000
+    plan = {"grade": "1st", "r_level": "Beginning", "theme": "None (Standard)",
+            "queue": [{"type": t, "cat": "CVC (Short Vowels)", "sounds": ["Short A"], "nonsense": False} for t in CONTENT_BUILDERS]}
+    with tempfile.TemporaryDirectory() as tmp:
+        library = engine.library.PacketLibrary(os.path.join(tmp, "library.sqlite3"), n_saved)
+        for n in range(n_saved): library.add(plan, make_packet(9, seed=1000 + n), n)
+        for query in ("", "cat", "ship cake"):
+            bench(results, "library_search", lambda i: library.search(query), repeat, packets=n_saved, query=query or "(newest)")
+        library._db.close()
+
+    report = {"meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "commit": git_commit(), "python": platform.python_version(),
+                       "platform": platform.platform(), "packet_layout_version": engine.PACKET_LAYOUT_VERSION, "repeat": repeat},
+              "results": results}
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f: json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
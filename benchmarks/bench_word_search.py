@@ -0,0 +1,71 @@
+"""Word search engine: legacy random-retry placement vs. the indexed backtracking engine.
+
+Run from the repo root:  python benchmarks/bench_word_search.py
+"""
+import os, random, string, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def load_engine():
+    import winphonics # headless: no Streamlit, and fpdf / google.generativeai load only when used
+    return winphonics
+
+def legacy_build_word_search(words, size=15, rng=random):
+    # The pre-rewrite engine: 200 random (direction, row, col) tries per word, silent drops.
+    grid = [['' for _ in range(size)] for _ in range(size)]
+    ans_grid = [[False for _ in range(size)] for _ in range(size)]
+    placed_words = []
+    words = sorted([w.upper().replace(" ", "") for w in words], key=len, reverse=True)
+    directions = [(0, 1), (1, 0), (1, 1), (-1, 1), (0, -1), (-1, 0), (-1, -1), (1, -1)]
+    for word in words:
+        placed = False
+        attempts = 0
+        while not placed and attempts < 200:
+            dr, dc = rng.choice(directions)
+            r = rng.randint(0, size - 1)
+            c = rng.randint(0, size - 1)
+            if 0 <= r + (len(word) - 1) * dr < size and 0 <= c + (len(word) - 1) * dc < size:
+                can_place = True
+                for i in range(len(word)):
+                    if grid[r + i * dr][c + i * dc] not in ('', word[i]):
+                        can_place = False
+                        break
+                if can_place:
+                    for i in range(len(word)):
+                        grid[r + i * dr][c + i * dc] = word[i]
+                        ans_grid[r + i * dr][c + i * dc] = True
+                    placed = True
+            attempts += 1
+        if placed: placed_words.append(word)
+    for r in range(size):
+        for c in range(size):
+            if grid[r][c] == '': grid[r][c] = rng.choice(string.ascii_uppercase)
+    return grid, ans_grid, placed_words
+
+def word_lists(count, n_words, max_len, seed=7):
+    rng = random.Random(seed)
+    return [["".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, max_len))) for _ in range(n_words)]
+            for _ in range(count)]
+
+def measure(fn, lists, size):
+    placed = total = complete = 0
+    start = time.perf_counter()
+    for i, words in enumerate(lists):
+        got = fn(words, size, random.Random(i))
+        placed += len(got); total += len(words); complete += len(got) == len(words)
+    return (time.perf_counter() - start) / len(lists) * 1000, placed / total, complete / len(lists)
+
+def main():
+    engine = load_engine()
+    head = lambda name: f"{name + ' ms':>14} {'words':>7} {'lists':>6}"
+    print(f"{'grid':>6} {'words':>6} | {head('legacy')} | {head('engine')}")
+    for size, n_words in [(15, 10), (15, 20), (15, 30), (15, 40), (20, 30), (20, 60), (25, 60), (25, 90)]:
+        lists = word_lists(30, n_words, min(10, size))
+        engine.build_compact_word_search(["WARMUPWORDS"[:n] for n in range(1, min(10, size) + 1)], size, random.Random(0)) # path index, once per process
+        legacy = measure(lambda *a: legacy_build_word_search(*a)[2], lists, size)
+        new = measure(lambda *a: engine.build_compact_word_search(*a).words, lists, size)
+        cols = " | ".join(f"{ms:>14.2f} {words:>7.1%} {full:>6.0%}" for ms, words, full in (legacy, new))
+        print(f"{size:>3}x{size:<2} {n_words:>6} | {cols}")
+
+if __name__ == "__main__":
+    main()
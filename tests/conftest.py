@@ -0,0 +1,4 @@
+# Tests import the winphonics package from the repo root, whichever directory pytest is started from.
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
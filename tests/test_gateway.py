@@ -0,0 +1,78 @@
+# --- GATEWAY COALESCING: what a follower gets when the leader succeeds, fails or is interrupted ---
+import threading
+
+import pytest
+
+from winphonics import gencache
+from winphonics.gateway import GenerationGateway
+
+class Interrupted(BaseException): pass # stands in for Streamlit's StopException / RerunException
+
+def _gateway(): return GenerationGateway(lambda: None, 1, 60, 10**6)
+
+def _follow(gw, key, work, started):
+    # Starts a leader running `work` on another thread, then joins it from this one once it is in flight.
+    out = {}
+    def lead():
+        try: out["leader"] = gw.shared(key, work)
+        except BaseException as e: out["leader"] = e
+    t = threading.Thread(target=lead); t.start()
+    started.wait()
+    try: out["follower"] = gw.shared(key, lambda: "follower ran")
+    except BaseException as e: out["follower"] = e
+    t.join()
+    return out
+
+def test_follower_shares_result():
+    gw, started, release = _gateway(), threading.Event(), threading.Event()
+    def work(): started.set(); release.wait(); return "packet"
+    threading.Timer(0.05, release.set).start()
+    out = _follow(gw, "k", work, started)
+    assert out == {"leader": "packet", "follower": "packet"}
+    assert gw.stats()["coalesced"] == 1 and gw.stats()["in_flight_plans"] == 0
+
+def test_follower_shares_exception():
+    gw, started, release = _gateway(), threading.Event(), threading.Event()
+    def work(): started.set(); release.wait(); raise ValueError("bad json")
+    threading.Timer(0.05, release.set).start()
+    out = _follow(gw, "k", work, started)
+    assert isinstance(out["leader"], ValueError) and out["follower"] is out["leader"]
+
+def test_follower_retries_after_leader_interrupt():
+    gw, started, release = _gateway(), threading.Event(), threading.Event()
+    def work(): started.set(); release.wait(); raise Interrupted()
+    threading.Timer(0.05, release.set).start()
+    out = _follow(gw, "k", work, started)
+    assert isinstance(out["leader"], Interrupted)
+    assert out["follower"] == "follower ran"
+    assert gw.stats()["in_flight_plans"] == 0
+
+def test_leader_interrupt_alone():
+    gw = _gateway()
+    with pytest.raises(Interrupted): gw.shared("k", lambda: (_ for _ in ()).throw(Interrupted()))
+    assert gw.shared("k", lambda: 1) == 1
+
+def test_leader_streams_live_and_followers_replay(tmp_path, monkeypatch):
+    # The leader's on_activity fires while its generation is still running; a session that joined it gets a replay.
+    events, started, release = [], threading.Event(), threading.Event()
+    def run_generation(grade, r_level, theme, queue, on_activity=None, fast=False):
+        acts = [{"type": item["type"], "content": {"n": i}} for i, item in enumerate(queue)]
+        for act in acts:
+            if on_activity: on_activity(act)
+        started.set(); release.wait(5)
+        events.append("generated")
+        return {"overview": "", "target_words": [], "activities": acts}, 0
+    monkeypatch.setattr(gencache, "run_generation", run_generation)
+    monkeypatch.setattr(gencache, "get_generation_cache", lambda: gencache.GenerationCache(str(tmp_path / "gen.sqlite3"), 1, 3600, 10))
+    queue = [{"type": "Phonics Word Search", "cat": "CVC (Short Vowels)", "sounds": ["Short A"]},
+             {"type": "Sound Mapping", "cat": "CVC (Short Vowels)", "sounds": ["Short A"]}]
+    out = {}
+    def call(who):
+        out[who] = gencache.generate_with_cache("1st", "Beginning", "Animals", queue, lambda act: events.append(who))
+    leader = threading.Thread(target=call, args=("leader",)); leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call, args=("follower",)); follower.start()
+    threading.Timer(0.05, release.set).start()
+    leader.join(); follower.join()
+    assert events == ["leader", "leader", "generated", "follower", "follower"]
+    assert out["follower"][0] == out["leader"][0] and out["follower"][0] is not out["leader"][0]
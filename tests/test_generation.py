@@ -0,0 +1,76 @@
+# --- MODEL OUTPUT PARSING: ActivityStreamParser and repair_model_json ---
+import json
+
+import pytest
+
+from winphonics.generation import ActivityStreamParser, repair_model_json
+
+PACKET = {"overview": "Practice short a.", "target_words": ["cat", "map"],
+          "activities": [{"type": "Sound Mapping", "content": {"map_words": ["cat", "map"]}},
+                         {"type": "Word Bank Sort", "content": {"sort_cats": {"-at": ["cat", "hat"], "-ap": ["map", "cap"]}}},
+                         {"type": "Decodable Story", "content": {"title": "Sam's \"Big\" Day", "paragraphs": ["A cat {sat}.", "It ran]."]}}]}
+
+def feed_all(text, size):
+    parser, closed = ActivityStreamParser(), []
+    for at in range(0, len(text), size): closed += parser.feed(text[at:at + size])
+    return parser, closed
+
+@pytest.mark.parametrize("size", [1, 7, 64, 100000])
+def test_stream_parser_yields_each_activity_once_whatever_the_chunking(size):
+    parser, closed = feed_all(json.dumps(PACKET, indent=2), size)
+    assert closed == PACKET["activities"] == parser.activities
+    assert parser.fields["overview"] == PACKET["overview"]
+    assert parser.fields["target_words"] == PACKET["target_words"]
+
+def test_stream_parser_ignores_brackets_and_quotes_inside_strings():
+    _, closed = feed_all(json.dumps(PACKET), 5)
+    assert closed[2]["content"]["title"] == "Sam's \"Big\" Day"
+
+def test_stream_parser_partial_packet_keeps_only_closed_activities():
+    text = json.dumps(PACKET)
+    parser, _ = feed_all(text[:text.index("Decodable Story")], 16)
+    partial = parser.partial_packet()
+    assert partial["overview"] == PACKET["overview"]
+    assert partial["activities"] == PACKET["activities"][:2]
+
+def test_repair_clean_json_is_ok():
+    assert repair_model_json(json.dumps(PACKET)) == (PACKET, "ok")
+
+def test_repair_strips_code_fences():
+    assert repair_model_json(f"```json\n{json.dumps(PACKET)}\n```") == (PACKET, "ok")
+
+@pytest.mark.parametrize("text, fixes", [
+    ('Sure! Here is your packet: {"a": 1}', "preamble"),
+    ('{"a": 1}\nLet me know if you\'d like changes!', "trailing_text"),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', "trailing_comma"),
+    ("{'a': 'it\\'s \"ok\"'}", "single_quotes"),
+    ('{"a": "line one\nline two"}', "raw_newline"),
+    ('{"a": True, "b": None, "c": "True"}', "python_literal"),
+    ('Here you go: {"a": [1,]}', "preamble+trailing_comma"),
+])
+def test_repair_labels_successful_fixes(text, fixes):
+    parsed, failure = repair_model_json(text)
+    assert parsed is not None
+    assert failure == fixes
+
+def test_repair_never_labels_a_parsed_object_as_a_failure():
+    for text in ['x {"a": 1}', '{"a": 1} x', "{'a': 1}"]:
+        parsed, failure = repair_model_json(text)
+        assert parsed is not None and failure not in ("unparseable", "truncated", "not_json")
+
+def test_repair_single_quotes_keep_escaped_and_double_quotes():
+    assert repair_model_json("{'a': 'it\\'s \"ok\"'}")[0] == {"a": "it's \"ok\""}
+
+def test_repair_python_literals_and_string_contents():
+    parsed, _ = repair_model_json('{"a": True, "b": None, "c": "True None"}')
+    assert parsed == {"a": True, "b": None, "c": "True None"}
+
+def test_repair_salvages_complete_activities_from_a_truncated_packet():
+    text = json.dumps(PACKET)
+    parsed, failure = repair_model_json(text[:text.index("Decodable Story") + 5])
+    assert failure == "truncated"
+    assert parsed["activities"] == PACKET["activities"][:2]
+
+@pytest.mark.parametrize("text, failure", [("no json here", "not_json"), ('{"a": 1', "truncated"), ('{"a": }', "unparseable")])
+def test_repair_failures(text, failure):
+    assert repair_model_json(text) == (None, failure)
@@ -0,0 +1,75 @@
+# --- LOCAL LEXICON: every index row on target, free of known negatives, rebuilt from words.txt; nonsense words kept unreal ---
+import random
+
+import pytest
+
+from winphonics.catalog import GRADE_LEVELS, PHONICS_MENU
+from winphonics.lexicon import LEXICON_PATH, build_lexicon, build_local_activity, is_real_or_blocked
+from winphonics.phonics import MATCHERS, on_target
+from test_phonics import CASES
+
+# Words that used to be filed under these targets, on top of the matcher negatives in CASES.
+LEXICON_NEGATIVES = {
+    ("CVC (Short Vowels)", "Short A"): "baby",
+    ("Endings", "ed"): "bed red fed led wed shed sled seaweed",
+    ("Endings", "ing"): "ring sing king wing",
+    ("Endings", "s"): "gas yes bus plus this boxes foxes",
+    ("Endings", "est"): "vest nest best rest chest forest harvest",
+    ("Endings", "er"): "her tiger paper spider corner number sister winter",
+    ("Multisyllable", "open"): "whale smile hole mule rule boxes foxes buses forest",
+    ("Multisyllable", "silent e"): "whale smile hole mule rule",
+    ("Multisyllable", "closed/closed"): "wishes rested jumping coldest enjoy rainbow mailbox",
+    ("Magic E (CVCe)", "a-e"): "played",
+    ("Magic E (CVCe)", "i-e"): "noise voice",
+    ("Magic E (CVCe)", "o-e"): "boxes foxes",
+    ("Magic E (CVCe)", "u-e"): "buses house mouse sauce cause",
+    ("Predictable Vowel Teams", "Long O (oa, ow)"): "cow how now owl town brown clown crown down gown",
+    ("Variant Vowel Teams", "/aw/ (au, aw)"): "seaweed",
+    ("Vowel r", "er"): "zero",
+}
+
+def _rows():
+    with open(LEXICON_PATH, encoding="utf-8") as f:
+        return [(cat, target, grade, words.split()) for cat, target, grade, words in (line.rstrip("\n").split("\t") for line in f)]
+
+ROWS = _rows()
+
+@pytest.mark.parametrize("cat, target, grade, words", ROWS, ids=["/".join(r[:3]) for r in ROWS])
+def test_row_words_on_target(cat, target, grade, words):
+    assert [w for w in words if not on_target(w, (MATCHERS[(cat, target)],))] == []
+
+@pytest.mark.parametrize("cat, target, grade, words", ROWS, ids=["/".join(r[:3]) for r in ROWS])
+def test_row_free_of_known_negatives(cat, target, grade, words):
+    negatives = set(CASES[(cat, target)][1].split()) | set(LEXICON_NEGATIVES.get((cat, target), "").split())
+    assert sorted(negatives.intersection(words)) == []
+
+def test_negatives_name_real_targets():
+    assert set(LEXICON_NEGATIVES) <= set(MATCHERS)
+
+def test_lexicon_is_rebuilt(tmp_path):
+    # lexicon.tsv is generated; a matcher or words.txt change must come with a rebuild.
+    path = tmp_path / "lexicon.tsv"
+    build_lexicon(path=str(path))
+    with open(LEXICON_PATH, encoding="utf-8") as f: assert path.read_text(encoding="utf-8") == f.read()
+
+# --- NONSENSE WORDS: onset swaps that land on real or unsafe words never reach a page ---
+KNOWN_REAL = set("vast swab has hash flab fab mid slid fist crop shot loft prom wade chase sate shame swamp broad".split())
+
+def _nonsense_words(cat, target):
+    words = set()
+    for grade in GRADE_LEVELS[:3]:
+        for seed in range(3):
+            item = {"type": "Nonsense Word Fluency", "cat": cat, "sounds": [target]}
+            content = build_local_activity(item, grade, "Advanced", random.Random(seed))
+            if content: words.update(content["content"]["words"])
+    return words
+
+@pytest.mark.parametrize("cat, target", [(c, t) for c in PHONICS_MENU for t in PHONICS_MENU[c]])
+def test_nonsense_words_are_not_real_or_blocked(cat, target):
+    words = _nonsense_words(cat, target)
+    assert sorted(KNOWN_REAL & words) == [] and [w for w in words if is_real_or_blocked(w)] == []
+
+@pytest.mark.parametrize("word, expected", [("vast", True), ("vasts", True), ("dong", True), ("fucks", True), ("japs", True),
+                                            ("hubbed", True), ("blap", False), ("plass", False), ("chesh", False)])
+def test_is_real_or_blocked(word, expected):
+    assert is_real_or_blocked(word) is expected
@@ -0,0 +1,60 @@
+# --- PACKET PARSING: malformed model JSON is dropped or clamped, never crashes the render ---
+import pytest
+
+from winphonics.packet import (DEFAULT_OVERVIEW, MAX_MYSTERY_COLORS, MAX_NONSENSE_WORDS, MAX_RIDDLES, MAX_SCRAMBLES, Packet,
+                               parse_packet)
+from winphonics.render import render_pdf
+from winphonics.wordsearch import WS_MAX_WORDS
+
+def _content(type_, content):
+    return parse_packet({"activities": [{"type": type_, "content": content}]}).activities[0].content
+
+MALFORMED = [
+    ("Decodable Story", {"title": ["x"], "paragraphs": "one long string", "questions": 5}),
+    ("Decodable Story", {"questions": [5, "q", {"q": "Who?", "a": "Sam"}]}),
+    ("Nonsense Word Fluency", {"words": "bap", "detective_task": {"1": "read"}}),
+    ("Word Bank Sort", {"sort_cats": ["short a", "long a"]}),
+    ("Word Bank Sort", {"sort_cats": {"short a": "cat", "": ["x"]}}),
+    ("Sentence Match", {"match_l": None, "match_r": 5}),
+    ("Sound Mapping", {"map_words": True}),
+    ("Detective Riddle Cards", {"riddles": 5}),
+    ("Detective Riddle Cards", {"riddles": ["clue", {"clue1": 1, "ans": None}]}),
+    ("Mystery Grid (Color-by-Code)", {"mystery_grid": 5}),
+    ("Mystery Grid (Color-by-Code)", {"mystery_grid": {"legend": ["Red"], "color_words": {"Red": "cat"}}}),
+    ("Phonics Word Search", {"word_search": "cat dog"}),
+    ("Word Scramble", {"word_scramble": 5}),
+    ("Word Scramble", {"word_scramble": [{"clue": "no word"}, "cat"]}),
+]
+
+@pytest.mark.parametrize("type_, content", MALFORMED, ids=[f"{t}-{i}" for i, (t, _) in enumerate(MALFORMED)])
+def test_malformed_fields_parse_and_render(type_, content):
+    packet = parse_packet({"activities": [{"type": type_, "content": content}]})
+    assert len(packet.activities) == 1
+    assert render_pdf(packet)[:4] == b"%PDF"
+
+def test_malformed_fields_are_dropped():
+    assert _content("Decodable Story", {"paragraphs": "one long string", "questions": 5}).paragraphs == ()
+    assert _content("Decodable Story", {"questions": [5, {"q": "Who?", "a": "Sam"}]}).questions == (("Who?", "Sam"),)
+    assert _content("Detective Riddle Cards", {"riddles": 5}).riddles == ()
+    assert _content("Word Scramble", {"word_scramble": [{"clue": "no word"}, "cat", {"word": "cat"}]}).items == (("cat", ""),)
+    assert _content("Word Bank Sort", {"sort_cats": ["short a"]}).columns == ()
+    assert _content("Mystery Grid (Color-by-Code)", {"mystery_grid": {"color_words": {"Red": ["cat"]}}}).legend == (("Red", ""),)
+
+def test_quantity_clamps():
+    words = [f"w{i}" for i in range(40)]
+    assert len(_content("Nonsense Word Fluency", {"words": words}).words) == MAX_NONSENSE_WORDS == 21
+    assert len(_content("Detective Riddle Cards", {"riddles": [{"ans": w} for w in words]}).riddles) == MAX_RIDDLES == 8
+    assert len(_content("Word Scramble", {"word_scramble": [{"word": w} for w in words]}).items) == MAX_SCRAMBLES == 8
+    legend = {c: "a" for c in ["Red", "Blue", "Green", "Yellow", "Purple", "Orange"]}
+    assert len(_content("Mystery Grid (Color-by-Code)", {"mystery_grid": {"legend": legend}}).legend) == MAX_MYSTERY_COLORS == 4
+    assert len(_content("Phonics Word Search", {"word_search": words}).words) == WS_MAX_WORDS == 10
+
+@pytest.mark.parametrize("data", [None, 5, "packet", [], {}, {"activities": 5}, {"activities": "Word Scramble"},
+                                  {"activities": [5, None, {"content": {"words": ["bap"]}}, {"type": "Nonsense Word Fluency"},
+                                                  {"type": "Nonsense Word Fluency", "content": "bap"}, {"type": "Crossword", "content": {}}]}])
+def test_missing_type_or_content_is_dropped(data):
+    assert parse_packet(data) == Packet(DEFAULT_OVERVIEW, (), ())
+
+def test_packet_passes_through():
+    packet = parse_packet({"overview": " Hi ", "target_words": ["cat", 5, "", None], "activities": []})
+    assert packet == Packet("Hi", ("cat", "5"), ()) and parse_packet(packet) is packet
@@ -0,0 +1,80 @@
+# --- PHONICS MATCHERS: known words on and off each target ---
+import pytest
+
+from winphonics.phonics import MATCHERS, on_target, segment_word, syllables
+
+# (category, target): (words on target, known negatives: near misses the model and the word list produce)
+CASES = {
+    ("CVC (Short Vowels)", "Short A"): ("cat map flag trap bath", "baby lady ball talk salt cake car"),
+    ("CVC (Short Vowels)", "Short E"): ("bed pet sled held nest", "he bee her few key"),
+    ("CVC (Short Vowels)", "Short I"): ("pig fish ship milk", "high night light right sight might tight fight bright flight kind wild"),
+    ("CVC (Short Vowels)", "Short O"): ("dog mop frog doll", "cold bolt go cow for"),
+    ("CVC (Short Vowels)", "Short U"): ("bug cup drum duck", "cute fur blue"),
+    ("CVC (Short Vowels)", "Mixed Short Vowels"): ("cat bed pig dog bug", "baby night cold ball"),
+    ("Consonant Digraphs", "sh"): ("ship fish wash", "cat sip"),
+    ("Consonant Digraphs", "ch"): ("chip lunch", "cat hip"),
+    ("Consonant Digraphs", "th"): ("thin bath", "tin bat"),
+    ("Consonant Digraphs", "wh"): ("whale when", "wet hen"),
+    ("Consonant Digraphs", "ck"): ("duck sock", "dusk cake"),
+    ("Consonant Digraphs", "Mixed Digraphs"): ("ship chip thin phone ring", "cat dog"),
+    ("Consonant Blends", "L-Blends"): ("flag clap plum slid", "lap fig"),
+    ("Consonant Blends", "R-Blends"): ("frog crab drum", "rob fog"),
+    ("Consonant Blends", "S-Blends"): ("stop snap swim", "sip ship"),
+    ("Consonant Blends", "Final Blends"): ("hand lamp nest milk", "hat cap"),
+    ("Magic E (CVCe)", "a-e"): ("cake made whale cakes baked", "played have car cat"),
+    ("Magic E (CVCe)", "i-e"): ("bike smile ride kites", "noise voice give fish"),
+    ("Magic E (CVCe)", "o-e"): ("home hole rope nose", "boxes foxes more come some love"),
+    ("Magic E (CVCe)", "u-e"): ("cute mule rule tube", "buses house mouse sauce cause cure"),
+    ("Magic E (CVCe)", "Mixed Magic E"): ("cake bike home cute", "played house boxes noise have"),
+    ("Vowel r", "ar"): ("car farm care", "cat"),
+    ("Vowel r", "or"): ("fork corn", "fox"),
+    ("Vowel r", "er"): ("her fern", "hen zero very"),
+    ("Vowel r", "ir"): ("bird girl", "big"),
+    ("Vowel r", "ur"): ("fur burn", "fun"),
+    ("Vowel r", "Mixed Vowel r"): ("car her bird fork fur", "cat zero"),
+    ("Predictable Vowel Teams", "Long A (ai, ay)"): ("rain play snail", "said hair cat"),
+    ("Predictable Vowel Teams", "Long E (ee, ea)"): ("tree seat sea", "head bread deer bear great"),
+    ("Predictable Vowel Teams", "Long O (oa, ow)"): ("boat snow grow bowl", "cow how now owl town brown clown crown down gown board"),
+    ("Predictable Vowel Teams", "Long I (igh, ie)"): ("night pie tied flies", "field chief babies friend"),
+    ("Variant Vowel Teams", "/ow/ (ou, ow)"): ("out house cow clown towels", "snow grow you soup touch"),
+    ("Variant Vowel Teams", "/oy/ (oi, oy)"): ("coin boy toys", "doing going"),
+    ("Variant Vowel Teams", "/oo/ (oo, ew)"): ("moon spoon new", "book look good door"),
+    ("Variant Vowel Teams", "/aw/ (au, aw)"): ("saw haul crawl awful drawing", "seaweed away awake laugh"),
+    ("Multisyllable", "closed/closed"): ("rabbit napkin sunset", "cat table farmer mailbox enjoy rainbow wishes rested jumping bigger coldest"),
+    ("Multisyllable", "silent e"): ("cupcake invite reptile", "whale smile hole mule rule boxes foxes buses"),
+    ("Multisyllable", "open"): ("music paper robot tiger", "whale smile hole mule rule boxes foxes buses"),
+    ("Multisyllable", "vowel team"): ("rainbow seaweed", "rain boat"),
+    ("Multisyllable", "consonant le"): ("table apple puzzle", "whale smile hole mule"),
+    ("Multisyllable", "vowel r"): ("garden number", "car zero"),
+    ("Endings", "ed"): ("jumped played hoped cried", "bed red fed led wed shed sled seaweed"),
+    ("Endings", "ing"): ("jumping running flying", "ring sing king wing thing bring"),
+    ("Endings", "s"): ("cats dogs bees toys", "gas yes bus plus this dress has was boxes wishes babies"),
+    ("Endings", "es"): ("boxes wishes buses babies cries", "yes cakes"),
+    ("Endings", "er"): ("teacher bigger farmer", "her deer"),
+    ("Endings", "est"): ("biggest fastest", "vest nest best rest chest"),
+}
+
+def test_every_target_has_cases():
+    assert set(MATCHERS) == set(CASES)
+
+@pytest.mark.parametrize("key", sorted(CASES))
+def test_words_on_target(key):
+    assert [w for w in CASES[key][0].split() if not on_target(w, (MATCHERS[key],))] == []
+
+@pytest.mark.parametrize("key", sorted(CASES))
+def test_known_negatives_off_target(key):
+    assert [w for w in CASES[key][1].split() if on_target(w, (MATCHERS[key],))] == []
+
+@pytest.mark.parametrize("word, n", [("whale", 1), ("smile", 1), ("rule", 1), ("table", 2), ("apple", 2), ("cakes", 1),
+                                     ("boxes", 2), ("jumped", 1), ("skated", 2), ("cupcake", 2), ("music", 2)])
+def test_syllables(word, n):
+    assert syllables(word) == n
+
+@pytest.mark.parametrize("word, sounds", [("night", ("n", "igh", "t")), ("cake", ("c", "a_e", "k")),
+                                          ("jumped", ("j", "u", "m", "p", "ed")), ("sled", ("s", "l", "e", "d")),
+                                          ("cakes", ("c", "a_e", "k", "s")), ("kites", ("k", "i_e", "t", "s")),
+                                          ("tables", ("t", "a", "b", "le", "s")), ("hoped", ("h", "o_e", "p", "ed")),
+                                          ("baked", ("b", "a_e", "k", "ed")), ("boxes", ("b", "o", "x", "es")),
+                                          ("wishes", ("w", "i", "sh", "es")), ("skated", ("s", "k", "a_e", "t", "ed")), ("hopped", ("h", "o", "pp", "ed")), ("dress", ("d", "r", "e", "ss"))])
+def test_segment_word(word, sounds):
+    assert segment_word(word) == sounds
@@ -0,0 +1,14 @@
+# --- RENDER POOL: a blocking download never raises because the queue is slow ---
+from concurrent.futures import Future
+
+from winphonics import render_pool
+from winphonics.render import packet_cache_key
+
+PACKET = {"activities": [{"type": "Word Scramble", "content": {"word_scramble": [{"word": "cake", "clue": "a treat"}]}}]}
+
+def test_timed_out_wait_renders_inline(monkeypatch):
+    pool = render_pool.RenderPool(1, 4)
+    pool._inflight[packet_cache_key(PACKET, False, 7)] = Future() # a queued job that never finishes
+    monkeypatch.setattr(render_pool, "get_render_pool", lambda: pool)
+    assert render_pool.render_packet_pdf(PACKET, 7, False, timeout=0.05)[:4] == b"%PDF"
+    assert pool.stats()["timed_out"] == 1
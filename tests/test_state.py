@@ -0,0 +1,41 @@
+# --- SESSION DERIVED DATA: lazy PDF builds under concurrent clicks ---
+import threading, time
+
+from winphonics.state import SessionDerived
+
+class Interrupted(BaseException): pass
+
+def _clicks(data, n):
+    out = []
+    def click():
+        try: out.append(data())
+        except BaseException as e: out.append(e)
+    threads = [threading.Thread(target=click) for _ in range(n)]
+    for t in threads: t.start(); time.sleep(0.01)
+    for t in threads: t.join()
+    return out
+
+def test_concurrent_clicks_build_once():
+    d, calls = SessionDerived(), []
+    d.offer(1, ("student", "key"))
+    def build(): calls.append(1); time.sleep(0.1); return b"pdf"
+    out = _clicks(d.lazy(1, "student", build), 4)
+    assert len(calls) == 1 and all(o is out[0] for o in out)
+    assert d.built == 1 and d.never_built() == 1 and d.pdfs == {"student": b"pdf"}
+
+def test_interrupted_build_is_retried_by_the_next_click():
+    d, calls = SessionDerived(), []
+    d.offer(1, ("student",))
+    def build():
+        calls.append(1); time.sleep(0.1)
+        if len(calls) == 1: raise Interrupted()
+        return b"pdf"
+    out = _clicks(d.lazy(1, "student", build), 2)
+    assert isinstance(out[0], Interrupted) and out[1] == b"pdf" and len(calls) == 2
+
+def test_stale_revision_is_not_memoized():
+    d = SessionDerived()
+    d.offer(1, ("student",))
+    data = d.lazy(1, "student", lambda: b"old")
+    d.offer(2, ("student",))
+    assert data() == b"old" and d.pdfs == {} and d.evict() == 0
@@ -0,0 +1,23 @@
+# --- WORD SEARCH: the (grid, ans_grid, placed_words) contract and the compact grids behind the batches ---
+import random
+
+from winphonics.wordsearch import build_compact_word_search, build_word_search, build_word_searches
+
+WORDS = ["cake", "bike", "home", "cute", "whale", "smile"]
+
+def test_build_word_search_keeps_the_tuple():
+    grid, ans_grid, placed = build_word_search(WORDS, 15, random.Random(1))
+    assert len(grid) == len(ans_grid) == 15 and all(len(row) == 15 for row in grid + ans_grid)
+    assert all(isinstance(ch, str) and len(ch) == 1 and ch.isupper() for row in grid for ch in row)
+    assert all(isinstance(cell, bool) for row in ans_grid for cell in row)
+    assert isinstance(placed, list) and sorted(placed) == sorted(w.upper() for w in WORDS)
+
+def test_tuple_matches_compact_grid():
+    grid, ans_grid, placed = build_word_search(WORDS, 15, random.Random(1))
+    ws = build_compact_word_search(WORDS, 15, random.Random(1))
+    assert grid == [[ws.letter(r, c) for c in range(15)] for r in range(15)]
+    assert ans_grid == [[ws.is_answer(r, c) for c in range(15)] for r in range(15)] and placed == list(ws.words)
+
+def test_batches_are_compact_and_cached():
+    first, second = build_word_searches([WORDS], seed=3), build_word_searches([WORDS], seed=3)
+    assert first[0] is second[0] and set(first[0].words) == {w.upper() for w in WORDS}
@@ -0,0 +1,19 @@
+# --- WIN TIME PHONICS ENGINE ---
+# Everything the Streamlit page, the CLI, batch workers and benchmarks share: word search, PDF layout and
+# rendering, Gemini generation and the process-wide caches. Importing it never starts a UI, and
+# google.generativeai / fpdf are only imported once something actually calls them.
+from .catalog import CORE_ACTIVITIES, DIFFICULTIES, GAME_ACTIVITIES, GRADE_LEVELS, PHONICS_MENU, THEMES
+from .util import clean_text, content_hash
+from .diagnostics import DIAG_DEFAULT, current_trace, get_diagnostics_log, laps, span, start_trace, stop_trace
+from .state import QueueItem, get_session_registry, state_bytes
+from .wordsearch import WS_GRID_DIM, WordSearch, build_compact_word_search, build_word_search, build_word_searches, packet_word_lists, word_search_words
+from .assets import generate_tracker_pdf, get_static_asset
+from .phonics import PHONICS_MIN_SCORE, score_activity, score_words
+from .gateway import generation_session
+from .generation import ActivityStreamParser, build_prompt, get_gateway, get_generation_stats, repair_model_json, run_generation
+from .gencache import generate_with_cache, get_generation_cache, normalize_plan
+from .packet import Packet, parse_packet
+from .library import get_packet_library, packet_text
+from .render import PACKET_LAYOUT_VERSION, compile_layout, emit_pdf, get_packet_pdfs, render_pdf
+from .render_pool import RENDER_TIMEOUT_S, get_render_pool, render_packet_pdf, request_packet_pdfs
+from .batch import BATCH_AUTO_MIX, BATCH_COLUMNS, BATCH_SEP, parse_roster, profile_queue, run_batch
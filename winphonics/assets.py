@@ -0,0 +1,85 @@
+# --- PDF HANDOUTS & STATIC ASSET CACHE (shared by every session in this process) ---
+import threading
+
+from .util import content_hash, singleton
+
+# Bump when the tracker drawing code changes so cached bytes are rebuilt.
+TRACKER_LAYOUT_VERSION = 1
+TRACKER_SKILLS = [
+    ("Letter Names & Sounds", False), ("Short Vowels (CVC)", False),
+    ("Consonant Blends", False), ("Digraphs", False), ("Final Blends", False), ("Silent e (CVCe)", False),
+    ("Vowel Teams", False), ("R-Controlled Vowels", False),
+    ("MULTISYLLABLE", True), ("   - closed/closed", False), ("   - silent e", False), 
+    ("   - open", False), ("   - vowel team", False), ("   - consonant le", False), ("   - vowel r", False),
+    ("ENDINGS", True), ("   - ed", False), ("   - ing", False), ("   - s", False), 
+    ("   - es", False), ("   - er", False), ("   - est", False),
+    ("High-Frequency Words", False)
+]
+
+def generate_tracker_pdf(skills=TRACKER_SKILLS):
+    from fpdf import FPDF # imported on first build, so importing the package stays cheap
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 20)
+    pdf.cell(0, 15, "Skill Mastery Tracker", ln=True, align="C")
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.cell(0, 10, "Student: _________________________________", ln=True)
+    pdf.ln(5)
+    
+    pdf.set_fill_color(220, 230, 245)
+    pdf.cell(100, 10, " Phonics Skill", 1, 0, 'L', fill=True)
+    pdf.cell(30, 10, "Practice", 1, 0, 'C', fill=True)
+    pdf.cell(30, 10, "Pass-Off", 1, 0, 'C', fill=True)
+    pdf.cell(30, 10, "Initials", 1, 1, 'C', fill=True)
+    
+    row_count = 0
+    for s, is_h in skills:
+        if is_h:
+            pdf.set_font("Helvetica", "B", 11); pdf.set_fill_color(235, 235, 235)
+            pdf.cell(190, 8, f" {s}", 1, 1, 'L', fill=True); row_count = 0
+        else:
+            pdf.set_font("Helvetica", "", 10)
+            if row_count % 2 == 0: pdf.set_fill_color(250, 250, 250)
+            else: pdf.set_fill_color(255, 255, 255)
+            pdf.cell(100, 8, f" {s}", 1, 0, 'L', fill=True)
+            pdf.cell(30, 8, "", 1, 0, 'C', fill=True)
+            pdf.cell(30, 8, "", 1, 0, 'C', fill=True)
+            pdf.cell(30, 8, "", 1, 1, 'C', fill=True)
+            row_count += 1
+    return bytes(pdf.output())
+
+class StaticAssetCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, name, builder, params, version):
+        key = (name, content_hash(params, version))
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            data = builder(params)
+            self._entries[key] = data
+            self.builds += 1
+            return data
+
+    def stats(self):
+        with self._lock:
+            return {"builds": self.builds, "hits": self.hits, "entries": len(self._entries),
+                    "bytes": sum(len(v) for v in self._entries.values())}
+
+@singleton
+def get_asset_cache(): return StaticAssetCache()
+
+# name -> (builder, params, layout version). Register new parameter-only handouts here.
+STATIC_ASSETS = {
+    "skill_tracker": (generate_tracker_pdf, TRACKER_SKILLS, TRACKER_LAYOUT_VERSION),
+}
+
+def get_static_asset(name):
+    builder, params, version = STATIC_ASSETS[name]
+    return get_asset_cache().get(name, builder, params, version)
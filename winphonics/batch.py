@@ -0,0 +1,156 @@
+# --- CLASSROOM BATCH MODE (many groups, one job) ---
+import io, csv, zipfile, random, time, contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+from .catalog import CORE_ACTIVITIES, DIFFICULTIES, GAME_ACTIVITIES, GRADE_LEVELS, PHONICS_MENU, THEMES
+from .gencache import generate_with_cache, normalize_plan
+from .library import get_packet_library
+from .render import PACKET_LAYOUT_VERSION, PacketLayout, compile_layout
+from .render_pool import RENDER_TIMEOUT_S, request_layout_pdfs, request_packet_pdfs
+from .state import QueueItem
+from .util import clean_text, content_hash
+
+BATCH_CONCURRENCY = 3 # packets generating at once; each still fans out to at most FANOUT_CONCURRENCY Gemini calls
+BATCH_MAX_GROUPS = 40
+BATCH_COLUMNS = ["group", "grade", "difficulty", "category", "targets", "activities", "theme"]
+BATCH_SEP = ";" # separates targets / activities inside one cell
+BATCH_AUTO_MIX = (3, 2) # core activities, games picked for a row that leaves activities blank
+
+def _cell(value): return "" if value is None or value != value else str(value).strip() # None / NaN -> ""
+
+def _cell_list(value): return [v.strip() for v in _cell(value).split(BATCH_SEP) if v.strip()]
+
+def profile_queue(cat, targets, activities):
+    return [QueueItem(a, cat, targets) for a in activities]
+
+def parse_roster(rows, default_theme="None (Standard)"):
+    # rows: dicts keyed by BATCH_COLUMNS, from a CSV or the in-app table. Returns (profiles, problems);
+    # a row with an unknown grade, category, target or activity is reported and skipped, never guessed at.
+    profiles, problems, names = [], [], set()
+    for n, row in enumerate(rows, 1):
+        row = {_cell(k).lower(): _cell(v) for k, v in row.items()}
+        if not any(row.values()): continue
+        group = row.get("group") or f"Group {n}"
+        base, copy_no = group, 2
+        while group in names: group, copy_no = f"{base} ({copy_no})", copy_no + 1
+        grade, r_level = row.get("grade") or GRADE_LEVELS[0], row.get("difficulty") or DIFFICULTIES[0]
+        cat, theme = row.get("category", ""), row.get("theme") or default_theme
+        targets = _cell_list(row.get("targets")) or PHONICS_MENU.get(cat, [""])[:1]
+        activities = _cell_list(row.get("activities"))
+        if not activities:
+            pick = random.Random(group)
+            activities = pick.sample(list(CORE_ACTIVITIES), BATCH_AUTO_MIX[0]) + pick.sample(list(GAME_ACTIVITIES), BATCH_AUTO_MIX[1])
+        bad = ([f"grade '{grade}'"] if grade not in GRADE_LEVELS else []) + ([f"difficulty '{r_level}'"] if r_level not in DIFFICULTIES else [])
+        bad += [f"category '{cat}'"] if cat not in PHONICS_MENU else [f"target '{t}'" for t in targets if t not in PHONICS_MENU[cat]]
+        bad += [f"activity '{a}'" for a in activities if a not in CORE_ACTIVITIES and a not in GAME_ACTIVITIES]
+        bad += [f"theme '{theme}'"] if theme not in THEMES else []
+        if bad:
+            problems.append(f"Row {n} ({group}): unknown {', '.join(bad)}.")
+            continue
+        if len(profiles) == BATCH_MAX_GROUPS:
+            problems.append(f"Only the first {BATCH_MAX_GROUPS} groups are generated per batch.")
+            break
+        names.add(group)
+        profiles.append({"group": group, "grade": grade, "r_level": r_level, "theme": theme, "queue": profile_queue(cat, targets, activities)})
+    return profiles, problems
+
+def merge_layouts(labeled):
+    # One layout for the whole batch: each group's packet follows the last, its cover tagged with the group name.
+    merged = PacketLayout()
+    for label, layout in labeled:
+        cover = next(i for i, op in enumerate(layout.ops) if op[1] == "add_page") + 1
+        merged.ops.extend(layout.ops[:cover])
+        merged.set_font("Helvetica", "I", 9); merged.set_xy(15, 6)
+        merged.cell(0, 6, clean_text(f"Group: {label}").encode("latin-1", "replace").decode("latin-1"), align="R"); merged.set_xy(15, 15)
+        merged.ops.extend(layout.ops[cover:])
+    return merged
+
+def _render_state(outs):
+    # bytes / failed Future -> settled; pending Future / None (turned away by a full pool) -> not yet.
+    return all(isinstance(r, bytes) or (isinstance(r, Future) and r.done()) for r in outs)
+
+def _settled_pdf(r):
+    if isinstance(r, Future): return r.result() if r.done() and r.exception() is None else None
+    return r
+
+def _tick_renders(jobs):
+    # Re-requests anything the shared pool turned away; returns the futures still running.
+    for job in jobs.values():
+        if None in job["outs"]: job["outs"] = job["request"]()
+    return [r for job in jobs.values() for r in job["outs"] if isinstance(r, Future) and not r.done()]
+
+def _group_seed(seed, group): return int(content_hash(seed, group)[:8], 16)
+
+def _file_stem(name): return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name).strip("_") or "Group"
+
+def run_batch(profiles, seed, merged=False, on_progress=None):
+    # Generates every profile's packet, BATCH_CONCURRENCY at a time, and queues each on the shared render
+    # pool as soon as it arrives. Returns {"files": [(label, filename, bytes, mime)], "summary": [row]}.
+    total = len(profiles)
+    results = [{"group": p["group"], "seed": _group_seed(seed, p["group"]), "packet": None, "missing": len(p["queue"]), "cached": False} for p in profiles]
+    jobs = {}
+    generated = 0
+    def progress(msg):
+        rendered = sum(_render_state(job["outs"]) * job["groups"] for job in jobs.values())
+        if on_progress: on_progress(generated, rendered, total, msg)
+    
+    with ThreadPoolExecutor(BATCH_CONCURRENCY, thread_name_prefix="batch-gen") as executor:
+        futures = {executor.submit(contextvars.copy_context().run, generate_with_cache, p["grade"], p["r_level"], p["theme"], p["queue"]): i
+                   for i, p in enumerate(profiles)}
+        for fut in as_completed(futures):
+            res = results[futures[fut]]
+            try: res["packet"], res["missing"], res["cached"] = fut.result()
+            except Exception: pass
+            generated += 1
+            if res["packet"] is not None:
+                p = profiles[futures[fut]]
+                get_packet_library().add(normalize_plan(p["grade"], p["r_level"], p["theme"], p["queue"]), res["packet"], res["seed"])
+            if res["packet"] is not None and not merged:
+                request = lambda res=res: request_packet_pdfs(res["packet"], res["seed"])
+                jobs[futures[fut]] = {"request": request, "outs": request(), "groups": 1}
+            _tick_renders(jobs)
+            progress(f"{'✅' if res['packet'] is not None else '⚠️'} {res['group']}: {'generated' if res['packet'] is not None else 'generation failed'}")
+    
+    done = [r for r in results if r["packet"] is not None]
+    if merged and done:
+        keys = [content_hash("batch", [(r["group"], r["packet"], r["seed"]) for r in done], is_key, PACKET_LAYOUT_VERSION) for is_key in (False, True)]
+        request = lambda: request_layout_pdfs(keys, lambda: merge_layouts([(r["group"], compile_layout(r["packet"], r["seed"])) for r in done]))
+        jobs["merged"] = {"request": request, "outs": request(), "groups": len(done)}
+        progress("📚 Merging every packet into one student PDF and one key PDF...")
+    
+    # Wait for the renders, giving up only if nothing finishes for RENDER_TIMEOUT_S.
+    last_change, settled = time.perf_counter(), -1
+    while True:
+        running = _tick_renders(jobs)
+        now_settled = sum(_render_state(job["outs"]) for job in jobs.values())
+        if now_settled != settled:
+            settled, last_change = now_settled, time.perf_counter()
+            progress(f"🖨️ Rendered {settled} of {len(jobs)} PDF sets")
+        if settled == len(jobs) or time.perf_counter() - last_change > RENDER_TIMEOUT_S: break
+        if running: wait(running, timeout=0.25, return_when=FIRST_COMPLETED)
+        else: time.sleep(0.25)
+    
+    files, summary = [], []
+    merged_pdfs = [_settled_pdf(r) for r in jobs["merged"]["outs"]] if "merged" in jobs else [None, None]
+    for i, res in enumerate(results):
+        # Merged mode: a group is only delivered if both class-wide PDFs rendered.
+        pdfs = merged_pdfs if merged else [_settled_pdf(r) for r in jobs[i]["outs"]] if i in jobs else [None, None]
+        ok = res["packet"] is not None and None not in pdfs
+        summary.append({"group": res["group"], "activities": len(res["packet"]["activities"]) if res["packet"] else 0,
+                        "missing": res["missing"], "reused": res["cached"], "status": "ok" if ok else "failed"})
+    if merged:
+        for label, name, pdf_bytes in zip(("📘 All Student Packets", "🗝️ All Teacher Keys"), ("Class_Student_Packets.pdf", "Class_Teacher_Keys.pdf"), merged_pdfs):
+            if pdf_bytes is not None: files.append((label, name, pdf_bytes, "application/pdf"))
+    else:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for i, res in enumerate(results):
+                if i not in jobs: continue
+                for kind, pdf_bytes in zip(("Student_Worksheet", "Teacher_Key"), (_settled_pdf(r) for r in jobs[i]["outs"])):
+                    if pdf_bytes is not None: zf.writestr(f"{i + 1:02d}_{_file_stem(res['group'])}/{kind}.pdf", pdf_bytes)
+            table = io.StringIO()
+            writer = csv.DictWriter(table, fieldnames=list(summary[0]) if summary else ["group"])
+            writer.writeheader(); writer.writerows(summary)
+            zf.writestr("batch_summary.csv", table.getvalue())
+        files.append(("📦 Download Class ZIP", "WIN_Time_Class_Packets.zip", buf.getvalue(), "application/zip"))
+    return {"files": files, "summary": summary}
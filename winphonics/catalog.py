@@ -0,0 +1,41 @@
+# --- PHONICS DATABASE & THEMES ---
+GRADE_LEVELS = ["1st", "2nd", "3rd", "4th+"]
+DIFFICULTIES = ["Beginning", "Intermediate", "Advanced"]
+
+PHONICS_MENU = {
+    "Mixed Review (All Types)": ["All Patterns Combined"],
+    "CVC (Short Vowels)": ["Short A", "Short E", "Short I", "Short O", "Short U", "Mixed Short Vowels"],
+    "Consonant Digraphs": ["sh", "ch", "th", "wh", "ck", "Mixed Digraphs"],
+    "Consonant Blends": ["L-Blends", "R-Blends", "S-Blends", "Final Blends"],
+    "Magic E (CVCe)": ["a-e", "i-e", "o-e", "u-e", "Mixed Magic E"],
+    "Vowel r": ["ar", "or", "er", "ir", "ur", "Mixed Vowel r"],
+    "Predictable Vowel Teams": ["Long A (ai, ay)", "Long E (ee, ea)", "Long O (oa, ow)", "Long I (igh, ie)"],
+    "Variant Vowel Teams": ["/ow/ (ou, ow)", "/oy/ (oi, oy)", "/oo/ (oo, ew)", "/aw/ (au, aw)"],
+    "Multisyllable": ["closed/closed", "silent e", "open", "vowel team", "consonant le", "vowel r"],
+    "Endings": ["ed", "ing", "s", "es", "er", "est"]
+}
+
+# EXPANDED THEMES
+THEMES = [
+    "None (Standard)", "Back to School 🚌", "Halloween 🎃", "Thanksgiving 🦃", "Christmas 🎄", 
+    "Winter Holidays ❄️", "100th Day of School 💯", "Valentine's Day 💖", "St. Patrick's Day 🍀", 
+    "Easter 🐰", "Spring Blossoms 🌷", "Earth Day 🌍", "Summer Break ☀️", "Fall / Autumn 🍂", 
+    "Outer Space 🚀", "Ocean Exploration 🌊", "Sports & Games ⚽", "Superheroes 🦸", 
+    "Dinosaurs 🦖", "Animals & Pets 🐶", "Magic & Fantasy 🦄", "Pirates 🏴‍☠️", 
+    "Camping & Outdoors 🏕️", "Fairy Tales 🏰"
+]
+
+CORE_ACTIVITIES = {
+    "Decodable Story": "📖 Story (3+ paragraphs) & 3 Evidence Check questions.",
+    "Nonsense Word Fluency": "🧪 21 pseudo-words with a custom Detective Task.",
+    "Word Bank Sort": "📊 Word Sort: A Word Bank and columns to categorize words.",
+    "Sentence Match": "🔗 Sentence Match: 5 sentence halves to connect.",
+    "Sound Mapping": "🟦 Mapping: Segment words into phoneme boxes."
+}
+
+GAME_ACTIVITIES = {
+    "Detective Riddle Cards": "🔍 8 cards per page with 3 logic clues each.",
+    "Mystery Grid (Color-by-Code)": "🎨 FULL-PAGE 8x8 Aztec/Quilt geometric grid.",
+    "Phonics Word Search": "🔎 A 15x15 grid hiding 10 targeted phonics words.",
+    "Word Scramble": "🧩 8 scrambled words with crossword-style clues to solve."
+}
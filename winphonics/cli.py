@@ -0,0 +1,80 @@
+# --- COMMAND LINE: plan JSON in, packet PDFs out ---
+#   python -m winphonics plan.json -o out/
+# plan.json is either a plan to generate:
+#   {"grade": "1st", "difficulty": "Beginning", "theme": "None (Standard)",
+#    "activities": [{"type": "Decodable Story", "category": "CVC (Short Vowels)", "targets": ["Short A"]}]}
+# or an already generated packet ({"overview", "target_words", "activities": [{"type", "content"}]}),
+# which is rendered offline without calling Gemini.
+import argparse, json, os, random, sys, time
+
+from .catalog import CORE_ACTIVITIES, DIFFICULTIES, GAME_ACTIVITIES, GRADE_LEVELS, PHONICS_MENU, THEMES
+from .gencache import generate_with_cache, normalize_plan
+from .library import get_packet_library
+from .render import get_packet_pdfs
+from .state import QueueItem
+
+def plan_queue(plan):
+    # Returns (queue, problems) in the shape the sidebar builds.
+    queue, problems = [], []
+    for n, act in enumerate(plan.get("activities", []), 1):
+        if not isinstance(act, dict): problems.append(f"activity {n}: not a JSON object"); continue
+        a_type, cat = act.get("type"), act.get("category", "Mixed Review (All Types)")
+        targets = act.get("targets") or PHONICS_MENU.get(cat, [""])[:1]
+        if a_type not in CORE_ACTIVITIES and a_type not in GAME_ACTIVITIES: problems.append(f"activity {n}: unknown type '{a_type}'")
+        elif cat not in PHONICS_MENU: problems.append(f"activity {n}: unknown category '{cat}'")
+        elif any(t not in PHONICS_MENU[cat] for t in targets): problems.append(f"activity {n}: unknown target in {targets}")
+        else: queue.append(QueueItem(a_type, cat, targets, id=f"cli-{n}"))
+    if not queue and not problems: problems.append("the plan has no activities")
+    return queue, problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="winphonics", description="Generate and render a WIN Time phonics packet.")
+    parser.add_argument("plan", help="plan or packet JSON file ('-' for stdin)")
+    parser.add_argument("-o", "--out", default=".", help="directory for the PDFs (default: current directory)")
+    parser.add_argument("--seed", type=int, help="render seed; the same packet and seed always give the same PDFs")
+    parser.add_argument("--save-packet", action="store_true", help="also write the generated packet as packet.json")
+    parser.add_argument("--fast", action="store_true", help="build word searches, mystery grids, nonsense words and sound mapping from the bundled lexicon")
+    args = parser.parse_args(argv)
+
+    source = "stdin" if args.plan == "-" else args.plan
+    try:
+        if args.plan == "-": plan = json.load(sys.stdin)
+        else:
+            with open(args.plan, encoding="utf-8") as f: plan = json.load(f)
+    except (OSError, ValueError) as e:
+        parser.error(f"could not read {source}: {e}")
+    if not isinstance(plan, dict): parser.error(f"{source} must hold a JSON object, not {type(plan).__name__}")
+    if not isinstance(plan.get("activities", []), list): parser.error(f"{source}: \"activities\" must be a list")
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    started = time.perf_counter()
+
+    activities = plan.get("activities") or []
+    if activities and all(isinstance(act, dict) and "content" in act for act in activities):
+        packet = plan
+    else:
+        grade, r_level, theme = plan.get("grade", GRADE_LEVELS[0]), plan.get("difficulty", DIFFICULTIES[0]), plan.get("theme", THEMES[0])
+        queue, problems = plan_queue(plan)
+        if grade not in GRADE_LEVELS: problems.append(f"unknown grade '{grade}'")
+        if r_level not in DIFFICULTIES: problems.append(f"unknown difficulty '{r_level}'")
+        if theme not in THEMES: problems.append(f"unknown theme '{theme}'")
+        if problems:
+            for problem in problems: print(f"plan error: {problem}", file=sys.stderr)
+            return 2
+        from dotenv import load_dotenv
+        load_dotenv()
+        packet, missing, cached = generate_with_cache(grade, r_level, theme, queue, fast=args.fast)
+        if packet is None:
+            print("generation failed: the model returned nothing usable", file=sys.stderr)
+            return 1
+        get_packet_library().add(normalize_plan(grade, r_level, theme, queue, args.fast), packet, seed)
+        print(f"generated {len(packet['activities'])}/{len(queue)} activities{' (reused a saved packet)' if cached else ''}"
+              f" in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    os.makedirs(args.out, exist_ok=True)
+    student, key = get_packet_pdfs(packet, seed)
+    for name, data in (("Student_Worksheet.pdf", student), ("Teacher_Key.pdf", key)):
+        with open(os.path.join(args.out, name), "wb") as f: f.write(data)
+    if args.save_packet:
+        with open(os.path.join(args.out, "packet.json"), "w", encoding="utf-8") as f: json.dump(packet, f, ensure_ascii=False, indent=2)
+    print(f"wrote {args.out} (seed {seed}) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
@@ -0,0 +1,105 @@
+# --- DIAGNOSTICS (phase timing spans; a no-op unless a trace is active) ---
+import json, os, threading, time, contextvars
+from contextlib import contextmanager, nullcontext
+
+from .util import singleton
+
+DIAG_DEFAULT = os.getenv("WIN_DIAGNOSTICS") == "1"
+DIAG_BASE_PATH = os.getenv("WIN_DIAG_PATH", os.path.join(os.getenv("WIN_CACHE_DIR", ".cache"), "diagnostics")) # + .jsonl / .prom
+
+_active_trace = contextvars.ContextVar("win_trace", default=None)
+_NO_SPAN = nullcontext()
+
+class Trace:
+    # Spans recorded during one rerun. Async tasks and render jobs inherit the context, so their spans land here too.
+    def __init__(self, name):
+        self.name, self.started, self.spans, self.closed = name, time.perf_counter(), [], False
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, **labels):
+        with self._lock:
+            if not self.closed: self.spans.append((name, seconds, labels))
+
+    def close(self):
+        with self._lock: self.closed = True
+        return time.perf_counter() - self.started
+
+@contextmanager
+def _timed(trace, name, labels):
+    start = time.perf_counter()
+    try: yield
+    finally: trace.add(name, time.perf_counter() - start, **labels)
+
+def span(name, **labels):
+    # With diagnostics off this is one ContextVar lookup returning a shared no-op context.
+    trace = _active_trace.get()
+    return _NO_SPAN if trace is None else _timed(trace, name, labels)
+
+class Laps:
+    # Times consecutive sections of one pass: lap(section) closes the running section and opens the next.
+    def __init__(self, trace, name, labels):
+        self.trace, self.name, self.labels = trace, name, labels
+        self.section, self.start = None, time.perf_counter()
+
+    def lap(self, section=None):
+        now = time.perf_counter()
+        if self.section is not None: self.trace.add(self.name, now - self.start, type=self.section, **self.labels)
+        self.section, self.start = section, now
+
+def laps(name, **labels):
+    trace = _active_trace.get()
+    return None if trace is None else Laps(trace, name, labels)
+
+def current_trace():
+    return _active_trace.get()
+
+def start_trace(name):
+    trace = Trace(name)
+    _active_trace.set(trace)
+    return trace
+
+def stop_trace():
+    # Detaches the running trace and returns (trace, total seconds), or None when none is active.
+    trace = _active_trace.get()
+    if trace is None: return None
+    _active_trace.set(None)
+    return trace, trace.close()
+
+def _prom_labels(name, labels):
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in [("span", name)] + list(labels)) + "}"
+
+class DiagnosticsLog:
+    # Process-wide sink: every finished trace is appended to a JSON-lines file, and running totals per
+    # (span, labels) are rewritten to a Prometheus text-format file next to it.
+    def __init__(self, base_path):
+        self.jsonl_path, self.prom_path = base_path + ".jsonl", base_path + ".prom"
+        self.totals = {} # (span, labels) -> [count, sum_s, max_s]
+        self._lock = threading.Lock()
+
+    def record(self, trace, total_s, session):
+        spans = [("rerun", total_s, {})] + trace.spans
+        line = json.dumps({"ts": round(time.time(), 3), "session": session, "trace": trace.name, "total_s": round(total_s, 6),
+                           "spans": [dict(labels, span=name, s=round(seconds, 6)) for name, seconds, labels in trace.spans]})
+        with self._lock:
+            for name, seconds, labels in spans:
+                tot = self.totals.setdefault((name, tuple(sorted(labels.items()))), [0, 0.0, 0.0])
+                tot[0] += 1; tot[1] += seconds; tot[2] = max(tot[2], seconds)
+            try:
+                os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+                with open(self.jsonl_path, "a", encoding="utf-8") as f: f.write(line + "\n")
+                with open(self.prom_path + ".tmp", "w", encoding="utf-8") as f: f.write(self._prometheus_text())
+                os.replace(self.prom_path + ".tmp", self.prom_path)
+            except OSError:
+                pass # diagnostics must never break a rerun
+
+    def _prometheus_text(self):
+        lines = ["# HELP win_span_seconds Wall time spent in each app phase.", "# TYPE win_span_seconds summary"]
+        for (name, labels), (count, total, _) in sorted(self.totals.items()):
+            lines += [f"win_span_seconds_count{_prom_labels(name, labels)} {count}", f"win_span_seconds_sum{_prom_labels(name, labels)} {total:.6f}"]
+        lines += ["# HELP win_span_seconds_max Slowest single occurrence of each app phase.", "# TYPE win_span_seconds_max gauge"]
+        lines += [f"win_span_seconds_max{_prom_labels(name, labels)} {worst:.6f}" for (name, labels), (_, _, worst) in sorted(self.totals.items())]
+        return "\n".join(lines) + "\n"
+
+@singleton
+def get_diagnostics_log(): return DiagnosticsLog(DIAG_BASE_PATH)
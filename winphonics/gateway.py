@@ -0,0 +1,134 @@
+# --- GEMINI GATEWAY (one per process: shared model, fair admission, rate limits, coalescing) ---
+import threading, time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .diagnostics import span
+
+_session = ContextVar("generation_session", default="shared")
+
+@contextmanager
+def generation_session(name):
+    # Gemini calls made inside this block (and in threads started with a copy of its context) queue as `name`.
+    token = _session.set(str(name))
+    try: yield
+    finally: _session.reset(token)
+
+class TokenBucket:
+    # Refills per_minute units evenly over the minute and holds at most one minute's worth.
+    # Not locked: the gateway only touches it under its own condition.
+    def __init__(self, per_minute):
+        self.capacity, self.rate = float(per_minute), per_minute / 60
+        self.level, self.at = float(per_minute), time.monotonic()
+
+    def _fill(self):
+        now = time.monotonic()
+        self.level, self.at = min(self.capacity, self.level + (now - self.at) * self.rate), now
+
+    def wait_s(self, n):
+        self._fill()
+        return max(0.0, (min(n, self.capacity) - self.level) / self.rate)
+
+    def take(self, n):
+        self._fill(); self.level -= min(n, self.capacity)
+
+    def drain(self):
+        self._fill(); self.level = min(self.level, 0.0)
+
+class GenerationGateway:
+    # Every Gemini call in the process passes through admit(): at most `concurrency` run at once, each must
+    # fit the requests- and tokens-per-minute buckets, and waiting callers are served round-robin by session
+    # so one teacher's big packet can't starve the others. The model object is built once and shared.
+    def __init__(self, make_model, concurrency, rpm, tpm):
+        self._make_model, self.concurrency = make_model, concurrency
+        self._model = None
+        self.requests, self.tokens = TokenBucket(rpm), TokenBucket(tpm)
+        self._cond = threading.Condition()
+        self._waiting = OrderedDict() # session -> deque of tickets, in turn order
+        self._inflight = {}
+        self.active = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.quota_errors = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._cond:
+                if self._model is None: self._model = self._make_model()
+        return self._model
+
+    def _is_next(self, ticket):
+        # The head ticket of the session whose turn it is.
+        return next(iter(self._waiting.values()))[0] is ticket
+
+    @contextmanager
+    def admit(self, est_tokens):
+        session, ticket, started = _session.get(), object(), time.perf_counter()
+        with span("generate.queue_wait"), self._cond:
+            self._waiting.setdefault(session, deque()).append(ticket)
+            while True:
+                if self.active < self.concurrency and self._is_next(ticket):
+                    wait = max(self.requests.wait_s(1), self.tokens.wait_s(est_tokens))
+                    if wait <= 0: break
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            queue = self._waiting.pop(session)
+            queue.popleft()
+            if queue: self._waiting[session] = queue # back of the line: other sessions go first
+            self.requests.take(1); self.tokens.take(est_tokens)
+            self.active += 1; self.calls += 1
+            waited = time.perf_counter() - started
+            self.wait_s_total += waited; self.wait_s_max = max(self.wait_s_max, waited)
+            self._cond.notify_all()
+        try:
+            yield self.model
+        except Exception as e:
+            # A quota error means our buckets are more generous than the project's limit: pause everyone.
+            if "429" in str(e) or type(e).__name__ in ("ResourceExhausted", "TooManyRequests"):
+                with self._cond: self.quota_errors += 1; self.requests.drain()
+            raise
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def shared(self, key, work):
+        # Identical work already in flight is joined instead of started again; every caller gets the first one's result.
+        # work must not touch the caller's session (UI callbacks), since its result and errors reach other sessions too.
+        while True:
+            with self._cond:
+                pending = self._inflight.get(key)
+                leader = pending is None
+                if leader: pending = self._inflight[key] = Future()
+                else: self.coalesced += 1
+            if leader: break
+            try:
+                with span("generate.coalesced"): return pending.result()
+            except CancelledError:
+                continue # the leader was interrupted, not failed: take over (or join whoever did)
+        try:
+            result = work()
+            pending.set_result(result)
+            return result
+        except Exception as e:
+            pending.set_exception(e)
+            raise
+        except BaseException:
+            # A stop or rerun belongs to the leader's session alone; waiting callers start the work again.
+            pending.cancel()
+            raise
+        finally:
+            with self._cond: self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._cond:
+            return {"active": self.active, "queued": sum(len(q) for q in self._waiting.values()), "queued_sessions": len(self._waiting),
+                    "calls": self.calls, "coalesced": self.coalesced, "quota_errors": self.quota_errors,
+                    "wait_ms_mean": self.wait_s_total * 1000 / self.calls if self.calls else 0.0, "wait_ms_max": self.wait_s_max * 1000,
+                    "in_flight_plans": len(self._inflight)}
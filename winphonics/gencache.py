@@ -0,0 +1,131 @@
+# --- GENERATION CACHE (local SQLite, shared by every session) ---
+import os, copy, json, random, threading, time, sqlite3
+
+from .diagnostics import span
+from .gateway import generation_session
+from .generation import get_gateway, run_generation
+from .util import content_hash, singleton
+
+CACHE_DIR = os.getenv("WIN_CACHE_DIR", ".cache")
+GEN_CACHE_PATH = os.path.join(CACHE_DIR, "generations.sqlite3")
+GEN_CACHE_VARIANTS = 3 # packets pooled per plan; plans are only served from cache once the pool is full
+GEN_CACHE_TTL_S = 14 * 24 * 3600
+GEN_CACHE_MAX_PLANS = 500 # least recently used plans beyond this are dropped
+# Opt-in (WIN_GEN_CACHE_REFILL=1): after a hit, generate a fresh variant in the background so the pool rotates.
+# Each refill is a full Gemini generation, so with it on a hit saves the teacher's wait but not the API cost.
+GEN_CACHE_REFILL = os.getenv("WIN_GEN_CACHE_REFILL") == "1"
+
+def normalize_plan(grade, r_level, theme, queue, fast=False):
+    # Everything that changes the prompt, nothing that doesn't (uuids, is_game).
+    plan = {"grade": grade, "r_level": r_level, "theme": theme,
+            "queue": [{"type": item["type"], "cat": item["cat"], "sounds": sorted(item["sounds"]),
+                       "nonsense": bool(item.get("nonsense"))} for item in queue]}
+    if fast: plan["fast"] = True # only tagged when on, so existing plan keys still match
+    return plan
+
+class GenerationCache:
+    def __init__(self, path, variants, ttl_s, max_plans):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.variants, self.ttl_s, self.max_plans = variants, ttl_s, max_plans
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS plans (plan_key TEXT PRIMARY KEY, plan TEXT NOT NULL, last_access REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS variants (id INTEGER PRIMARY KEY AUTOINCREMENT, plan_key TEXT NOT NULL,
+                packet TEXT NOT NULL, created REAL NOT NULL, served INTEGER NOT NULL DEFAULT 0);
+            CREATE INDEX IF NOT EXISTS variants_by_plan ON variants(plan_key);
+        """)
+        self._refilling = set()
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+
+    def take(self, plan_key):
+        # Least-served variant for this plan, or None while the pool is still filling.
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM variants WHERE plan_key = ? AND created < ?", (plan_key, now - self.ttl_s))
+            rows = self._db.execute("SELECT id, packet, served FROM variants WHERE plan_key = ?", (plan_key,)).fetchall()
+            if len(rows) < self.variants:
+                self.misses += 1
+                return None
+            low = min(r[2] for r in rows)
+            vid, packet, _ = random.choice([r for r in rows if r[2] == low])
+            self._db.execute("UPDATE variants SET served = served + 1 WHERE id = ?", (vid,))
+            self._db.execute("UPDATE plans SET last_access = ? WHERE plan_key = ?", (now, plan_key))
+            self.hits += 1
+            return json.loads(packet)
+
+    def add(self, plan_key, plan, packet):
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("INSERT INTO plans VALUES (?, ?, ?) ON CONFLICT(plan_key) DO UPDATE SET last_access = excluded.last_access",
+                             (plan_key, json.dumps(plan), now))
+            self._db.execute("INSERT INTO variants (plan_key, packet, created) VALUES (?, ?, ?)", (plan_key, json.dumps(packet), now))
+            # Pool over capacity: retire the most-served (then oldest) variant.
+            self._db.execute("""DELETE FROM variants WHERE id IN (SELECT id FROM variants WHERE plan_key = ?
+                                ORDER BY served DESC, created ASC LIMIT max(0, (SELECT count(*) FROM variants WHERE plan_key = ?) - ?))""",
+                             (plan_key, plan_key, self.variants))
+            stale = self._db.execute("SELECT plan_key FROM plans ORDER BY last_access DESC LIMIT -1 OFFSET ?", (self.max_plans,)).fetchall()
+            for (key,) in stale:
+                self._db.execute("DELETE FROM variants WHERE plan_key = ?", (key,))
+                self._db.execute("DELETE FROM plans WHERE plan_key = ?", (key,))
+
+    def refill(self, plan_key, plan, generate):
+        # Background top-up; generate(plan) -> complete packet or None. One refill per plan at a time.
+        with self._lock:
+            if plan_key in self._refilling: return
+            self._refilling.add(plan_key)
+        def work():
+            try:
+                # Queued at the gateway as their own session, so refills share its rate limits and take turns with teachers.
+                with generation_session("cache-refill"): packet = generate(plan)
+                if packet is not None:
+                    self.add(plan_key, plan, packet)
+                    with self._lock: self.refills += 1
+            except Exception:
+                pass
+            finally:
+                with self._lock: self._refilling.discard(plan_key)
+        threading.Thread(target=work, name="gen-cache-refill", daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            plans, variants = self._db.execute("SELECT (SELECT count(*) FROM plans), (SELECT count(*) FROM variants)").fetchone()
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                    "refills": self.refills, "refilling": len(self._refilling), "plans": plans, "variants": variants}
+
+@singleton
+def get_generation_cache(): return GenerationCache(GEN_CACHE_PATH, GEN_CACHE_VARIANTS, GEN_CACHE_TTL_S, GEN_CACHE_MAX_PLANS)
+
+def _generate_complete(plan):
+    packet, missing = run_generation(plan["grade"], plan["r_level"], plan["theme"], plan["queue"], fast=plan.get("fast", False))
+    return packet if not missing else None
+
+def generate_with_cache(grade, r_level, theme, queue, on_activity=None, fast=False):
+    # Returns (packet or None, missing activities, served_from_cache). Only complete packets are pooled.
+    cache = get_generation_cache()
+    plan = normalize_plan(grade, r_level, theme, queue, fast)
+    plan_key = content_hash(plan)
+    with span("generate.cache_lookup"): packet = cache.take(plan_key)
+    if packet is not None:
+        if GEN_CACHE_REFILL: cache.refill(plan_key, plan, _generate_complete)
+        return packet, 0, True
+    led = []
+    def generate():
+        # Runs on the leader's own thread, so its on_activity streams live; a stop or rerun it raises cancels the
+        # shared work and the waiting sessions take over, and an ordinary error is shared like any other failure.
+        led.append(True)
+        packet, missing = run_generation(grade, r_level, theme, queue, on_activity, fast)
+        if packet is not None and not missing:
+            with span("generate.cache_store"): cache.add(plan_key, plan, packet)
+        return packet, missing
+    # Sessions that ask for a plan while it is already generating wait for that generation and share its packet,
+    # replaying its activities into their own on_activity here, in their own session.
+    packet, missing = get_gateway().shared(plan_key, generate)
+    if not led and packet is not None:
+        packet = copy.deepcopy(packet)
+        if on_activity:
+            for act in packet["activities"]: on_activity(act)
+    return packet, missing, False
@@ -0,0 +1,435 @@
+# --- AI GENERATION ENGINE ---
+import os, json, random, re, threading, time, asyncio
+
+from .diagnostics import span
+from .gateway import GenerationGateway
+from .phonics import PHONICS_MIN_SCORE, score_activity, score_words, target_word_rules
+from .util import singleton
+
+GEMINI_MODEL = "gemini-2.5-flash"
+GEN_CONFIG = {"response_mime_type": "application/json", "max_output_tokens": 8192}
+# "fanout": one concurrent call per planned activity; "stream": one streamed call for the whole
+# packet, previewing activities as they close; "single": one blocking call.
+GENERATION_MODE = "fanout"
+FANOUT_CONCURRENCY = 4 # max simultaneous Gemini calls per packet
+FANOUT_RETRIES = 3 # attempts per activity before it is left out
+PHONICS_CHECK = True # re-request activities whose words miss their phonics targets
+# Process-wide Gemini limits, shared by every session, batch worker and background refill. Set them
+# just under the project's quota so bursts queue here instead of failing with 429s and retrying.
+GATEWAY_CONCURRENCY = int(os.getenv("WIN_GEMINI_CONCURRENCY", "8"))
+GEMINI_RPM = int(os.getenv("WIN_GEMINI_RPM", "150"))
+GEMINI_TPM = int(os.getenv("WIN_GEMINI_TPM", "400000"))
+
+@singleton
+def _genai():
+    # The Gemini SDK is heavy to import; only code paths that actually call the model pay for it.
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai
+
+@singleton
+def get_gateway(): return GenerationGateway(lambda: _genai().GenerativeModel(GEMINI_MODEL), GATEWAY_CONCURRENCY, GEMINI_RPM, GEMINI_TPM)
+
+def _call_cost(prompt, out_tokens): return len(prompt) // 4 + out_tokens # ~4 chars/token in, the spec estimate out
+
+# Per activity type: its quantity rule, the content fields it fills, and a rough output-token cost.
+ACTIVITY_SPECS = {
+    "Decodable Story": {"rule": "STORY: MUST be 3+ paragraphs. MUST have exactly 3 questions.",
+                        "schema": '"title": "text", "paragraphs": ["Para 1 text"], "questions": [{"q":"?","a":""}]', "tokens": 900},
+    "Nonsense Word Fluency": {"rule": "NONSENSE WORDS: EXACTLY 21 pseudo-words.",
+                              "schema": '"words": ["pseudo1"], "detective_task": ["1. Task"]', "tokens": 250},
+    "Word Bank Sort": {"rule": "WORD SORT: At least 15 words total. Categories MUST be 1 or 2 words maximum.",
+                       "schema": '"sort_cats": {"Cat1":["w1"]}', "tokens": 200},
+    "Sentence Match": {"rule": "SENTENCE MATCH: EXACTLY 5 sentences. Halves MUST be under 6 words each.",
+                       "schema": '"match_l": ["Left 1"], "match_r": ["Right 1"]', "tokens": 180},
+    "Sound Mapping": {"rule": "SOUND MAPPING: EXACTLY 10 words.",
+                      "schema": '"map_words": ["w1"]', "tokens": 100},
+    "Detective Riddle Cards": {"rule": "RIDDLES: EXACTLY 8 distinct riddle cards.",
+                               "schema": '"riddles": [{"clue1":"c1","clue2":"c2","clue3":"c3","ans":"a"}]', "tokens": 450},
+    "Mystery Grid (Color-by-Code)": {"rule": "MYSTERY GRID: Choose EXACTLY 4 distinct colors. EXACTLY 8 unique words for EACH color.",
+                                     "schema": '"mystery_grid": { "legend": {"Red":"target 1", "Blue":"target 2"}, "color_words": {"Red":["w1","w2"]} }', "tokens": 350},
+    "Phonics Word Search": {"rule": "WORD SEARCH: Provide EXACTLY 10 targeted phonics words. (Max 10 letters per word).",
+                            "schema": '"word_search": ["w1", "w2", "w3"]', "tokens": 100},
+    "Word Scramble": {"rule": "WORD SCRAMBLE: Provide EXACTLY 8 words with clues (the letters are scrambled locally). Clues MUST be short (under 10 words).",
+                      "schema": '"word_scramble": [{"word": "BLAST", "clue": "A rocket taking off"}]', "tokens": 250}
+}
+COVER_TOKENS = 150 # overview + target_words
+TOKEN_BUDGET = int(GEN_CONFIG["max_output_tokens"] * 0.75) # headroom for estimates running long
+
+def _theme_instruction(theme):
+    return f"The ENTIRE worksheet (story, sentences, vocabulary, riddles) MUST be themed around: {theme}." if theme != "None (Standard)" else "Standard non-themed vocabulary."
+
+def compact_plan(queue):
+    # One line per activity; uuids and UI flags never reach the model.
+    return "\n".join(f"{n}. {item['type']} | {item['cat']}: {', '.join(item['sounds'])}{' (pseudo-words)' if item.get('nonsense') else ''}"
+                     for n, item in enumerate(queue, 1))
+
+def estimate_output_tokens(queue, with_cover=True):
+    return (COVER_TOKENS if with_cover else 0) + sum(ACTIVITY_SPECS.get(item["type"], {}).get("tokens", 400) for item in queue)
+
+def build_prompt(grade, r_level, theme, queue, with_cover=True):
+    # Only the rules and schema fields for the activity types actually queued.
+    specs = [ACTIVITY_SPECS[t] for t in dict.fromkeys(item["type"] for item in queue) if t in ACTIVITY_SPECS]
+    rules = "\n".join(f"{n}. {spec['rule']}" for n, spec in enumerate(specs, 2))
+    fields = ", ".join(spec["schema"] for spec in specs)
+    cover = '"overview": "3 sentence intro.", "target_words": ["word1", "word2"], ' if with_cover else ""
+    
+    # Built flush-left: indentation inside a prompt is paid for in input tokens.
+    return (f"Create a {grade} worksheet ({r_level} level).\n"
+            f"Plan (one activity each, in this order):\n{compact_plan(queue)}\n"
+            f"THEME REQUIREMENT: {_theme_instruction(theme)}\n\n"
+            "STRICT QUANTITY & CONTENT RULES:\n"
+            f"1. AGE-APPROPRIATE RIGOR: The vocabulary MUST strictly align with the reading level of a {grade} student. 'Advanced' means complex decodable spelling patterns for their specific age, NOT high-school level or obscure adult vocabulary. Keep the concepts familiar to young children!\n"
+            f"{rules}\n\n"
+            'JSON SAFETY: You MUST output ONLY valid JSON. Use DOUBLE QUOTES (") for keys and values. NO trailing commas. Do NOT use unescaped newlines.\n'
+            'Output Schema Format ("type" is copied exactly from the plan; "content" holds only that type\'s fields):\n'
+            f'{{ {cover}"activities": [ {{ "type": "Exact Type", "content": {{ {fields} }} }} ] }}')
+
+def split_plan(queue, budget=TOKEN_BUDGET):
+    # Packs the queue, in order, into chunks whose expected output fits the token budget. The first
+    # chunk also carries the cover page. Returns [(items, with_cover)].
+    chunks, current = [], []
+    for item in queue:
+        if current and estimate_output_tokens(current + [item], not chunks) > budget:
+            chunks.append((current, not chunks)); current = []
+        current.append(item)
+    if current or not chunks: chunks.append((current, not chunks))
+    return chunks
+
+def build_overview_prompt(grade, r_level, theme, queue):
+    focus = sorted({f"{item['cat']}: {', '.join(item['sounds'])}" for item in queue})
+    return (f"Write the cover page for a {grade} phonics packet ({r_level} level). Focus: {'; '.join(focus)}.\n"
+            f"THEME REQUIREMENT: {_theme_instruction(theme)}\n"
+            'Output ONLY valid JSON: {"overview": "3 sentence intro.", "target_words": ["8 to 12 target words"]}')
+
+RETRY_BACKOFF_S = 1.0 # first retry waits ~1s, then ~2s, ~4s (plus jitter)
+
+def _backoff_s(attempt): return RETRY_BACKOFF_S * (2 ** (attempt - 1)) * random.uniform(0.75, 1.25)
+
+def _strip_fences(raw_text):
+    raw_text = raw_text.strip()
+    if raw_text.startswith("```json"): raw_text = raw_text[7:]
+    elif raw_text.startswith("```"): raw_text = raw_text[3:]
+    if raw_text.endswith("```"): raw_text = raw_text[:-3]
+    return raw_text.strip()
+
+PY_CONSTANTS = {"True": "true", "False": "false", "None": "null"}
+PY_CONSTANT = re.compile(r"\b(?:True|False|None)\b")
+
+def _fix_json_text(text):
+    # One pass over near-JSON: escapes raw newlines inside strings, turns 'single quoted' strings into
+    # "double quoted" ones, drops trailing commas and spells Python's True / False / None the JSON way.
+    # Stops where the top-level value closes, so a chatty sign-off can't open a stray string.
+    # Returns (text, fixes applied, left open?).
+    out, fixes, depth, quote, i = [], set(), 0, None, 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\" and i + 1 < len(text):
+                nxt = text[i + 1]
+                out.append("'" if quote == "'" and nxt == "'" else ch + nxt); i += 2; continue
+            if ch == quote: out.append('"'); quote = None
+            elif ch == '"': out.append('\\"')
+            elif ch in "\n\r\t": out.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[ch]); fixes.add("raw_newline")
+            else: out.append(ch)
+        elif ch == '"': out.append(ch); quote = '"'
+        elif ch == "'": out.append('"'); quote = "'"; fixes.add("single_quotes")
+        elif ch in "{[": out.append(ch); depth += 1
+        elif ch in "}]":
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace(): j -= 1
+            if j >= 0 and out[j] == ",": del out[j]; fixes.add("trailing_comma")
+            out.append(ch); depth -= 1
+            if depth == 0:
+                if text[i + 1:].strip(): fixes.add("trailing_text")
+                break
+        elif ch in "TFN" and (m := PY_CONSTANT.match(text, i)):
+            out.append(PY_CONSTANTS[m.group()]); fixes.add("python_literal"); i = m.end(); continue
+        else: out.append(ch)
+        i += 1
+    return "".join(out), fixes, bool(quote) or depth > 0
+
+def repair_model_json(raw_text):
+    # Returns (parsed or None, failure class). A truncated packet is salvaged down to its complete
+    # activities; the class says what went wrong so retries can be measured.
+    text = _strip_fences(raw_text)
+    try: return json.loads(text), "ok"
+    except ValueError: pass
+    start = text.find("{")
+    if start < 0: return None, "not_json"
+    text = text[start:] # drop any chatty preamble before the object
+    fixed, fixes, left_open = _fix_json_text(text)
+    if start > 0: fixes.add("preamble")
+    if not left_open:
+        # Parsed after local fixes: labelled by what was fixed, never as a failure.
+        try: return json.loads(fixed), "+".join(sorted(fixes)) or "repaired"
+        except ValueError: pass
+    parser = ActivityStreamParser()
+    parser.feed(fixed)
+    if parser.activities: return parser.partial_packet(), "truncated"
+    return None, "truncated" if left_open else "unparseable"
+
+class GenerationStats:
+    # Process-wide counters: which failure classes happen and what local repair saved us.
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.failures = {}
+        self.retries = 0
+        self.salvaged_activities = 0
+        self.tokens_saved = 0
+        self.off_target = 0
+        self.off_target_replaced = 0
+
+    def record(self, failure):
+        with self._lock:
+            self.responses += 1
+            if failure != "ok": self.failures[failure] = self.failures.get(failure, 0) + 1
+
+    def retry(self):
+        with self._lock: self.retries += 1
+
+    def salvaged(self, activities):
+        # Tokens we did not pay to regenerate (~4 chars/token), versus a blind full retry.
+        with self._lock:
+            self.salvaged_activities += len(activities)
+            self.tokens_saved += sum(len(json.dumps(a)) for a in activities) // 4
+
+    def rechecked(self, requested, replaced):
+        with self._lock:
+            self.off_target += requested
+            self.off_target_replaced += replaced
+
+    def stats(self):
+        with self._lock:
+            return {"responses": self.responses, "failures": dict(self.failures), "retries": self.retries,
+                    "salvaged_activities": self.salvaged_activities, "est_tokens_saved": self.tokens_saved,
+                    "off_target_requests": self.off_target, "off_target_replaced": self.off_target_replaced}
+
+@singleton
+def get_generation_stats(): return GenerationStats()
+
+class ActivityStreamParser:
+    # Incremental scanner over streamed JSON text. feed() returns every element of the top-level
+    # "activities" array that closed in this chunk; completed top-level fields land in .fields.
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self.activities = []
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._last_str = None
+        self._key = None
+        self._value_start = None
+        self._item_start = None
+
+    def _close_field(self, end):
+        if self._key is not None and self._value_start is not None:
+            try: self.fields[self._key] = json.loads(self.text[self._value_start:end])
+            except ValueError: pass
+        self._key = self._value_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        text, closed = self.text, []
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_str:
+                if self._esc: self._esc = False
+                elif ch == "\\": self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._depth == 1 and self._value_start is None: self._last_str = text[self._str_start + 1:i]
+                continue
+            if ch == '"':
+                self._in_str = True; self._str_start = i
+                if self._depth == 1 and self._key is not None and self._value_start is None: self._value_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._key is not None and self._value_start is None: self._value_start = i
+                if self._depth == 2 and ch == "{" and self._key == "activities": self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None and self._key == "activities":
+                    try:
+                        act = json.loads(text[self._item_start:i + 1])
+                        self.activities.append(act); closed.append(act)
+                    except ValueError: pass
+                    self._item_start = None
+                elif self._depth == 0: self._close_field(i)
+            elif self._depth == 1:
+                if ch == ":": self._key, self._value_start = self._last_str, None
+                elif ch == ",": self._close_field(i)
+                elif not ch.isspace() and self._key is not None and self._value_start is None: self._value_start = i
+        self._pos = len(text)
+        return closed
+
+    def partial_packet(self):
+        # Whatever survived so far, in the shape render_pdf expects.
+        return {"overview": self.fields.get("overview", "Practice targeted phonics skills."),
+                "target_words": self.fields.get("target_words", []), "activities": list(self.activities)}
+
+def request_packet_text(prompt, on_activity=None, parser=None, out_tokens=0):
+    # One Gemini call, returning the raw text. In streaming mode on_activity(act) fires as each
+    # activity closes; the parser keeps whatever streamed if the call dies part-way.
+    with get_gateway().admit(_call_cost(prompt, out_tokens)) as model, span("generate.gemini", mode=GENERATION_MODE):
+        if GENERATION_MODE != "stream":
+            return model.generate_content(prompt, generation_config=GEN_CONFIG).text
+        parser = parser or ActivityStreamParser()
+        for chunk in model.generate_content(prompt, generation_config=GEN_CONFIG, stream=True):
+            for act in parser.feed(chunk.text):
+                if on_activity: on_activity(act)
+        return parser.text
+
+def match_activities(queue, activities):
+    # Slots activities into queue order by type; None marks a planned activity that never arrived.
+    pool = list(activities)
+    slots = []
+    for item in queue:
+        idx = next((i for i, act in enumerate(pool) if isinstance(act, dict) and act.get("type") == item["type"] and isinstance(act.get("content"), dict)), None)
+        slots.append(pool.pop(idx) if idx is not None else None)
+    return slots
+
+def _request_chunk(prompt, on_activity, attempts, out_tokens):
+    stats = get_generation_stats()
+    for attempt in range(attempts):
+        if attempt:
+            stats.retry()
+            with span("generate.retry_wait"): time.sleep(_backoff_s(attempt))
+        parser = ActivityStreamParser()
+        try:
+            raw_text = request_packet_text(prompt, on_activity, parser, out_tokens)
+        except Exception:
+            raw_text = parser.text # a stream that died late still carries complete activities
+        with span("generate.parse"):
+            packet, failure = repair_model_json(raw_text) if raw_text else (None, "api_error")
+        stats.record(failure)
+        if isinstance(packet, dict) and isinstance(packet.get("activities"), list): return packet
+    return None
+
+def generate_single(grade, r_level, theme, queue, on_activity=None, attempts=3):
+    # Plans whose expected output would overrun max_output_tokens are split into several requests.
+    stats = get_generation_stats()
+    packet = {"overview": "Practice targeted phonics skills.", "target_words": [], "activities": []}
+    answered = False
+    for items, with_cover in split_plan(queue):
+        with span("generate.prompt"): prompt = build_prompt(grade, r_level, theme, items, with_cover)
+        part = _request_chunk(prompt, on_activity, attempts, estimate_output_tokens(items, with_cover))
+        if part is None: continue
+        answered = True
+        if with_cover:
+            packet["overview"] = part.get("overview", packet["overview"])
+            packet["target_words"] = part.get("target_words", [])
+        packet["activities"].extend(part["activities"])
+    if not answered: return None
+    
+    # Keep every complete activity and re-request only the planned ones that are missing.
+    slots = match_activities(queue, packet["activities"])
+    missing = [i for i, act in enumerate(slots) if act is None]
+    if missing and len(missing) < len(queue):
+        stats.salvaged([act for act in slots if act is not None])
+    if missing:
+        refetched = asyncio.run(_fanout(grade, r_level, theme, [queue[i] for i in missing], on_activity, FANOUT_CONCURRENCY, with_cover=False))
+        for i, act in zip(missing, refetched["slots"]): slots[i] = act
+    packet["activities"] = [act for act in slots if act is not None]
+    return packet if packet["activities"] else None
+
+def _request_json_text(prompt, out_tokens):
+    with get_gateway().admit(_call_cost(prompt, out_tokens)) as model, span("generate.gemini", mode="fanout"):
+        return model.generate_content(prompt, generation_config=GEN_CONFIG).text
+
+async def _generate_json(sem, prompt, is_valid, out_tokens):
+    # The blocking call runs on a worker thread, so one shared model serves every event loop.
+    stats = get_generation_stats()
+    for attempt in range(FANOUT_RETRIES):
+        if attempt:
+            stats.retry()
+            with span("generate.retry_wait"): await asyncio.sleep(_backoff_s(attempt))
+        try:
+            async with sem: text = await asyncio.to_thread(_request_json_text, prompt, out_tokens)
+            with span("generate.parse"): parsed, failure = repair_model_json(text)
+        except Exception:
+            parsed, failure = None, "api_error"
+        stats.record(failure)
+        if is_valid(parsed): return parsed
+    return None
+
+def _as_activity(parsed, a_type):
+    if isinstance(parsed, dict) and isinstance(parsed.get("activities"), list) and parsed["activities"]: parsed = parsed["activities"][0]
+    return {"type": a_type, "content": parsed["content"]} if isinstance(parsed, dict) and isinstance(parsed.get("content"), dict) else None
+
+async def _fanout(grade, r_level, theme, queue, on_activity, concurrency, with_cover=True):
+    sem = asyncio.Semaphore(concurrency)
+    cover_task = None
+    if with_cover:
+        with span("generate.prompt"): cover_prompt = build_overview_prompt(grade, r_level, theme, queue)
+        cover_task = asyncio.ensure_future(_generate_json(sem, cover_prompt, lambda p: isinstance(p, dict), COVER_TOKENS))
+    
+    async def run(idx, item):
+        with span("generate.prompt"): prompt = build_prompt(grade, r_level, theme, [item], with_cover=False)
+        valid = lambda p: _as_activity(p, item["type"]) is not None
+        return idx, _as_activity(await _generate_json(sem, prompt, valid, estimate_output_tokens([item], False)), item["type"])
+    
+    slots = [None] * len(queue)
+    for next_done in asyncio.as_completed([run(i, item) for i, item in enumerate(queue)]):
+        idx, act = await next_done
+        slots[idx] = act
+        if act is not None and on_activity: on_activity(act)
+    cover = (await cover_task if cover_task else None) or {}
+    return {"overview": cover.get("overview", "Practice targeted phonics skills."),
+            "target_words": cover.get("target_words", []), "slots": slots}
+
+def generate_fanout(grade, r_level, theme, queue, on_activity=None, concurrency=FANOUT_CONCURRENCY):
+    # One small request per queue item plus a cover-page call, reassembled in queue order.
+    result = asyncio.run(_fanout(grade, r_level, theme, queue, on_activity, concurrency))
+    activities = [act for act in result.pop("slots") if act is not None]
+    return dict(result, activities=activities) if activities else None
+
+def _below(score): return score is not None and score < PHONICS_MIN_SCORE
+
+def recheck_phonics(grade, r_level, theme, queue, packet):
+    # Re-requests only the activities whose words miss their targets, keeping a replacement only if
+    # it scores higher. Off-target words in the cover word bank are dropped locally instead.
+    with span("generate.validate"):
+        slots = match_activities(queue, packet["activities"])
+        scores = [score_activity(act, item)[0] if act else None for act, item in zip(slots, queue)]
+        redo = [i for i, score in enumerate(scores) if _below(score)]
+        words = [w for w in packet.get("target_words") or [] if isinstance(w, str)]
+        score, off = score_words(words, target_word_rules(queue))
+        if _below(score) and len(off) < len(words): packet["target_words"] = [w for w in words if w not in off]
+    replaced = 0
+    if redo:
+        refetched = asyncio.run(_fanout(grade, r_level, theme, [queue[i] for i in redo], None, FANOUT_CONCURRENCY, with_cover=False))
+        for i, act in zip(redo, refetched["slots"]):
+            if act is not None and (score_activity(act, queue[i])[0] or 0) > scores[i]: slots[i] = act; replaced += 1
+        get_generation_stats().rechecked(len(redo), replaced)
+    packet["activities"] = [act for act in slots if act is not None]
+    return packet
+
+def build_local(grade, r_level, queue, on_activity=None):
+    # Fast mode: word-only activities come from the bundled lexicon in milliseconds. Returns queue-aligned slots.
+    from .lexicon import build_local_activity # the lexicon is only opened once fast mode is used
+    with span("generate.local"): slots = [build_local_activity(item, grade, r_level) for item in queue]
+    for act in slots:
+        if act is not None and on_activity: on_activity(act)
+    return slots
+
+def run_generation(grade, r_level, theme, queue, on_activity=None, fast=False):
+    # Returns (packet or None, number of planned activities missing from it).
+    slots = build_local(grade, r_level, queue, on_activity) if fast else [None] * len(queue)
+    rest = [item for item, act in zip(queue, slots) if act is None]
+    if not rest: packet = None
+    elif GENERATION_MODE == "fanout": packet = generate_fanout(grade, r_level, theme, rest, on_activity)
+    else: packet = generate_single(grade, r_level, theme, rest, on_activity)
+    if fast:
+        remote = iter(match_activities(rest, packet["activities"]) if packet else [None] * len(rest))
+        slots = [act if act is not None else next(remote) for act in slots]
+        if any(slots):
+            from .lexicon import local_cover
+            packet = packet or local_cover(grade, queue)
+            packet["activities"] = [act for act in slots if act is not None]
+    if packet is not None and PHONICS_CHECK: packet = recheck_phonics(grade, r_level, theme, queue, packet)
+    return packet, len(queue) - len(packet["activities"]) if packet else len(queue)
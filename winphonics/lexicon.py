@@ -0,0 +1,172 @@
+# --- LOCAL LEXICON (bundled word index; fast mode builds word-only activities without Gemini) ---
+#   python -m winphonics.lexicon     rebuilds data/lexicon.tsv from data/words.txt
+import mmap, os, random, re
+
+from .catalog import DIFFICULTIES, GRADE_LEVELS, PHONICS_MENU
+from .phonics import MATCHERS, on_target
+from .util import singleton
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+LEXICON_SOURCE = os.path.join(LEXICON_DIR, "words.txt")
+LEXICON_PATH = os.path.join(LEXICON_DIR, "lexicon.tsv")
+REAL_WORDS_PATH = os.path.join(LEXICON_DIR, "real_words.txt") # common English words a nonsense word must not be
+BLOCKED_WORDS_PATH = os.path.join(LEXICON_DIR, "blocked_words.txt") # profanity and slang, kept off every page
+
+class Lexicon:
+    # One line per (category, target, grade first taught): "category\ttarget\tgrade\tword word ...". The file is
+    # memory-mapped; opening it only indexes line offsets, and each word list is decoded the first time it is read.
+    def __init__(self, path):
+        with open(path, "rb") as f: self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._spans, self._decoded, self._all = {}, {}, None
+        pos, size = 0, len(self._map)
+        while pos < size:
+            end = self._map.find(b"\n", pos)
+            if end < 0: end = size
+            words_at = pos
+            for _ in range(3): words_at = self._map.find(b"\t", words_at) + 1
+            self._spans[tuple(self._map[pos:words_at - 1].decode("utf-8").split("\t"))] = (words_at, end)
+            pos = end + 1
+
+    def _words(self, key):
+        words = self._decoded.get(key)
+        if words is None:
+            start, end = self._spans.get(key, (0, 0))
+            words = self._decoded[key] = self._map[start:end].decode("utf-8").split()
+        return words
+
+    def words(self, cat, target, grade):
+        # Every word for the target that is taught by this grade.
+        upto = GRADE_LEVELS[:GRADE_LEVELS.index(grade) + 1] if grade in GRADE_LEVELS else GRADE_LEVELS
+        return [w for g in upto for w in self._words((cat, target, g))]
+
+    def all_words(self):
+        if self._all is None: self._all = frozenset(w for key in self._spans for w in self._words(key))
+        return self._all
+
+@singleton
+def get_lexicon(): return Lexicon(LEXICON_PATH)
+
+def _bases(word, ending):
+    # The words an inflected form could come from: jumped <- jump, hoped <- hope, hopped <- hop, cried <- cry.
+    stem = word[:-len(ending)]
+    bases = {stem, stem + "e"}
+    if len(stem) > 2 and stem[-1] == stem[-2]: bases.add(stem[:-1])
+    if stem.endswith("i"): bases.add(stem[:-1] + "y")
+    return bases
+
+def build_lexicon(source=LEXICON_SOURCE, path=LEXICON_PATH):
+    # Files every source word under each target whose matcher accepts it. Returns the number of index lines.
+    with open(source, encoding="utf-8") as f:
+        rows = [line.rstrip("\n").split("\t", 1) for line in f if line.strip() and not line.startswith("#")]
+    known = {w for _, words in rows for w in words.split()}
+    index = {}
+    for grade, words in rows:
+        for word in words.split():
+            for (cat, target), matcher in MATCHERS.items():
+                # "Mixed ..." targets are read as the union of their siblings, so they get no lines of their own.
+                if target.startswith("Mixed") or not on_target(word, (matcher,)): continue
+                # An ending only counts when the base word is in the list too (not tiger, sister or forest).
+                if cat == "Endings" and not _bases(word, target) & known: continue
+                index.setdefault((cat, target, grade), []).append(word)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for key in sorted(index): f.write("\t".join(key) + "\t" + " ".join(dict.fromkeys(index[key])) + "\n")
+    return len(index)
+
+# --- FAST MODE BUILDERS ---
+MYSTERY_COLORS = ["Red", "Blue", "Green", "Yellow"]
+NONSENSE_ONSETS = "b d f g h j k l m n p r s t v w z bl cl fl gl pl sl br cr dr fr gr pr tr sn sp st sk sw sh ch th".split()
+NONSENSE_ENDINGS = ("s", "es", "ed", "ing", "er", "est")
+NONSENSE_TASKS = ["1. Read each row aloud: tap the sounds, then blend them.",
+                  "2. Circle the {focus} spelling in every word.",
+                  "3. Pick three words and write a real word that rhymes with each one."]
+
+def _targets(cat, sounds):
+    # The item's targets that have a matcher, with "Mixed ..." expanded to its siblings.
+    menu = [t for t in PHONICS_MENU.get(cat, []) if not t.startswith("Mixed") and (cat, t) in MATCHERS]
+    picked = [t for s in sounds for t in (menu if s.startswith("Mixed") else [s])]
+    return [t for t in dict.fromkeys(picked) if (cat, t) in MATCHERS]
+
+def _item_words(lex, item, grade):
+    return list(dict.fromkeys(w for t in _targets(item["cat"], item["sounds"]) for w in lex.words(item["cat"], t, grade)))
+
+def _pick(words, n, r_level, rng):
+    # n distinct words: shorter ones for Beginning, longer for Advanced. None when there aren't enough.
+    words = sorted(set(words), key=lambda w: (len(w), w))
+    if len(words) < n: return None
+    level = DIFFICULTIES.index(r_level) if r_level in DIFFICULTIES else 1
+    window = max(n, len(words) * 2 // 3)
+    start = (len(words) - window) * level // 2
+    return rng.sample(words[start:start + window], n)
+
+def _word_search(lex, item, grade, r_level, rng):
+    words = _pick([w for w in _item_words(lex, item, grade) if len(w) <= 10], 10, r_level, rng)
+    return words and {"word_search": words}
+
+def _sound_mapping(lex, item, grade, r_level, rng):
+    words = _pick(_item_words(lex, item, grade), 10, r_level, rng)
+    return words and {"map_words": words}
+
+def _mystery_grid(lex, item, grade, r_level, rng):
+    # Four colours, one target each: the planned targets first, then their siblings for contrast.
+    # A colour only gets words that match none of the other colours' targets.
+    cat = item["cat"]
+    def only(target, chosen):
+        others = tuple(MATCHERS[(cat, t)] for t in chosen if t != target)
+        return [w for w in lex.words(cat, target, grade) if not on_target(w, others)]
+    chosen = []
+    for target in dict.fromkeys(_targets(cat, item["sounds"]) + _targets(cat, ["Mixed"])):
+        if all(len(only(t, chosen + [target])) >= 8 for t in chosen + [target]): chosen.append(target)
+        if len(chosen) == len(MYSTERY_COLORS): break
+    if len(chosen) < len(MYSTERY_COLORS): return None
+    return {"mystery_grid": {"legend": dict(zip(MYSTERY_COLORS, chosen)),
+                             "color_words": {color: _pick(only(t, chosen), 8, r_level, rng) for color, t in zip(MYSTERY_COLORS, chosen)}}}
+
+def _word_file(path):
+    with open(path, encoding="utf-8") as f: return frozenset(w for line in f if not line.startswith("#") for w in line.split())
+
+@singleton
+def get_word_filters():
+    # (real words, blocked words, blocked roots): the lexicon plus real_words.txt, and blocked_words.txt, whose
+    # entries of four or more letters are also blocked inside longer words.
+    blocked = _word_file(BLOCKED_WORDS_PATH)
+    return _word_file(REAL_WORDS_PATH) | get_lexicon().all_words(), blocked, tuple(b for b in blocked if len(b) > 3)
+
+def is_real_or_blocked(word):
+    # True for a word we know (or an inflection of one: vasts, slided) and for anything on or containing the blocklist.
+    real, blocked, roots = get_word_filters()
+    if any(r in word for r in roots): return True
+    forms = {word}.union(*(_bases(word, e) for e in NONSENSE_ENDINGS if word.endswith(e)))
+    return bool(forms & real or forms & blocked)
+
+def _nonsense(lex, item, grade, r_level, rng):
+    # Real pattern words with their onset swapped, kept only if still on target and not a real or blocked word.
+    targets = _targets(item["cat"], item["sounds"])
+    rules = tuple(MATCHERS[(item["cat"], t)] for t in targets)
+    pseudo = set()
+    for word in _item_words(lex, item, grade):
+        rime = re.sub("^[b-df-hj-np-tv-z]+(?=[aeiouy])", "", word) # cry keeps its y: bry, not br
+        for onset in NONSENSE_ONSETS:
+            w = onset + rime
+            if len(w) <= 7 and on_target(w, rules) and not is_real_or_blocked(w): pseudo.add(w)
+    words = _pick(pseudo, 21, r_level, rng)
+    return words and {"words": words, "detective_task": [t.format(focus=" / ".join(targets)) for t in NONSENSE_TASKS]}
+
+LOCAL_BUILDERS = {"Phonics Word Search": _word_search, "Mystery Grid (Color-by-Code)": _mystery_grid,
+                  "Nonsense Word Fluency": _nonsense, "Sound Mapping": _sound_mapping}
+
+def build_local_activity(item, grade, r_level, rng=random):
+    # The activity built from the lexicon, or None when its type or targets need the model.
+    build = LOCAL_BUILDERS.get(item["type"])
+    content = build and build(get_lexicon(), item, grade, r_level, rng)
+    return {"type": item["type"], "content": content} if content else None
+
+def local_cover(grade, queue, rng=random):
+    lex = get_lexicon()
+    focus = ", ".join(dict.fromkeys(t for item in queue for t in item["sounds"]))
+    words = sorted({w for item in queue for w in _item_words(lex, item, grade)})
+    return {"overview": f"This packet practices {focus}. Read, sort and build words that use these spelling patterns, "
+                        "then show what you know in the games and puzzles. Check off each page as you finish it.",
+            "target_words": rng.sample(words, min(10, len(words)))}
+
+if __name__ == "__main__":
+    print(f"wrote {build_lexicon()} index lines to {LEXICON_PATH}")
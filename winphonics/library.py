@@ -0,0 +1,124 @@
+# --- PACKET LIBRARY (every generated packet, kept locally with a full-text index for search and reuse) ---
+import os, json, re, threading, time, sqlite3
+
+from .gencache import CACHE_DIR
+from .packet import MysteryGrid, NonsenseWords, RiddleCards, SentenceMatch, SoundMapping, Story, WordScramble, WordSearchWords, WordSort, parse_packet
+from .util import content_hash, singleton
+
+LIBRARY_PATH = os.path.join(CACHE_DIR, "library.sqlite3")
+LIBRARY_MAX_PACKETS = 5000 # oldest packets beyond this are dropped
+LIBRARY_SNIPPET_WORDS = 12
+
+# Per content type: (title text, body text, word-list text) pulled from the typed packet.
+EXTRACTORS = {
+    Story: lambda c: ([c.title], list(c.paragraphs) + [t for qa in c.questions for t in qa], []),
+    NonsenseWords: lambda c: ([], list(c.tasks), list(c.words)),
+    WordSort: lambda c: ([], [name for name, _ in c.columns], [w for _, words in c.columns for w in words]),
+    SentenceMatch: lambda c: ([], list(c.left) + list(c.right), []),
+    SoundMapping: lambda c: ([], [], list(c.words)),
+    RiddleCards: lambda c: ([], [clue for r in c.riddles for clue in r[:3]], [r[3] for r in c.riddles]),
+    MysteryGrid: lambda c: ([], [target for _, target in c.legend], [w for words in c.color_words.values() for w in words]),
+    WordSearchWords: lambda c: ([], [], list(c.words)),
+    WordScramble: lambda c: ([], [clue for _, clue in c.items], [word for word, _ in c.items]),
+}
+
+def packet_text(packet):
+    # (title, body, words) for the index. Untitled packets are named after their targets.
+    p = parse_packet(packet)
+    titles, body, words = [], [p.overview], list(p.target_words)
+    for act in p.activities:
+        t, b, w = EXTRACTORS[type(act.content)](act.content)
+        titles += t; body += b; words += w
+    return " / ".join(t for t in titles if t), " ".join(t for t in body if t), " ".join(dict.fromkeys(w for w in words if w))
+
+def _match(query):
+    # Every word must appear, as a prefix ("frog" finds "frogs"); quoting keeps FTS syntax out of user input.
+    return " ".join(f'"{t}"*' for t in re.findall(r"\w+", query.lower()))
+
+class PacketLibrary:
+    def __init__(self, path, max_packets):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_packets = max_packets
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS packets (id INTEGER PRIMARY KEY AUTOINCREMENT, packet_key TEXT UNIQUE NOT NULL,
+                saved REAL NOT NULL, grade TEXT, r_level TEXT, theme TEXT, cats TEXT, sounds TEXT, types TEXT,
+                title TEXT, plan TEXT NOT NULL, packet TEXT NOT NULL, seed INTEGER NOT NULL, doc TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS packets_by_saved ON packets(saved);
+        """)
+        # SQLite builds without FTS5 fall back to a LIKE scan over the same text.
+        try:
+            with self._db:
+                self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS packet_text USING fts5(title, body, words, meta, tokenize='porter unicode61', prefix='2 3')")
+                # Title hits weigh most, then word lists; kept in the index so ORDER BY rank only snippets the rows returned.
+                self._db.execute("INSERT INTO packet_text (packet_text, rank) VALUES ('rank', 'bm25(8.0, 1.0, 3.0, 2.0)')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self.saves = 0
+        self.searches = 0
+        self.search_s = 0.0
+
+    def add(self, plan, packet, seed):
+        # plan is normalize_plan()'s dict. The same packet saved again (a cache hit) keeps one row and takes the
+        # newer seed, which is the one whose PDFs are most likely still in the render cache. Returns the row id.
+        key = content_hash(packet)
+        queue = plan.get("queue", [])
+        cats = " · ".join(dict.fromkeys(item["cat"] for item in queue))
+        sounds = " · ".join(dict.fromkeys(s for item in queue for s in item["sounds"]))
+        types = " · ".join(dict.fromkeys(item["type"] for item in queue))
+        title, body, words = packet_text(packet)
+        title = title or f"{sounds} practice"
+        meta = " ".join([plan.get("grade", ""), plan.get("r_level", ""), plan.get("theme", ""), cats, sounds, types])
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute("SELECT id FROM packets WHERE packet_key = ?", (key,)).fetchone()
+            if row:
+                self._db.execute("UPDATE packets SET saved = ?, seed = ? WHERE id = ?", (now, seed, row[0]))
+                return row[0]
+            pid = self._db.execute("""INSERT INTO packets (packet_key, saved, grade, r_level, theme, cats, sounds, types, title, plan, packet, seed, doc)
+                                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                   (key, now, plan.get("grade"), plan.get("r_level"), plan.get("theme"), cats, sounds, types, title,
+                                    json.dumps(plan), json.dumps(packet), seed, " ".join([title, body, words, meta]).lower())).lastrowid
+            if self.fts: self._db.execute("INSERT INTO packet_text (rowid, title, body, words, meta) VALUES (?, ?, ?, ?, ?)", (pid, title, body, words, meta))
+            stale = [r[0] for r in self._db.execute("SELECT id FROM packets ORDER BY saved DESC LIMIT -1 OFFSET ?", (self.max_packets,))]
+            for old in stale:
+                self._db.execute("DELETE FROM packets WHERE id = ?", (old,))
+                if self.fts: self._db.execute("DELETE FROM packet_text WHERE rowid = ?", (old,))
+            self.saves += 1
+            return pid
+
+    def search(self, query="", grade=None, limit=20):
+        # Best matches first; an empty query lists the newest packets.
+        started = time.perf_counter()
+        cols = "p.id, p.saved, p.grade, p.r_level, p.theme, p.cats, p.sounds, p.types, p.title"
+        where, args = ["(? IS NULL OR p.grade = ?)"], [grade, grade]
+        match = _match(query)
+        with self._lock:
+            if match and self.fts:
+                rows = self._db.execute(f"""SELECT {cols}, snippet(packet_text, -1, '**', '**', '…', {LIBRARY_SNIPPET_WORDS})
+                                            FROM packet_text JOIN packets p ON p.id = packet_text.rowid
+                                            WHERE packet_text MATCH ? AND {where[0]}
+                                            ORDER BY rank LIMIT ?""", [match, *args, limit]).fetchall()
+            else:
+                for t in re.findall(r"\w+", query.lower()): where.append("p.doc LIKE ?"); args.append(f"%{t}%")
+                rows = self._db.execute(f"SELECT {cols}, '' FROM packets p WHERE {' AND '.join(where)} ORDER BY p.saved DESC LIMIT ?",
+                                        [*args, limit]).fetchall()
+            self.searches += 1; self.search_s += time.perf_counter() - started
+        names = ("id", "saved", "grade", "r_level", "theme", "cats", "sounds", "types", "title", "snippet")
+        return [dict(zip(names, r)) for r in rows]
+
+    def get(self, pid):
+        # (plan, packet, seed) for a saved packet, or None.
+        with self._lock: row = self._db.execute("SELECT plan, packet, seed FROM packets WHERE id = ?", (pid,)).fetchone()
+        return row and (json.loads(row[0]), json.loads(row[1]), row[2])
+
+    def stats(self):
+        with self._lock:
+            (packets,) = self._db.execute("SELECT count(*) FROM packets").fetchone()
+            return {"packets": packets, "saves": self.saves, "searches": self.searches, "fts": self.fts,
+                    "search_ms_mean": self.search_s * 1000 / self.searches if self.searches else 0.0}
+
+@singleton
+def get_packet_library(): return PacketLibrary(LIBRARY_PATH, LIBRARY_MAX_PACKETS)
@@ -0,0 +1,122 @@
+# --- PACKET MODEL (model JSON validated once into typed, slotted records for the renderer) ---
+from dataclasses import dataclass
+
+from .util import clean_text
+from .wordsearch import word_search_words
+
+DEFAULT_OVERVIEW = "Practice targeted phonics skills."
+# The quantity rules from the prompt, enforced here so a chatty model can't overflow a page.
+MAX_NONSENSE_WORDS = 21
+MAX_RIDDLES = 8
+MAX_SCRAMBLES = 8
+MAX_MYSTERY_COLORS = 4
+
+def _text(value):
+    return clean_text(value).strip() if isinstance(value, (str, int, float)) and not isinstance(value, bool) else ""
+
+def _texts(value, limit=None):
+    # A list of non-empty strings; anything else (a bare string, a dict, null) is dropped.
+    items = [t for t in map(_text, value) if t] if isinstance(value, list) else []
+    return tuple(items[:limit])
+
+def _dict(value): return value if isinstance(value, dict) else {}
+
+def _list(value): return value if isinstance(value, list) else []
+
+@dataclass(slots=True)
+class Story:
+    title: str
+    paragraphs: tuple
+    questions: tuple # (question, answer)
+
+@dataclass(slots=True)
+class NonsenseWords:
+    words: tuple
+    tasks: tuple
+
+@dataclass(slots=True)
+class WordSort:
+    columns: tuple # (heading, words)
+
+@dataclass(slots=True)
+class SentenceMatch:
+    left: tuple
+    right: tuple
+
+@dataclass(slots=True)
+class SoundMapping:
+    words: tuple
+
+@dataclass(slots=True)
+class RiddleCards:
+    riddles: tuple # (clue1, clue2, clue3, answer)
+
+@dataclass(slots=True)
+class MysteryGrid:
+    legend: tuple # (colour, target)
+    color_words: dict # colour -> tuple of words
+
+@dataclass(slots=True)
+class WordSearchWords:
+    words: tuple
+
+@dataclass(slots=True)
+class WordScramble:
+    items: tuple # (word, clue)
+
+@dataclass(slots=True)
+class Activity:
+    type: str
+    content: object
+
+@dataclass(slots=True)
+class Packet:
+    overview: str
+    target_words: tuple
+    activities: tuple
+
+def _story(c, act):
+    questions = tuple((_text(q.get("q")), _text(q.get("a"))) for q in _list(c.get("questions")) if isinstance(q, dict))
+    return Story(_text(c.get("title")), _texts(c.get("paragraphs")), questions)
+
+def _sort(c, act):
+    return WordSort(tuple((_text(name), _texts(words)) for name, words in _dict(c.get("sort_cats")).items() if _text(name)))
+
+def _riddles(c, act):
+    cards = [r for r in _list(c.get("riddles")) if isinstance(r, dict)][:MAX_RIDDLES]
+    return RiddleCards(tuple((_text(r.get("clue1")), _text(r.get("clue2")), _text(r.get("clue3")), _text(r.get("ans"))) for r in cards))
+
+def _mystery(c, act):
+    grid = _dict(c.get("mystery_grid"))
+    words = {_text(k): _texts(v) for k, v in _dict(grid.get("color_words")).items() if _text(k)}
+    legend = [(_text(k), _text(v)) for k, v in _dict(grid.get("legend")).items() if _text(k)] or [(k, "") for k in words]
+    return MysteryGrid(tuple(legend[:MAX_MYSTERY_COLORS]), words)
+
+def _scramble(c, act):
+    items = [(_text(s.get("word")), _text(s.get("clue"))) for s in _list(c.get("word_scramble")) if isinstance(s, dict)]
+    return WordScramble(tuple(item for item in items if item[0])[:MAX_SCRAMBLES])
+
+PARSERS = {
+    "Decodable Story": _story,
+    "Nonsense Word Fluency": lambda c, act: NonsenseWords(_texts(c.get("words"), MAX_NONSENSE_WORDS), _texts(c.get("detective_task"))),
+    "Word Bank Sort": _sort,
+    "Sentence Match": lambda c, act: SentenceMatch(_texts(c.get("match_l")), _texts(c.get("match_r"))),
+    "Sound Mapping": lambda c, act: SoundMapping(_texts(c.get("map_words"))),
+    "Detective Riddle Cards": _riddles,
+    "Mystery Grid (Color-by-Code)": _mystery,
+    # Same list (and the same grid cache key) the app pre-builds while the packet is still generating.
+    "Phonics Word Search": lambda c, act: WordSearchWords(tuple(word_search_words(act))),
+    "Word Scramble": _scramble,
+}
+
+def parse_packet(data):
+    # One pass over the raw packet dict. Unknown types and activities without a content object are
+    # dropped rather than crashing the render; every string is cleaned here, once.
+    if isinstance(data, Packet): return data
+    data = _dict(data)
+    activities = []
+    for act in _list(data.get("activities")):
+        if not isinstance(act, dict) or not isinstance(act.get("content"), dict): continue
+        parse = PARSERS.get(act.get("type"))
+        if parse: activities.append(Activity(act["type"], parse(act["content"], act)))
+    return Packet(_text(data.get("overview")) or DEFAULT_OVERVIEW, _texts(data.get("target_words")), tuple(activities))
@@ -0,0 +1,191 @@
+# --- PHONICS PATTERN VALIDATOR (local regexes, no model call) ---
+import re
+from functools import lru_cache
+
+from .catalog import PHONICS_MENU
+
+PHONICS_MIN_SCORE = 0.7 # activities with a smaller share of on-target words are re-requested
+C = "[b-df-hj-np-tv-z]" # consonant letters
+CODA = "[b-df-hj-np-tv-xz]" # consonants that can close a short-vowel syllable (a final y is a vowel: baby)
+VOWEL_TEAMS = "ai|ay|ee|ea|oa|ow|oo|ou|oi|oy|au|aw|ew|ie|igh|ue"
+# Closed syllables whose vowel isn't short: "igh" (night), -ind/-ild (kind, wild), -old/-olt (cold, bolt), -all/-alk (ball, talk).
+SHORT_EXCEPTIONS = {"a": "ll|lk|lt$|ld$", "e": "", "i": "nd$|ld$", "o": "ld$|lt$", "u": ""}
+
+def _short(vowels):
+    # One closed syllable around a single short vowel.
+    v = "|".join(f"{v}(?![rwy]|gh{'|' + SHORT_EXCEPTIONS[v] if SHORT_EXCEPTIONS[v] else ''})" for v in vowels)
+    return rf"^{C}*(?:{v}){CODA}+$"
+
+def _magic_e(v):
+    # A lone vowel, one consonant (not r, w, x or y) and a final e that stays silent: -es only after a
+    # non-hissing consonant (cakes, not buses) and -ed only after one that isn't t or d (hoped, not skated).
+    return rf"(?<![aeiou]){v}(?:[bfkmnpv]e[sd]?|[cgsz]e|[cgsz]ed|[dt]es?|l(?:e|es|ed))$"
+
+def _forms(words):
+    # Matches the listed words and their -s / -es / -ed / -ing / -er / -y forms.
+    return re.compile(rf"^(?:{'|'.join(words.split())})(?:s|es|ed|ing|er|ers|y)?$").match
+
+def _unless(pattern, words):
+    # pattern, except in the listed words, whose letters spell some other sound.
+    search, skip = re.compile(pattern).search, _forms(words)
+    return lambda w: not skip(w) and search(w)
+
+def _ending(suffix, stem_pattern, stem_tail=None):
+    # A suffix on a real base word: the stem keeps a vowel (so bed, ring, nest and her don't count) and,
+    # when given, ends the way this ending needs. Stems are not looked up, so this stays a local rule.
+    has_vowel, tail = re.compile(stem_pattern).search, stem_tail and re.compile(stem_tail).search
+    n = len(suffix)
+    return lambda w: w.endswith(suffix) and len(w) > n + 1 and bool(has_vowel(w[:-n])) and (not tail or bool(tail(w[:-n])))
+
+STEM_VOWEL = "[aeiou]|(?<=.)y" # a y counts once it isn't the first letter (flying, cried)
+_s = _ending("s", STEM_VOWEL)
+_es = _ending("es", STEM_VOWEL, "(?:s|x|z|ch|sh|[^aeiou]o)$")
+_ies = lambda w: bool(re.search(f"{C}ies$", w) and re.search(STEM_VOWEL, w[:-3] + "y")) # babies, cries
+_open = re.compile(rf"^{C}*[aeiouy](?![xw]){C}[aeiouy]").search
+_closed_stem = re.compile(_short("aeiou")).search
+# Two closed syllables: lone vowels (not mailbox), neither followed by r, w or y (not farmer, rainbow, enjoy).
+_closed_closed = re.compile(rf"(?<![aeiou])[aeiou](?![aeiourwy]){C}{{2,}}[aeiou](?![rwy]){CODA}+$").search
+
+def _inflected(w):
+    # A one-syllable word plus an ending (wishes, rested, jumping, coldest): two syllables, but not two closed ones.
+    return any(w.endswith(suffix) and re.fullmatch(f"{C}*[aeiou]{C}+", w[:-len(suffix)]) for suffix in ("es", "ed", "ing", "er", "est"))
+
+def _vowel_r(v): return rf"{v}r(?:(?![aeiouy])|es?$)" # r closing the syllable (car, care), not starting the next (zero, very)
+# "ow" as in cow rather than snow, and other words whose team letters make a different sound.
+OW_AS_IN_COW = ("cow how now wow brow plow vow allow owl howl growl prowl scowl fowl down town gown brown clown crown frown "
+                "drown crowd chowder powder flower power tower shower towel vowel")
+OU_NOT_OW = ("you your four pour court touch young country soup group could would should through though tough rough "
+             "enough cousin double trouble shoulder boulder route youth")
+EA_NOT_LONG = "bread head dead thread spread instead ready heavy weather feather sweat breath sweater breakfast meadow deaf health wealth great steak break"
+OO_NOT_LONG = "good wood hood stood foot wool soot blood flood"
+MAGIC_E_NOT_LONG = {"a": "have", "i": "give live olive", "o": "come some done gone none one love glove dove above shove move lose", "u": ""}
+_ou, _ow_as_in_cow = _unless("ou", OU_NOT_OW), _forms(OW_AS_IN_COW)
+
+# (pattern or predicate, minimum syllables) per category and target. Targets that spell out their
+# letters, like "Long A (ai, ay)", are matched on those letters unless they have an entry here.
+TARGET_PATTERNS = {
+    "CVC (Short Vowels)": {"Short A": _short("a"), "Short E": _short("e"), "Short I": _short("i"), "Short O": _short("o"),
+                           "Short U": _short("u"), "Mixed Short Vowels": _short("aeiou")},
+    "Consonant Digraphs": {"sh": "sh", "ch": "ch", "th": "th", "wh": "wh", "ck": "ck", "Mixed Digraphs": "sh|ch|th|wh|ck|ph|ng"},
+    "Consonant Blends": {"L-Blends": "^(?:[bcfgps]l|spl)", "R-Blends": "^(?:[bcdfgpt]r|s[cpt]r)", "S-Blends": "^s[cklmnptw]",
+                         "Final Blends": "(?:n[dtk]|mp|s[tkp]|l[tdkpf]|[fcpx]t)s?$"},
+    "Magic E (CVCe)": {**{f"{v}-e": _unless(_magic_e(v), MAGIC_E_NOT_LONG[v] or "(?!)") for v in "aiou"},
+                       "Mixed Magic E": _unless(_magic_e("[aeiou]"), " ".join(MAGIC_E_NOT_LONG.values()) + " were there where")},
+    "Vowel r": {**{v + "r": _vowel_r(v) for v in "aoeiu"}, "Mixed Vowel r": _vowel_r("[aeiou]")},
+    "Predictable Vowel Teams": {"Long A (ai, ay)": _unless("ai(?!r)|ay", "said again against plaid"),
+                                "Long E (ee, ea)": _unless("e[ea](?!r)", EA_NOT_LONG),
+                                "Long O (oa, ow)": _unless("oa(?!r)|ow", OW_AS_IN_COW),
+                                "Long I (igh, ie)": rf"igh|^{C}*ie[sd]?$"}, # pie, tied, flies; not field or babies
+    "Variant Vowel Teams": {"/ow/ (ou, ow)": lambda w: _ou(w) or _ow_as_in_cow(w),
+                            "/oy/ (oi, oy)": "oi(?!ng$)|oy", # not doing, going
+                            "/oo/ (oo, ew)": _unless("oo(?![kr])|ew", OO_NOT_LONG), # not book, door
+                            "/aw/ (au, aw)": _unless("(?<![aeiou])(?:au|(?<!^)aw|^aw(?!a))", "laugh aunt")}, # not seaweed, away
+    "Multisyllable": {"closed/closed": (lambda w: _closed_closed(w) and not _inflected(w), 2), "silent e": (_magic_e("[aeiou]"), 2),
+                      # not a closed word + -es (buses, boxes), whose first vowel stays short
+                      "open": (lambda w: _open(w) and not (w.endswith("es") and _closed_stem(w[:-2])), 2), "vowel team": (VOWEL_TEAMS, 2),
+                      "consonant le": (rf"{C}le$", 2), "vowel r": (_vowel_r("[aeiou]"), 2)},
+    "Endings": {"ed": _ending("ed", STEM_VOWEL, "[^e]$"), "ing": _ending("ing", STEM_VOWEL),
+                # -s: not ss, -us, -is (dress, bus, this), a bare consonant + a/e stem (gas, has, yes) or an -es plural (boxes)
+                "s": lambda w: _s(w) and not re.search("[siu]s$", w) and not re.fullmatch(f"{C}+[ae]s", w) and not _es(w) and not _ies(w),
+                "es": lambda w: _es(w) or _ies(w), # boxes, wishes, heroes
+                "er": _ending("er", STEM_VOWEL, "[^e]$"), "est": _ending("est", STEM_VOWEL, "[^e]$")},
+}
+
+def _compile(cat, target):
+    spec = TARGET_PATTERNS.get(cat, {}).get(target)
+    spelled = re.search(r"\(([^)]*)\)", target)
+    if spec is None and spelled: spec = "|".join(re.escape(a.strip()) for a in spelled.group(1).split(","))
+    if spec is None: return None
+    pattern, min_syllables = spec if isinstance(spec, tuple) else (spec, 1)
+    return (pattern if callable(pattern) else re.compile(pattern).search), min_syllables
+
+# Compiled once at import; targets without one ("All Patterns Combined") are never scored.
+MATCHERS = {(cat, target): m for cat, targets in PHONICS_MENU.items() for target in targets if (m := _compile(cat, target))}
+
+def syllables(word):
+    # Vowel groups, less a silent final e (whale, but not the -le of table), a silent -es (cakes, not boxes)
+    # or a silent -ed after a consonant (jumped, played, not seaweed).
+    groups = len(re.findall("[aeiouy]+", word))
+    silent = (re.search(rf"{C}e$", word) and not re.search(rf"{C}le$", word) or re.search(rf"{C}es$", word) and not re.search("(?:[sxzcg]|[cs]h)es$", word)
+              or re.search(rf"{C}ed$", word) and not re.search("[td]ed$", word))
+    return groups - 1 if groups > 1 and silent else groups
+
+@lru_cache(maxsize=256)
+def _rules(cat, targets):
+    # A matcher for every target, or () when any of them can't be judged locally.
+    rules = tuple(MATCHERS.get((cat, t)) for t in targets)
+    return rules if rules and None not in rules else ()
+
+def on_target(word, rules):
+    w = re.sub("[^a-z]", "", str(word).lower())
+    return bool(w) and any(search(w) and (n < 2 or syllables(w) >= n) for search, n in rules)
+
+def score_words(words, rules):
+    # Returns (share of words on target or None when there is nothing to judge, the off-target words).
+    if not rules or not words: return None, []
+    off = [w for w in words if not on_target(w, rules)]
+    return 1 - len(off) / len(words), off
+
+def _flat(value):
+    if isinstance(value, dict): value = [w for ws in value.values() if isinstance(ws, list) for w in ws]
+    return [w for w in value if isinstance(w, str)] if isinstance(value, list) else []
+
+def _named_groups(words_by_name, names=None):
+    # [(name, words)] for a {name: [words]} mapping; names (a legend) can relabel the keys.
+    if not isinstance(words_by_name, dict): return []
+    names = names if isinstance(names, dict) else {}
+    return [(names.get(key, key), _flat(words)) for key, words in words_by_name.items()]
+
+# The word lists each activity type is scored on, as (group name or None, words); other types are not checked.
+# Sort columns and colour-by-code colours are often the target set against its siblings, so a group
+# whose name is a target of the category is scored on that target rather than the planned ones.
+SCORED_WORDS = {
+    "Phonics Word Search": lambda c: [(None, _flat(c.get("word_search")))],
+    "Sound Mapping": lambda c: [(None, _flat(c.get("map_words")))],
+    "Mystery Grid (Color-by-Code)": lambda c: _named_groups((c.get("mystery_grid") or {}).get("color_words"), (c.get("mystery_grid") or {}).get("legend")),
+    "Word Bank Sort": lambda c: _named_groups(c.get("sort_cats")),
+}
+NAMED_MATCHERS = {(cat, target.lower()): m for (cat, target), m in MATCHERS.items()}
+
+def score_activity(act, item):
+    groups = SCORED_WORDS.get(act.get("type"))
+    if groups is None: return None, []
+    planned, total, off = _rules(item["cat"], tuple(item["sounds"])), 0, []
+    for name, words in groups(act.get("content") or {}):
+        named = NAMED_MATCHERS.get((item["cat"], name.strip().lower())) if isinstance(name, str) else None
+        rules = (named,) if named else planned
+        if not rules: continue
+        total += len(words); off += [w for w in words if not on_target(w, rules)]
+    return (1 - len(off) / total, off) if total else (None, [])
+
+# --- SOUND BOXES (grapheme-to-phoneme segmentation for Sound Mapping) ---
+# Spellings that stand for one sound, longest first so "igh" wins over "i" and "tch" over "t".
+GRAPHEMES = sorted(("eigh ough igh tch dge "
+                    "sh ch th wh ph ck ng kn wr mb qu "
+                    "ai ay ee ea oa ow oo ou oi oy au aw ew ie ue ey "
+                    "ar or er ir ur "
+                    "ll ss ff zz tt bb dd gg mm nn pp rr").split(), key=len, reverse=True)
+
+@lru_cache(maxsize=4096)
+def segment_word(word):
+    # One box per sound: "night" -> (n, igh, t). A silent final e joins its vowel ("cake" -> c, a_e, k),
+    # and the endings -s/-es, -ed and consonant -le are a box each ("jumped" -> j, u, m, p, ed), peeled off
+    # first so the e still marks the base word (cakes -> c, a_e, k, s; hoped -> h, o_e, p, ed).
+    w = re.sub("[^a-z]", "", str(word).lower())
+    plural = re.search(rf"[aeiouy].*?((?:(?<=[sxz])|(?<=[cs]h))es|(?<![su])s)$", w)
+    if plural: w = w[:-len(plural.group(1))]
+    tail = re.search(rf"[aeiouy].*?(?<={C})(ed|le)$", w)
+    if tail: w = w[:-2] + ("e" if tail.group(1) == "ed" and re.fullmatch(rf"{C}*[aeiou](?![rwxy]){C}", w[:-2]) else "")
+    magic = re.search(rf"([aeiou]){C}e$", w)
+    if magic: w = w[:-1]
+    sounds, i = [], 0
+    while i < len(w):
+        if magic and i == magic.start(1): sounds.append(f"{w[i]}_e"); i += 1; continue
+        g = next((g for g in GRAPHEMES if w.startswith(g, i)), w[i])
+        sounds.append(g); i += len(g)
+    return tuple(sounds) + tuple(m.group(1) for m in (tail, plural) if m)
+
+def target_word_rules(queue):
+    # The cover word bank may draw on any planned target; unknown if any activity can't be judged.
+    rules = [_rules(item["cat"], tuple(item["sounds"])) for item in queue]
+    return () if not rules or () in rules else tuple(r for rs in rules for r in rs)
@@ -0,0 +1,475 @@
+# --- BULLETPROOF PDF RENDERER ---
+import random, threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .diagnostics import laps
+from .packet import (MysteryGrid, NonsenseWords, RiddleCards, SentenceMatch, SoundMapping, Story, WordScramble, WordSearchWords,
+                     WordSort, parse_packet)
+from .phonics import segment_word
+from .util import content_hash, singleton
+from .wordsearch import WS_GRID_DIM, build_word_searches
+
+def get_color_rgb(color_name):
+    c = str(color_name).lower().strip()
+    colors = {
+        "red": ((255, 180, 180), (0,0,0)), "blue": ((180, 210, 255), (0,0,0)),
+        "green": ((180, 255, 180), (0,0,0)), "yellow": ((255, 255, 180), (0,0,0)),
+        "orange": ((255, 220, 180), (0,0,0)), "purple": ((220, 180, 255), (0,0,0)),
+        "pink": ((255, 200, 230), (0,0,0)), "brown": ((210, 190, 170), (0,0,0))
+    }
+    return colors.get(c, ((255,255,255), (0,0,0)))
+
+def scramble_word(word, rng):
+    # Shuffled letters, spaced out; never the answer itself unless every letter is the same.
+    letters = [ch for ch in word.upper() if not ch.isspace()]
+    mixed = rng.sample(letters, len(letters))
+    if mixed == letters: mixed = mixed[1:] + mixed[:1]
+    return " ".join(mixed)
+
+
+# Layout layers: every op is drawn in both PDFs, the student packet only, or the teacher key only.
+BOTH, STUDENT, KEY = 0, 1, 2
+
+class PacketLayout:
+    # Compiled packet: FPDF calls recorded as (layer, method, args, kwargs) ops. All content
+    # decisions (cleaning, shuffles, grids) are made once here; emit_pdf replays one layer set.
+    DRAW_OPS = {"add_page", "set_font", "set_text_color", "set_fill_color", "set_x", "set_xy",
+                "cell", "multi_cell", "ln", "rect"}
+
+    def __init__(self):
+        self.ops = []
+        self.layer = BOTH
+        self.timer = laps("render.compile")
+
+    def __getattr__(self, name):
+        if name not in PacketLayout.DRAW_OPS: raise AttributeError(name)
+        def record(*args, **kwargs): self.ops.append((self.layer, name, args, kwargs))
+        return record
+
+    @contextmanager
+    def only(self, layer):
+        prev, self.layer = self.layer, layer
+        try: yield self
+        finally: self.layer = prev
+
+    # Cursor-dependent decisions stay as ops: the two PDFs flow differently once answers are added.
+    def add_page_if_below(self, y): self.ops.append((self.layer, "add_page_if_below", (y,), {}))
+
+    # A table of same-size cells from the cursor down; rows hold (text, font, fill, text_color, border) per cell.
+    def grid(self, x, w, h, rows): self.ops.append((self.layer, "grid", (x, w, h, rows), {}))
+
+    # Splices in a prerecorded run of ops (page chrome) instead of recording it again.
+    def stamp(self, template): self.ops.extend(template)
+
+    # Marks where each activity's ops start (None = end), so compile and emit time can be split per type.
+    def section(self, label):
+        self.ops.append((BOTH, "section", (label,), {}))
+        if self.timer: self.timer.lap(label)
+
+# --- PAGE CHROME TEMPLATES (recorded once, stamped on every page that needs them) ---
+def _template(draw, *args):
+    pdf = PacketLayout()
+    draw(pdf, *args)
+    return tuple(pdf.ops)
+
+def _corner_header(pdf, size, name_h):
+    # Answer-key flag or name line in the top-right corner.
+    with pdf.only(KEY):
+        pdf.set_font("Helvetica", "B", size); pdf.set_text_color(200, 0, 0)
+        pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="R"); pdf.set_text_color(0,0,0)
+    with pdf.only(STUDENT):
+        pdf.set_font("Helvetica", "B", size)
+        pdf.set_x(15); pdf.cell(0, name_h, "Name: ___________________________________", ln=True, align="R")
+
+def _puzzle_header(pdf):
+    # Full-page puzzles: name line on the left, or a centred answer-key flag.
+    with pdf.only(STUDENT):
+        pdf.set_font("Helvetica", "B", 12); pdf.set_x(15); pdf.cell(0, 10, " Name: ___________________________________", ln=True, align="L")
+    with pdf.only(KEY):
+        pdf.set_font("Helvetica", "B", 14); pdf.set_text_color(200, 0, 0)
+        pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="C"); pdf.set_text_color(0,0,0)
+
+ACTIVITY_HEADER = _template(_corner_header, 10, 8)
+PUZZLE_HEADER = _template(_puzzle_header)
+PAGE_BORDER = _template(lambda pdf: pdf.rect(10, 10, 190, 277))
+
+def compile_layout(data, seed=0):
+    # data: a raw packet dict (validated here, once) or an already parsed Packet.
+    pdf = PacketLayout()
+    if pdf.timer: pdf.timer.lap("Parse")
+    packet = parse_packet(data)
+    if pdf.timer: pdf.timer.lap("Word Search grids")
+    ws_results = iter(build_word_searches([a.content.words for a in packet.activities if isinstance(a.content, WordSearchWords)], WS_GRID_DIM, seed))
+    
+    # COVER PAGE
+    pdf.section("Cover")
+    pdf.add_page()
+    with pdf.only(KEY):
+        pdf.set_font("Helvetica", "B", 12); pdf.set_text_color(200, 0, 0)
+        pdf.set_x(15); pdf.cell(0, 10, "TEACHER ANSWER KEY", ln=True, align="R"); pdf.set_text_color(0,0,0)
+    with pdf.only(STUDENT):
+        pdf.set_font("Helvetica", "B", 12)
+        pdf.set_x(15); pdf.cell(0, 10, "Name: ___________________________________   Date: ___________", ln=True)
+
+    pdf.ln(10)
+    pdf.set_font("Helvetica", "B", 26); pdf.set_x(15); pdf.cell(0, 15, "WIN Time Phonics Packet", ln=True, align="C")
+    pdf.ln(10)
+
+    pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Learning Focus:", ln=True)
+    pdf.set_font("Helvetica", "", 12); pdf.set_x(15); pdf.multi_cell(0, 6, packet.overview)
+    pdf.ln(10)
+
+    pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Target Word Bank:", ln=True)
+    pdf.set_font("Helvetica", "", 12)
+    pdf.set_x(15)
+    if packet.target_words: pdf.multi_cell(0, 6, "   |   ".join(packet.target_words))
+    else: pdf.cell(0, 6, "Words provided in activities.", ln=True)
+    pdf.ln(10)
+
+    pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Packet Checklist:", ln=True)
+    pdf.set_font("Helvetica", "", 12)
+    for i, act in enumerate(packet.activities):
+        pdf.set_x(15); pdf.cell(0, 8, f"[   ]  {i+1}. {act.type}", ln=True)
+    
+    # ACTIVITIES
+    for act_idx, act in enumerate(packet.activities):
+        a_type, content = act.type, act.content
+        # Same seed -> same shuffles and grids, so the student packet and key always agree.
+        rng = random.Random(f"{seed}:{act_idx}")
+        pdf.section(a_type)
+        
+        pdf.add_page_if_below(25)
+        
+        # --- GAME: MYSTERY GRID ---
+        if isinstance(content, MysteryGrid):
+            pdf.stamp(PAGE_BORDER)
+            pdf.set_font("Helvetica", "B", 20); pdf.set_x(15); pdf.cell(0, 15, "Color-by-Code", ln=True, align="C")
+            pdf.stamp(PUZZLE_HEADER)
+
+            color_names = [k for k, _ in content.legend] or ["?"]
+            
+            pdf.set_font("Helvetica", "B", 10)
+            legend_str = " | ".join([f"{k}: {v}" for k, v in content.legend])
+            pdf.set_x(15); pdf.multi_cell(0, 8, "Legend: " + legend_str, align="C")
+            pdf.ln(5)
+            
+            patterns = [
+                [[0,0,1,1,1,1,0,0],[0,1,2,2,2,2,1,0],[1,2,3,3,3,3,2,1],[1,2,3,0,0,3,2,1],[1,2,3,0,0,3,2,1],[1,2,3,3,3,3,2,1],[0,1,2,2,2,2,1,0],[0,0,1,1,1,1,0,0]],
+                [[0,1,0,1,0,1,0,1],[1,0,1,0,1,0,1,0],[0,1,2,2,2,2,1,0],[1,0,2,3,3,2,0,1],[0,1,2,3,3,2,1,0],[1,0,2,2,2,2,0,1],[0,1,0,1,0,1,0,1],[1,0,1,0,1,0,1,0]]
+            ]
+            chosen_pattern = rng.choice(patterns)
+            
+            size = 22; start_x = (210 - (8 * size)) / 2
+            key_rows, student_rows = [], []
+            for r in range(8):
+                key_row, student_row = [], []
+                for c in range(8):
+                    c_name = color_names[chosen_pattern[r][c] % len(color_names)]
+                    word_list = content.color_words.get(c_name) or ("?",)
+                    word = word_list[(r*8+c) % len(word_list)]
+                    fill, text = get_color_rgb(c_name)
+                    key_row.append((word, ("Helvetica", "B", 7), fill, text, 1))
+                    student_row.append((word, ("Helvetica", "", 8), None, (0, 0, 0), 1))
+                key_rows.append(key_row); student_rows.append(student_row)
+            with pdf.only(KEY): pdf.grid(start_x, size, size, key_rows)
+            with pdf.only(STUDENT): pdf.grid(start_x, size, size, student_rows)
+            continue
+            
+        # --- GAME: PYTHON WORD SEARCH ---
+        if isinstance(content, WordSearchWords):
+            pdf.stamp(PAGE_BORDER)
+            pdf.set_font("Helvetica", "B", 20); pdf.set_x(15); pdf.cell(0, 15, "Phonics Word Search", ln=True, align="C")
+            pdf.stamp(PUZZLE_HEADER)
+
+            pdf.ln(5)
+            grid_dim = WS_GRID_DIM
+            ws = next(ws_results)
+            placed_words = ws.words
+            
+            cell_size = 10 # 10mm blocks fit perfectly on A4
+            start_x = (210 - (grid_dim * cell_size)) / 2
+            font = ("Courier", "B", 14)
+            with pdf.only(KEY):
+                pdf.grid(start_x, cell_size, cell_size, [[(ws.letter(r, c), font, (255, 235, 235), (220, 0, 0), 1) if ws.is_answer(r, c) else
+                                                          (ws.letter(r, c), font, None, (180, 180, 180), 0) for c in range(grid_dim)] for r in range(grid_dim)])
+            with pdf.only(STUDENT):
+                pdf.grid(start_x, cell_size, cell_size, [[(ws.letter(r, c), font, None, (0, 0, 0), 0) for c in range(grid_dim)] for r in range(grid_dim)])
+            
+            pdf.ln(20) # MASSIVE SPACER FOR WORD BANK
+            pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "Word Bank:", ln=True, align="C")
+            pdf.set_font("Helvetica", "", 12); pdf.set_x(15)
+            pdf.multi_cell(0, 8, "   |   ".join(placed_words), align="C")
+            continue
+            
+        # --- GAME: WORD SCRAMBLE ---
+        if isinstance(content, WordScramble):
+            pdf.stamp(ACTIVITY_HEADER)
+            
+            pdf.ln(2); pdf.set_font("Helvetica", "B", 18); pdf.set_x(15); pdf.cell(0, 10, "Word Scramble", ln=True); pdf.ln(5)
+            pdf.set_font("Helvetica", "I", 12); pdf.set_x(15); pdf.cell(0, 6, "Unscramble the letters to find the secret words. Use the clues to help!", ln=True); pdf.ln(10)
+            
+            scrambles = content.items
+            for i, (word, clue) in enumerate(scrambles):
+                pdf.set_x(15)
+                pdf.set_font("Helvetica", "B", 14)
+                pdf.cell(50, 8, scramble_word(word, rng), 0, 0)
+                
+                with pdf.only(KEY):
+                    pdf.set_font("Helvetica", "B", 12); pdf.set_text_color(200, 0, 0)
+                    pdf.cell(60, 8, word, 0, 1); pdf.set_text_color(0, 0, 0) 
+                with pdf.only(STUDENT):
+                    pdf.set_font("Courier", "", 12); pdf.cell(60, 8, "________________", 0, 1)
+                
+                pdf.set_x(15)
+                pdf.set_font("Helvetica", "I", 11)
+                pdf.multi_cell(0, 6, f"Clue: {clue}")
+                
+                if i < len(scrambles) - 1:
+                    pdf.ln(4) 
+            continue
+
+        # --- STANDARD HEADER ---
+        pdf.stamp(ACTIVITY_HEADER)
+        
+        pdf.ln(2); pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 10, a_type, ln=True); pdf.ln(2)
+        
+        # --- DECODABLE STORY ---
+        if isinstance(content, Story):
+            pdf.set_font("Helvetica", "B", 12); pdf.set_x(15); pdf.cell(0, 10, content.title, ln=True, align="C")
+            pdf.set_font("Helvetica", "", 11)
+            for p in content.paragraphs: 
+                pdf.set_x(15); pdf.multi_cell(0, 6, p); pdf.ln(2)
+            
+            pdf.add_page_if_below(220)
+            
+            pdf.ln(5); pdf.set_font("Helvetica", "B", 11); pdf.set_x(15); pdf.cell(0, 8, "Evidence Check:", ln=True)
+            pdf.set_font("Helvetica", "", 11)
+            for q_str, a_str in content.questions:
+                pdf.set_x(15); pdf.multi_cell(0, 7, f"Q: {q_str}")
+                with pdf.only(KEY): 
+                    pdf.set_text_color(200,0,0); pdf.set_x(15); pdf.multi_cell(0, 7, f"A: {a_str}"); pdf.set_text_color(0,0,0); pdf.ln(2)
+                with pdf.only(STUDENT): 
+                    pdf.ln(8)
+
+        elif isinstance(content, NonsenseWords):
+            pdf.set_font("Helvetica", "B", 24)
+            for i, word in enumerate(content.words):
+                if i % 3 == 0: pdf.set_x(15)
+                pdf.cell(60, 20, word, 1, 1 if (i + 1) % 3 == 0 else 0, 'C')
+            tasks = content.tasks
+            if tasks:
+                pdf.ln(10); pdf.set_font("Helvetica", "B", 14); pdf.set_x(15); pdf.cell(0, 8, "DETECTIVE TASK:", ln=True)
+                pdf.set_font("Helvetica", "", 12)
+                for task in tasks:
+                    pdf.set_x(15); pdf.multi_cell(0, 6, task)
+
+        elif isinstance(content, WordSort):
+            cats = [name for name, _ in content.columns]
+            if cats:
+                all_words = [w for _, words in content.columns for w in words]
+                rng.shuffle(all_words)
+                pdf.set_font("Helvetica", "", 13)
+                pdf.set_x(15); pdf.multi_cell(0, 8, "Word Bank:  " + "   |   ".join(all_words)); pdf.ln(5)
+                w = 180 / len(cats)
+                
+                pdf.set_font("Helvetica", "B", 9) 
+                pdf.set_x(15)
+                for c in cats: pdf.cell(w, 10, c[:20], 1, 0, 'C')
+                pdf.ln(); pdf.set_font("Helvetica", "", 12)
+                
+                with pdf.only(STUDENT):
+                    for _ in range(6):
+                        pdf.set_x(15)
+                        for _ in cats: pdf.cell(w, 12, "", 1, 0)
+                        pdf.ln()
+                with pdf.only(KEY):
+                    max_r = max(len(words) for _, words in content.columns)
+                    pdf.set_text_color(200, 0, 0)
+                    for r in range(max_r):
+                        pdf.set_x(15)
+                        for _, lst in content.columns:
+                            pdf.cell(w, 10, lst[r] if r < len(lst) else "", 1, 0, 'C')
+                        pdf.ln()
+                    pdf.set_text_color(0, 0, 0)
+
+        elif isinstance(content, SentenceMatch):
+            l, r = content.left, content.right
+            shuffled = rng.sample(r, len(r))
+            for i in range(len(l)):
+                pdf.set_x(15)
+                pdf.set_font("Helvetica", "", 10) 
+                pdf.cell(85, 10, l[i][:50], 0, 0)
+                pdf.set_font("Courier", "", 10); pdf.cell(10, 10, ".......", 0, 0, 'C')
+                pdf.set_font("Helvetica", "", 10)
+                with pdf.only(KEY):
+                    pdf.set_text_color(200, 0, 0)
+                    pdf.cell(85, 10, r[i][:50] if i < len(r) else "", 0, 1, 'R')
+                with pdf.only(STUDENT):
+                    pdf.cell(85, 10, shuffled[i][:50] if i < len(shuffled) else "", 0, 1, 'R')
+                pdf.set_text_color(0, 0, 0)
+
+        elif isinstance(content, SoundMapping):
+            for word in content.words:
+                pdf.set_x(15)
+                pdf.set_font("Helvetica", "B", 14); pdf.cell(50, 12, f"{word} -> ", 0, 0, 'R')
+                # One box per sound, narrower for long words so the row fits the page.
+                sounds = segment_word(word) or ("",)
+                box = min(20, 120 / len(sounds))
+                with pdf.only(KEY):
+                    pdf.set_text_color(200, 0, 0)
+                    for n, sound in enumerate(sounds, 1): pdf.cell(box, 12, sound, 1, int(n == len(sounds)), 'C')
+                    pdf.set_text_color(0, 0, 0)
+                with pdf.only(STUDENT):
+                    for n in range(1, len(sounds) + 1): pdf.cell(box, 12, "", 1, int(n == len(sounds)))
+                pdf.ln(2)
+
+        elif isinstance(content, RiddleCards):
+            cards = content.riddles
+            xs, ys = 15, 45 
+            c_w, c_h = 85, 45 
+            for i, (clue1, clue2, clue3, ans) in enumerate(cards):
+                col = i % 2
+                row = i // 2
+                x = xs + (col * 95)
+                y = ys + (row * 50) 
+                pdf.rect(x, y, c_w, c_h)
+                pdf.set_xy(x+2, y+2); pdf.set_font("Helvetica", "B", 10); pdf.cell(0, 5, f"Riddle #{i+1}")
+                pdf.set_xy(x+2, y+8); pdf.set_font("Helvetica", "", 9)
+                clue_str = f"Clue 1: {clue1}\nClue 2: {clue2}\nClue 3: {clue3}"
+                pdf.multi_cell(c_w-4, 4.5, clue_str)
+                with pdf.only(KEY):
+                    pdf.set_xy(x, y + c_h - 7); pdf.set_font("Helvetica", "B", 11); pdf.set_text_color(200,0,0)
+                    pdf.cell(c_w, 6, f"Ans: {ans}", 0, 0, 'C'); pdf.set_text_color(0,0,0)
+
+    pdf.section(None)
+    return pdf
+
+# Lean output draws grid cells grouped by colour and font (fpdf2 already Flate-compresses page streams).
+PDF_LEAN = True
+
+def _draw_grid(pdf, x0, w, h, rows, lean):
+    # Leaves the cursor where a row-by-row run of cells would, so the rest of the page flows the same.
+    y0 = pdf.get_y()
+    if not lean:
+        for r, row in enumerate(rows):
+            pdf.set_x(x0)
+            for text, font, fill, color, border in row:
+                pdf.set_font(*font); pdf.set_text_color(*color)
+                if fill: pdf.set_fill_color(*fill)
+                pdf.cell(w, h, text, border, 0, 'C', fill=fill is not None)
+            if r < len(rows) - 1: pdf.ln(h)
+        pdf.set_text_color(0, 0, 0)
+        return
+    boxes, texts = {}, {}
+    for r, row in enumerate(rows):
+        for c, (text, font, fill, color, border) in enumerate(row):
+            x, y = x0 + c * w, y0 + r * h
+            if fill or border: boxes.setdefault(fill, []).append((x, y))
+            texts.setdefault((font, color), []).append((x, y, text))
+    for fill, spots in boxes.items():
+        if fill: pdf.set_fill_color(*fill)
+        for x, y in spots: pdf.rect(x, y, w, h, "DF" if fill else "D")
+    for (font, color), spots in texts.items():
+        # Text and fill share one PDF colour; matching them stops fpdf wrapping every cell in its own q/Q colour change.
+        pdf.set_font(*font); pdf.set_text_color(*color); pdf.set_fill_color(*color)
+        if font[0] == "Courier" and all(len(text) == 1 for _, _, text in spots):
+            # Monospaced letters: one run per row, spaced out to the cell pitch, blanks where another colour goes.
+            glyph, lines = pdf.get_string_width("M"), {}
+            for x, y, text in spots: lines.setdefault(y, {})[round((x - x0) / w)] = text
+            pdf.set_char_spacing((w - glyph) * pdf.k)
+            for y, line in lines.items():
+                pdf.set_xy(x0 + (w - glyph) / 2 - pdf.c_margin, y)
+                pdf.cell(w * len(rows[0]), h, "".join(line.get(c, " ") for c in range(max(line) + 1)), 0, 0, 'L')
+            pdf.set_char_spacing(0)
+        else:
+            for x, y, text in spots:
+                pdf.set_xy(x, y); pdf.cell(w, h, text, 0, 0, 'C')
+    pdf.set_text_color(0, 0, 0); pdf.set_fill_color(0, 0, 0)
+    pdf.set_xy(x0 + len(rows[-1]) * w, y0 + (len(rows) - 1) * h)
+
+def emit_pdf(layout, is_key=False, lean=PDF_LEAN):
+    from fpdf import FPDF # imported on first emit, so importing the package stays cheap
+    pdf = FPDF(unit='mm', format='A4')
+    pdf.set_margins(15, 15, 15)
+    pdf.set_auto_page_break(True, margin=15)
+    skip = STUDENT if is_key else KEY
+    timer = laps("render.emit", layer="key" if is_key else "student")
+    for layer, name, args, kwargs in layout.ops:
+        if layer == skip: continue
+        if name == "add_page_if_below":
+            if pdf.get_y() > args[0]: pdf.add_page()
+        elif name == "grid":
+            _draw_grid(pdf, *args, lean)
+        elif name == "section":
+            if timer: timer.lap(args[0])
+        else:
+            getattr(pdf, name)(*args, **kwargs)
+    if timer: timer.lap("PDF output")
+    pdf_bytes = bytes(pdf.output())
+    if timer: timer.lap()
+    return pdf_bytes
+
+def render_pdf(data, is_key=False, seed=0):
+    return emit_pdf(compile_layout(data, seed), is_key)
+
+# --- 9a. RENDERED PACKET CACHE (LRU, shared across sessions) ---
+# Bump when render_pdf output changes so stale packets are never served.
+PACKET_LAYOUT_VERSION = 6
+PDF_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+class PdfLRU:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes: return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None: self.bytes -= len(old)
+            self._entries[key] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+@singleton
+def get_pdf_cache(): return PdfLRU(PDF_CACHE_MAX_BYTES)
+
+def packet_cache_key(data, is_key, seed):
+    return content_hash(data, bool(is_key), seed, PACKET_LAYOUT_VERSION)
+
+def get_packet_pdfs(data, seed):
+    # Returns (student, key). On any miss the packet is compiled once and both layers emitted from it.
+    cache = get_pdf_cache()
+    keys = [packet_cache_key(data, is_key, seed) for is_key in (False, True)]
+    pdfs = [cache.get(k) for k in keys]
+    if None in pdfs:
+        layout = compile_layout(data, seed)
+        for i, is_key in enumerate((False, True)):
+            if pdfs[i] is None:
+                pdfs[i] = emit_pdf(layout, is_key)
+                cache.put(keys[i], pdfs[i])
+    return pdfs[0], pdfs[1]
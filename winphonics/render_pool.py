@@ -0,0 +1,102 @@
+# --- BACKGROUND RENDER POOL (bounded, shared across sessions) ---
+import os, threading, time, contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from .render import compile_layout, emit_pdf, get_pdf_cache, packet_cache_key
+from .util import singleton
+
+RENDER_WORKERS = max(2, min(4, os.cpu_count() or 2))
+RENDER_MAX_PENDING = 16 # queued + running jobs for the whole server
+RENDER_TIMEOUT_S = 30
+
+class RenderPool:
+    def __init__(self, workers, max_pending):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf-render")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.RLock()
+        self._inflight = {} # cache key -> Future, so reruns and other sessions join the running job
+        self.timings = deque(maxlen=200)
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0 # waits that gave up on a queued job and drew the PDF on the caller's thread
+
+    def running(self, key):
+        with self._lock: return self._inflight.get(key)
+
+    def submit(self, key, label, fn, *args):
+        # Returns the job's Future, or None when the global queue is full.
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None: return fut
+            if not self._slots.acquire(blocking=False):
+                self.rejected += 1
+                return None
+            queued_at = time.perf_counter()
+            ctx = contextvars.copy_context() # the job reports its spans to the submitting rerun's trace
+            def job():
+                started = time.perf_counter()
+                try: return ctx.run(fn, *args)
+                finally:
+                    with self._lock:
+                        self.timings.append({"job": label, "wait_s": started - queued_at, "render_s": time.perf_counter() - started})
+            fut = self._executor.submit(job)
+            self._inflight[key] = fut
+            self.submitted += 1
+        fut.add_done_callback(lambda _: self._finish(key))
+        return fut
+
+    def gave_up(self):
+        with self._lock: self.timed_out += 1
+
+    def _finish(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            recent = list(self.timings)
+            return {"workers": self._executor._max_workers, "in_flight": len(self._inflight),
+                    "submitted": self.submitted, "rejected": self.rejected, "timed_out": self.timed_out,
+                    "avg_wait_s": sum(t["wait_s"] for t in recent) / len(recent) if recent else 0.0,
+                    "avg_render_s": sum(t["render_s"] for t in recent) / len(recent) if recent else 0.0,
+                    "recent": recent[-10:]}
+
+@singleton
+def get_render_pool(): return RenderPool(RENDER_WORKERS, RENDER_MAX_PENDING)
+
+def _emit_into_cache(layout, is_key, key):
+    pdf_bytes = emit_pdf(layout, is_key)
+    get_pdf_cache().put(key, pdf_bytes)
+    return pdf_bytes
+
+def request_layout_pdfs(keys, make_layout):
+    # [student, key] for cache keys (student_key, key_key): each bytes (cached), a Future (rendering) or None (queue full).
+    cache, pool = get_pdf_cache(), get_render_pool()
+    out = [cache.get(k) for k in keys]
+    layout = None
+    for i, is_key in enumerate((False, True)):
+        if out[i] is not None: continue
+        out[i] = pool.running(keys[i])
+        if out[i] is None:
+            if layout is None: layout = make_layout()
+            out[i] = pool.submit(keys[i], "key" if is_key else "student", _emit_into_cache, layout, is_key, keys[i])
+    return out
+
+def render_packet_pdf(data, seed, is_key, timeout=RENDER_TIMEOUT_S):
+    # One layer, blocking: from the cache, by joining or queuing a pool job, or drawn right here when the pool is
+    # full or the job hasn't finished within timeout (a download callback must return bytes, not raise).
+    key = packet_cache_key(data, is_key, seed)
+    pdf_bytes = get_pdf_cache().get(key)
+    if pdf_bytes is not None: return pdf_bytes
+    pool = get_render_pool()
+    fut = pool.running(key) or pool.submit(key, "key" if is_key else "student", _emit_into_cache, compile_layout(data, seed), is_key, key)
+    if fut is not None:
+        try: return fut.result(timeout)
+        except FutureTimeout: pool.gave_up()
+    return _emit_into_cache(compile_layout(data, seed), is_key, key)
+
+def request_packet_pdfs(data, seed):
+    # Non-blocking get_packet_pdfs.
+    return request_layout_pdfs([packet_cache_key(data, is_key, seed) for is_key in (False, True)], lambda: compile_layout(data, seed))
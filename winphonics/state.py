@@ -0,0 +1,160 @@
+# --- SESSION STATE (compact plan items, per-session memory accounting, idle eviction) ---
+import sys, threading, time, uuid, weakref
+from concurrent.futures import CancelledError, Future
+
+from .catalog import GAME_ACTIVITIES
+from .util import singleton
+
+SESSION_IDLE_EVICT_S = 15 * 60 # sessions quiet this long lose the derived data they can rebuild (their PDFs)
+
+class QueueItem:
+    # One planned activity. Slotted instead of a dict (a few hundred bytes less per card), but still read
+    # like one (item["type"], item.get("nonsense")) so the engines take either shape.
+    __slots__ = ("type", "cat", "sounds", "nonsense", "is_game", "id")
+
+    def __init__(self, a_type, cat, sounds, nonsense=None, is_game=None, id=None):
+        self.type, self.cat, self.sounds = a_type, cat, tuple(sounds)
+        self.nonsense = a_type == "Nonsense Word Fluency" if nonsense is None else bool(nonsense)
+        self.is_game = a_type in GAME_ACTIVITIES if is_game is None else bool(is_game)
+        self.id = id or uuid.uuid4().hex[:12]
+
+    def __getitem__(self, key):
+        if key not in QueueItem.__slots__: raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None): return getattr(self, key) if key in QueueItem.__slots__ else default
+
+    def __repr__(self): return f"QueueItem({self.type!r}, {self.cat!r}, {self.sounds!r})"
+
+def state_bytes(value, seen=None):
+    # Deep size of a value: containers, slotted objects and everything they reach, each object counted once.
+    seen = set() if seen is None else seen
+    if id(value) in seen: return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))): return size
+    if isinstance(value, dict): return size + sum(state_bytes(k, seen) + state_bytes(v, seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)) or type(value).__name__ == "deque": return size + sum(state_bytes(v, seen) for v in value)
+    for cls in type(value).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            # Underscored slots are bookkeeping (locks, builds in flight), not held data.
+            if not name.startswith("_") and hasattr(value, name): size += state_bytes(getattr(value, name), seen)
+    if hasattr(value, "__dict__"): size += state_bytes(vars(value), seen)
+    return size
+
+class SessionDerived:
+    # Data a session can rebuild on demand: its packet PDFs, each built the first time its download is
+    # clicked and then memoized for that packet revision. Held by the session and, weakly, by the
+    # registry, which clears the bytes once the session has been idle too long.
+    __slots__ = ("rev", "pdfs", "pending", "built", "skipped", "_lock", "_building", "__weakref__")
+
+    def __init__(self):
+        self.rev, self.pdfs, self.pending = None, {}, set()
+        self.built = 0 # PDFs actually produced for a click
+        self.skipped = 0 # PDFs offered for a packet that was replaced (or is current) without ever being clicked
+        # Clicks are served on Streamlit's threads while the script thread offers and the registry evicts.
+        self._lock = threading.Lock()
+        self._building = {} # (rev, name) -> Future of the build in flight, joined by repeat clicks
+
+    def offer(self, rev, names):
+        # The downloads on screen for this packet revision; a new revision retires the old memo.
+        with self._lock:
+            if rev == self.rev: return
+            self.skipped += len(self.pending)
+            self.rev, self.pdfs, self.pending = rev, {}, set(names)
+
+    def lazy(self, rev, name, build):
+        # A download_button data callable. Streamlit runs it off the script thread when the button is clicked;
+        # a second click while the first is still rendering waits for that render instead of starting another.
+        def data():
+            while True:
+                with self._lock:
+                    if rev == self.rev and name in self.pdfs: return self.pdfs[name]
+                    pending = self._building.get((rev, name))
+                    leader = pending is None
+                    if leader: pending = self._building[(rev, name)] = Future()
+                if leader: break
+                try: return pending.result()
+                except CancelledError: continue # the first click was interrupted: build it here
+            started = time.perf_counter()
+            try:
+                out = build()
+            except Exception as e:
+                with self._lock: self._building.pop((rev, name), None)
+                pending.set_exception(e)
+                raise
+            except BaseException:
+                with self._lock: self._building.pop((rev, name), None)
+                pending.cancel()
+                raise
+            get_session_registry().built(time.perf_counter() - started)
+            with self._lock:
+                if rev == self.rev:
+                    # A new dict rather than an insert: state_bytes walks the memo from the script thread without the lock.
+                    self.pdfs = {**self.pdfs, name: out}; self.pending.discard(name); self.built += 1
+                self._building.pop((rev, name), None)
+            pending.set_result(out)
+            return out
+        return data
+
+    def never_built(self):
+        with self._lock: return self.skipped + len(self.pending)
+
+    def evict(self):
+        with self._lock:
+            if not self.pdfs: return 0
+            pdfs, self.pdfs = self.pdfs, {}
+        return state_bytes(pdfs)
+
+class SessionRegistry:
+    def __init__(self, idle_s):
+        self.idle_s = idle_s
+        self._lock = threading.Lock()
+        self._sessions = {} # session -> [last seen, state bytes, weakref to its SessionDerived]
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.builds = 0
+        self.build_s = 0.0
+
+    def open(self, session):
+        derived = SessionDerived()
+        with self._lock: self._sessions[session] = [time.monotonic(), 0, weakref.ref(derived)]
+        return derived
+
+    def touch(self, session, nbytes):
+        # Called once per rerun with the session's measured state size; also sweeps idle sessions.
+        now = time.monotonic()
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry: entry[0], entry[1] = now, nbytes
+            idle = [(s, e) for s, e in self._sessions.items() if now - e[0] > self.idle_s]
+        for s, entry in idle:
+            derived = entry[2]()
+            if derived is None: # the session is gone
+                with self._lock: self._sessions.pop(s, None)
+                continue
+            freed = derived.evict()
+            if freed:
+                with self._lock:
+                    self.evictions += 1; self.evicted_bytes += freed
+                    entry[1] = max(0, entry[1] - freed)
+
+    def built(self, seconds):
+        with self._lock: self.builds += 1; self.build_s += seconds
+
+    def build_ms(self):
+        # Mean time to produce one packet PDF on click; renders are CPU-bound, so this prices a PDF nobody clicked.
+        with self._lock: return self.build_s * 1000 / self.builds if self.builds else 0.0
+
+    def report(self):
+        with self._lock:
+            live = [(e[1], e[2]()) for e in self._sessions.values()]
+            sizes = [size for size, derived in live if derived is not None]
+            skipped = sum(derived.never_built() for _, derived in live if derived is not None)
+        mean_ms = self.build_ms()
+        return {"sessions": len(sizes), "total_bytes": sum(sizes), "mean_bytes": sum(sizes) / len(sizes) if sizes else 0.0,
+                "max_bytes": max(sizes, default=0), "evictions": self.evictions, "evicted_bytes": self.evicted_bytes,
+                "pdf_builds": self.builds, "pdf_build_ms": mean_ms, "pdfs_never_built": skipped, "est_cpu_saved_ms": skipped * mean_ms}
+
+@singleton
+def get_session_registry(): return SessionRegistry(SESSION_IDLE_EVICT_S)
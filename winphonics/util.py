@@ -0,0 +1,21 @@
+# --- SHARED HELPERS ---
+import json, hashlib, threading
+from functools import wraps
+
+def singleton(factory):
+    # Process-wide instance built on first use and shared by every thread and session
+    # (the job st.cache_resource did while this lived in the Streamlit script).
+    lock, box = threading.Lock(), []
+    @wraps(factory)
+    def get():
+        if not box:
+            with lock:
+                if not box: box.append(factory())
+        return box[0]
+    return get
+
+def content_hash(*parts):
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def clean_text(t): return str(t).replace("’","'").replace("“",'"').replace("”",'"').replace("**","")
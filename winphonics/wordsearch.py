@@ -0,0 +1,200 @@
+# --- PYTHON WORD SEARCH ENGINE (UPGRADED TO 15x15) ---
+import math, random, string, threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from .util import content_hash, singleton
+
+# 8-way directional generation
+DIRECTIONS = [
+    (0, 1), (1, 0), (1, 1), (-1, 1), 
+    (0, -1), (-1, 0), (-1, -1), (1, -1)
+]
+WS_CANDIDATES = 2 # compatible placements sampled per word before picking the best overlap
+WS_SCAN = 64 # paths inspected per word once at least one fits
+WS_CHECKS_PER_WORD = 200 # backtracking budget, in path checks per word, once the greedy pass has dropped a word
+# Random bytes -> A..Z, so the empty cells are filled from one randbytes() call (A-V turn up 10/256, W-Z 9/256: fine for filler).
+NOISE_TABLE = bytes(string.ascii_uppercase.encode()[b % 26] for b in range(256))
+
+
+
+
+class WordSearch:
+    # A finished puzzle: one letter byte per cell (row-major) and the answer cells as the bits of one int,
+    # a few hundred bytes instead of two lists of lists of one-character strings and bools.
+    __slots__ = ("size", "letters", "mask", "words")
+
+    def __init__(self, size, letters, mask, words):
+        self.size, self.letters, self.mask, self.words = size, letters, mask, words
+
+    def letter(self, r, c): return chr(self.letters[r * self.size + c])
+
+    def is_answer(self, r, c): return self.mask >> (r * self.size + c) & 1 == 1
+
+@lru_cache(maxsize=None)
+def _swar_masks(length):
+    # Per-byte 0x7f and 0x80 masks for a path of this length, for the whole-path checks in build_compact_word_search.
+    return int.from_bytes(b"\x7f" * length, "big"), int.from_bytes(b"\x80" * length, "big")
+
+@lru_cache(maxsize=None)
+def _strides(n):
+    # Steps coprime with n: from any start, repeatedly adding one visits all n paths once, in a shuffled order.
+    return [s for s in range(1, n) if math.gcd(s, n) == 1] or [1]
+
+@lru_cache(maxsize=None)
+def _word_paths(size, length):
+    # Every in-bounds placement of a word of this length on a flat size*size grid, as the slice
+    # of cells it covers. Built once per (size, length) and shared by every grid.
+    paths = []
+    for dr, dc in DIRECTIONS:
+        step = dr * size + dc
+        for r in range(size):
+            if not 0 <= r + (length - 1) * dr < size: continue
+            for c in range(size):
+                if not 0 <= c + (length - 1) * dc < size: continue
+                start = r * size + c; end = start + step * length
+                paths.append(slice(start, end if end >= 0 else None, step))
+    return paths
+
+def build_compact_word_search(words, size=15, rng=random): # Increased to 15x15 for better spacing
+    grid = bytearray(size * size) # 0 = empty cell, otherwise the letter's byte
+    words = sorted([w.upper().replace(" ", "") for w in words], key=len, reverse=True)
+    order = [(w, w.encode("latin-1", "replace")) for w in words if 0 < len(w) <= size]
+    placements = [None] * len(order)
+    budget = [0] # path checks left; only the backtracking pass draws on it
+    
+    def candidates(word_bytes, metered=False):
+        paths = _word_paths(size, len(word_bytes))
+        n = len(paths)
+        if not n: return []
+        strides = _strides(n)
+        stride, idx = strides[int(rng.random() * len(strides))], int(rng.random() * n)
+        length = len(word_bytes)
+        word_int = int.from_bytes(word_bytes, "big")
+        lo, hi = _swar_masks(length)
+        found = []
+        for scanned in range(n):
+            if found and scanned >= WS_SCAN: break # crowded grid: settle for what turned up
+            if metered:
+                if budget[0] <= 0: break
+                budget[0] -= 1
+            cells = paths[idx]
+            idx = (idx + stride) % n
+            seg = int.from_bytes(grid[cells], "big")
+            if not seg:
+                found.append((0, cells))
+            else:
+                # SWAR: high bit of each byte marks a non-zero byte, so the whole path is checked
+                # in a few int ops: every filled cell must already hold this word's letter.
+                filled = (((seg & lo) + lo) | seg) & hi
+                diff = seg ^ word_int
+                if filled & ((((diff & lo) + lo) | diff) & hi): continue
+                overlap = bin(filled).count("1")
+                if overlap == length: continue # already spelled there; placing it again hides nothing
+                found.append((overlap, cells))
+            if len(found) >= WS_CANDIDATES: break
+        found.sort(key=lambda f: -f[0]) # most shared letters first; sort is stable so ties stay random
+        return found
+    
+    def place(i):
+        if i == len(order): return True
+        word_bytes = order[i][1]
+        for _, cells in candidates(word_bytes, True):
+            saved = grid[cells]
+            grid[cells] = word_bytes
+            placements[i] = cells
+            if place(i + 1): return True
+            grid[cells] = saved
+            placements[i] = None
+            if budget[0] <= 0: break
+        return False
+    
+    # Greedy pass: the best-overlap candidate for each word, longest first. Enough for almost every real list.
+    for i, (_, word_bytes) in enumerate(order):
+        found = candidates(word_bytes)
+        if found: placements[i] = found[0][1]; grid[found[0][1]] = word_bytes
+    if None in placements:
+        # A word was dropped: backtrack from an empty grid under a budget that grows with the list,
+        # keeping the greedy grid if no complete placement turns up in time.
+        greedy, greedy_placements = bytes(grid), placements[:]
+        grid[:] = bytes(size * size); placements[:] = [None] * len(order)
+        budget[0] = WS_CHECKS_PER_WORD * len(order)
+        if not place(0): grid[:], placements[:] = greedy, greedy_placements
+    
+    # Random letters everywhere, then the placed words written over them.
+    letters = bytearray(rng.randbytes(size * size).translate(NOISE_TABLE))
+    mask, placed_words, cell_ids = 0, [], range(size * size)
+    for (word, word_bytes), cells in zip(order, placements):
+        if cells is None: continue
+        letters[cells] = word_bytes
+        for i in cell_ids[cells]: mask |= 1 << i
+        placed_words.append(word)
+    return WordSearch(size, bytes(letters), mask, tuple(placed_words))
+
+def build_word_search(words, size=15, rng=random):
+    # The (grid, ans_grid, placed_words) lists callers have always had; the batches and the grid cache
+    # keep the compact WordSearch instead.
+    ws = build_compact_word_search(words, size, rng)
+    grid = [[ws.letter(r, c) for c in range(size)] for r in range(size)]
+    ans_grid = [[ws.is_answer(r, c) for c in range(size)] for r in range(size)]
+    return grid, ans_grid, list(ws.words)
+
+# --- 4a. SEEDED WORD SEARCH BATCHES (shared by every session in this process) ---
+WS_GRID_DIM = 15 # The new 15x15 expansion
+WS_MAX_WORDS = 10 # the prompt's quantity rule; extra words are dropped
+WS_CACHE_MAX = 256 # grids kept in memory; each is a few KB
+
+class WordSearchCache:
+    # LRU of built grids keyed by (words, size, packet seed). Grids are shared read-only, never mutated.
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries: self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock: return {"entries": len(self._items), "hits": self.hits, "misses": self.misses}
+
+@singleton
+def get_word_search_cache(): return WordSearchCache(WS_CACHE_MAX)
+
+def word_search_key(words, size, seed):
+    return content_hash(list(words), size, seed)
+
+def build_word_searches(word_lists, size=WS_GRID_DIM, seed=0):
+    # Builds (or reuses) one grid per word list in a single call. Each grid's RNG is seeded from its own
+    # words, the size and the packet seed, so the same packet always yields the same grids no matter
+    # where the activity sits in the plan or which session asks.
+    cache = get_word_search_cache()
+    out = []
+    for words in word_lists:
+        key = word_search_key(words, size, seed)
+        result = cache.get(key)
+        if result is None:
+            result = build_compact_word_search(words, size, random.Random(key))
+            cache.put(key, result)
+        out.append(result)
+    return out
+
+def word_search_words(act):
+    content = act.get('content') if isinstance(act, dict) else None
+    words = content.get('word_search') if isinstance(content, dict) else None
+    return [w for w in words if isinstance(w, str) and w.strip()][:WS_MAX_WORDS] if isinstance(words, list) else []
+
+def packet_word_lists(data):
+    return [word_search_words(act) for act in data.get("activities") or [] if isinstance(act, dict) and act.get('type') == "Phonics Word Search"]